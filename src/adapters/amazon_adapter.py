@@ -1,5 +1,7 @@
 # src/adapters/amazon_adapter.py
 
+from src.handlers.consent_engine import dismiss_consent
+
 class AmazonAdapter:
     """
     Adapter for interacting with Amazon's website.
@@ -46,14 +48,8 @@ class AmazonAdapter:
     @staticmethod
     def handle_cookie_banner(page):
         """
-        Attempt to handle Amazon's cookie banner if present.
+        Attempt to handle Amazon's cookie banner if present, with the page's
+        consent engine (its site rules cover this site).
         Returns True if a cookie banner was handled, otherwise False.
         """
-        try:
-            # Example: Check if a common cookie banner element is visible and click it.
-            if page.is_visible("#sp-cc"):
-                page.click("#sp-cc")
-                return True
-        except Exception:
-            pass
-        return False
\ No newline at end of file
+        return dismiss_consent(page)["dismissed"]
\ No newline at end of file
@@ -1,5 +1,7 @@
 # src/adapters/generic_ecommerce_adapter.py
 
+from src.handlers.consent_engine import dismiss_consent
+
 class GenericEcommerceAdapter:
     """
     Adapter for interacting with generic e-commerce websites.
@@ -34,17 +36,8 @@ class GenericEcommerceAdapter:
     @staticmethod
     def handle_cookie_banner(page):
         """
-        Attempt to handle a generic cookie banner.
-        Looks for common cookie banner buttons like 'Accept' or 'I agree'.
+        Attempt to handle a generic cookie banner if present, with the page's
+        consent engine (reject before accept, in the banner or its iframe).
         Returns True if a cookie banner was handled, otherwise False.
         """
-        try:
-            buttons = page.query_selector_all("button")
-            for button in buttons:
-                text = button.inner_text().lower()
-                if "accept" in text or "agree" in text:
-                    button.click()
-                    return True
-        except Exception:
-            pass
-        return False
+        return dismiss_consent(page)["dismissed"]
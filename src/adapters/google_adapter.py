@@ -1,5 +1,7 @@
 # src/adapters/google_adapter.py
 
+from src.handlers.consent_engine import dismiss_consent
+
 class GoogleAdapter:
     """
     Adapter for interacting with Google's website.
@@ -33,17 +35,8 @@ class GoogleAdapter:
     @staticmethod
     def handle_cookie_banner(page):
         """
-        Attempt to handle Google's cookie banner if present.
-        Returns True if a banner is handled, otherwise False.
-        """
-        try:
-            # Look for a button with text like "I agree" or "Accept"
-            buttons = page.query_selector_all("button")
-            for button in buttons:
-                text = button.inner_text().lower()
-                if "agree" in text or "accept" in text:
-                    button.click()
-                    return True
-        except Exception:
-            pass
-        return False
+        Attempt to handle Google's cookie banner if present, with the page's
+        consent engine (its site rules cover this site).
+        Returns True if a cookie banner was handled, otherwise False.
+        """
+        return dismiss_consent(page)["dismissed"]
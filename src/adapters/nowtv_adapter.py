@@ -1,5 +1,7 @@
 # src/adapters/nowtv_adapter.py
 
+from src.handlers.consent_engine import dismiss_consent
+
 class NowTVAdapter:
     """
     Adapter for interacting with NowTV's website.
@@ -35,14 +37,8 @@ class NowTVAdapter:
     @staticmethod
     def handle_cookie_banner(page):
         """
-        Attempt to handle NowTV's cookie banner if present.
+        Attempt to handle NowTV's cookie banner if present, with the page's
+        consent engine (its site rules cover this site).
         Returns True if a cookie banner was handled, otherwise False.
         """
-        try:
-            # Example: look for a cookie acceptance button
-            if page.is_visible("button.cookie-accept"):
-                page.click("button.cookie-accept")
-                return True
-        except Exception:
-            pass
-        return False
+        return dismiss_consent(page)["dismissed"]
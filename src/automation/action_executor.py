@@ -1,14 +1,21 @@
 import json
 import re
 import logging
-import random
-import time
-from src.vision.ocr_processor import OCRProcessor
-from src.capture.screen_capture import capture_screenshot
 from src.utils.json_parser import extract_json
+from src.utils.pacing import get_pacing_policy
+from src.browser.settle import wait_until_settled
+from src.dom.selector_probe import first_visible, locator_for, rect_center
+from src.dom.element_cache import get_element_cache
+from src.dom.element_index import find_by_text
+from src.dom.page_helpers import call_helper
+from src.handlers.consent_engine import dismiss_consent
+from src.automation.cursor import get_cursor_position, set_cursor_position, natural_path, dispatch_path
 
 def simulate_human_mouse_movement(page):
     """Simulate random mouse movements like a human would make"""
+    pacing = get_pacing_policy()
+    if pacing.scale == 0:
+        return
     try:
         viewport_size = page.viewport_size
         if not viewport_size:
@@ -17,566 +24,327 @@ def simulate_human_mouse_movement(page):
         width, height = viewport_size["width"], viewport_size["height"]
         
         # Random mouse movements (1-3 movements)
-        for _ in range(random.randint(1, 3)):
+        for _ in range(pacing.randint(1, 3)):
             # Move to random position on screen
-            x = random.randint(100, width - 100)
-            y = random.randint(100, height - 100)
+            x = pacing.randint(100, width - 100)
+            y = pacing.randint(100, height - 100)
             
             move_mouse_naturally(page, x, y)
             
             # Small pause between movements
-            time.sleep(random.uniform(0.1, 0.5))
+            pacing.sleep(0.1, 0.5)
     except Exception as e:
         logging.error(f"Mouse movement simulation failed: {e}")
 
 def move_mouse_naturally(page, target_x, target_y):
     """Move mouse in a natural curve rather than straight line"""
+    pacing = get_pacing_policy()
     try:
-        # Get current position
-        current_position = page.evaluate("""() => { 
-            return {x: window.mouseX || 100, y: window.mouseY || 100}; 
-        }""")
+        # Start from the position we last moved to (tracked on the Python side)
+        start = get_cursor_position(page)
         
-        start_x = current_position.get('x', 100)
-        start_y = current_position.get('y', 100)
+        # Curved path, sent to the browser as a single batch of input events
+        path = natural_path(start, (target_x, target_y), pacing)
+        dispatch_path(page, path)
         
-        # Calculate distance
-        distance = ((target_x - start_x)**2 + (target_y - start_y)**2)**0.5
-        
-        # More points for longer distances
-        steps = max(5, int(distance / 30))
-        
-        # Generate curve control point (for natural arc)
-        control_x = (start_x + target_x) / 2 + random.randint(-100, 100)
-        control_y = (start_y + target_y) / 2 + random.randint(-100, 100)
-        
-        # Move mouse along a quadratic curve
-        for step in range(steps + 1):
-            t = step / steps
-            # Quadratic bezier curve
-            x = (1-t)**2 * start_x + 2*(1-t)*t * control_x + t**2 * target_x
-            y = (1-t)**2 * start_y + 2*(1-t)*t * control_y + t**2 * target_y
-            
-            page.mouse.move(x, y)
-            
-            # Add small delay between movements
-            time.sleep(random.uniform(0.005, 0.02))
+        # Take the time the movement would have taken a human, once
+        pacing.sleep(0.005 * len(path), 0.02 * len(path))
             
     except Exception as e:
         logging.error(f"Natural mouse movement failed: {e}")
         # Fallback to direct movement
         page.mouse.move(target_x, target_y)
+        set_cursor_position(page, target_x, target_y)
 
-def execute_actions(page, ai_response: str):
+def navigate_to(page, url):
     """
-    Execute actions from AI response with enhanced human-like behavior
+    Navigate to a URL and wait for the page to stabilize.
     
-    :param page: A Playwright page instance
-    :param ai_response: The AI-generated response
-    :return: List of actions performed
+    :return: List of actions performed (empty on failure)
     """
-    commands_data = extract_json(ai_response)
-    if commands_data is None:
-        logging.error("Failed to extract commands from AI response.")
+    if not url:
         return []
+    logging.info("Navigating to URL: %s", url)
+    try:
+        page.goto(url, wait_until="domcontentloaded")
+        wait_until_settled(page)  # Wait for page to stabilize
+        return [f"Navigated to {url}"]
+    except Exception as e:
+        logging.error(f"Navigation failed: {e}")
+        return []
+
+def click_consent_button(page, text):
+    """
+    Click a cookie consent button (Google and common consent dialogs).
     
-    if "analysis" in commands_data:
-        logging.info("AI Analysis: %s", commands_data["analysis"])
-    
+    :return: List of actions performed (empty on failure)
+    """
     actions_performed = []
-    commands = commands_data.get("commands", [])
-    
-    for cmd in commands:
-        # Add human-like delay between actions (1-2 seconds)
-        delay = random.uniform(0.5, 2.0)
-        logging.info(f"Adding human-like delay of {delay:.1f} seconds")
-        time.sleep(delay)
-        
-        # Simulate random mouse movements
-        simulate_human_mouse_movement(page)
-        
-        action = cmd.get("action")
-        
-        if action == "navigate":
-            url = cmd.get("url")
-            if url:
-                logging.info("Navigating to URL: %s", url)
-                try:
-                    page.goto(url, wait_until="domcontentloaded")
-                    page.wait_for_timeout(2000)  # Wait for page to stabilize
-                    actions_performed.append(f"Navigated to {url}")
-                except Exception as e:
-                    logging.error(f"Navigation failed: {e}")
-        
-        elif action == "click":
-            selector = cmd.get("selector")
-            text = cmd.get("text")
-            submit = cmd.get("submit", False)
-            
-            # Special handling for Google cookie consent
-            if text and ("accept" in text.lower() or "agree" in text.lower()):
-                try:
-                    # Consent button selectors for various sites
-                    consent_selectors = [
-                        "button[aria-label='Accept all']",
-                        "#L2AGLb",  # Google's consent button ID
-                        ".tHlp8d",  # Google's consent button class
-                        "form[action*='consent'] button",
-                        "div[role='dialog'] button:last-child",
-                        "button:has-text('Accept')",
-                        "button:has-text('Accept all')",
-                        "button:has-text('I agree')"
-                    ]
-                    
-                    for consent_selector in consent_selectors:
-                        try:
-                            if page.is_visible(consent_selector, timeout=1000):
-                                # Move mouse naturally to the element
-                                element_position = page.evaluate(f"""() => {{
-                                    const element = document.querySelector('{consent_selector}');
-                                    if (!element) return null;
-                                    const rect = element.getBoundingClientRect();
-                                    return {{ x: rect.x + rect.width/2, y: rect.y + rect.height/2 }};
-                                }}""")
-                                
-                                if element_position:
-                                    move_mouse_naturally(page, element_position['x'], element_position['y'])
-                                
-                                page.click(consent_selector)
-                                actions_performed.append(f"Clicked consent button: {consent_selector}")
-                                # Wait to ensure the action completes
-                                page.wait_for_timeout(1000)
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    # If we couldn't click using selectors, try visible elements with matching text
-                    if not actions_performed:
-                        # Use evaluate to find and click the button via JavaScript
-                        clicked = page.evaluate('''() => {
-                            const buttons = Array.from(document.querySelectorAll('button'));
-                            const acceptButton = buttons.find(button => 
-                                (button.textContent.toLowerCase().includes('accept all') || 
-                                button.textContent.toLowerCase().includes('i agree') ||
-                                button.textContent.toLowerCase().includes('agree')) && 
-                                button.offsetParent !== null
-                            );
-                            if (acceptButton) {
-                                acceptButton.click();
-                                return true;
-                            }
-                            return false;
-                        }''')
-                        
-                        if clicked:
-                            actions_performed.append("Clicked Accept button via JavaScript")
-                            page.wait_for_timeout(1000)
-                            
-                except Exception as e:
-                    logging.error(f"Consent click action failed: {e}")
-            
-            # Regular element clicking with human-like mouse movement
-            elif selector:
-                try:
-                    if page.is_visible(selector, timeout=3000):
-                        # Move mouse naturally to the element
-                        element_position = page.evaluate(f"""() => {{
-                            const element = document.querySelector('{selector}');
-                            if (!element) return null;
-                            const rect = element.getBoundingClientRect();
-                            return {{ x: rect.x + rect.width/2, y: rect.y + rect.height/2 }};
-                        }}""")
-                        
-                        if element_position:
-                            move_mouse_naturally(page, element_position['x'], element_position['y'])
-                        
-                        # Add a small random delay before clicking (like a human deciding)
-                        time.sleep(random.uniform(0.1, 0.5))
-                        page.click(selector)
-                        actions_performed.append(f"Clicked element with selector: {selector}")
-                    else:
-                        logging.error(f"Element with selector {selector} not visible")
-                except Exception as e:
-                    logging.error(f"Click action failed: {e}")
-            
-            # Click by text as fallback
-            elif text:
-                try:
-                    # Try different text matching strategies
-                    text_strategies = [
-                        f"text=\"{text}\"",            # Exact match
-                        f"text='{text}'",              # Contains match
-                        f"text=/^{text}$/i",           # Case-insensitive exact match
-                        f"text=/.*{text}.*/i",         # Case-insensitive contains
-                        f"[aria-label*='{text}']",     # Aria label contains
-                        f"button:has-text('{text}')",  # Button with text
-                        f":text('{text}')"             # Any element with text
-                    ]
-                    
-                    for strategy in text_strategies:
-                        try:
-                            if page.is_visible(strategy, timeout=1000):
-                                # Get element position for natural mouse movement
-                                element_position = page.evaluate(f"""() => {{
-                                    const element = document.querySelector('{strategy}');
-                                    if (!element) return null;
-                                    const rect = element.getBoundingClientRect();
-                                    return {{ x: rect.x + rect.width/2, y: rect.y + rect.height/2 }};
-                                }}""")
-                                
-                                if element_position:
-                                    move_mouse_naturally(page, element_position['x'], element_position['y'])
-                                
-                                time.sleep(random.uniform(0.1, 0.3))
-                                page.click(strategy)
-                                actions_performed.append(f"Clicked element with text: {text}")
-                                break
-                        except:
-                            continue
-                except Exception as e:
-                    logging.error(f"Text click failed: {e}")
-        
-        elif action == "input":
-            selector = cmd.get("selector")
-            text = cmd.get("text", "")
-            submit = cmd.get("submit", False)
-            
-            # Special handling for Amazon search
-            if "amazon" in page.url and (selector == "input[name='q']" or "search" in selector.lower()):
-                # Use the correct Amazon search box selector
-                amazon_search = "input[id='twotabsearchtextbox']"
-                try:
-                    if page.is_visible(amazon_search, timeout=2000):
-                        # Move mouse naturally to the element
-                        element_position = page.evaluate(f"""() => {{
-                            const element = document.querySelector('{amazon_search}');
-                            if (!element) return null;
-                            const rect = element.getBoundingClientRect();
-                            return {{ x: rect.x + rect.width/2, y: rect.y + rect.height/2 }};
-                        }}""")
-                        
-                        if element_position:
-                            move_mouse_naturally(page, element_position['x'], element_position['y'])
-                        
-                        page.click(amazon_search)
-                        page.fill(amazon_search, "")
-                        
-                        # Type with human-like delays
-                        for char in text:
-                            page.type(amazon_search, char, delay=random.randint(50, 200))
-                            time.sleep(random.uniform(0.01, 0.05))
-                        
-                        actions_performed.append(f"Typed '{text}' into Amazon search box")
-                        
-                        if submit:
-                            # Use Amazon's search submit button
-                            submit_button = "input[id='nav-search-submit-button']"
-                            if page.is_visible(submit_button, timeout=1000):
-                                page.click(submit_button)
-                            else:
-                                # Or press Enter if button not found
-                                page.press(amazon_search, "Enter")
-                            actions_performed.append("Submitted Amazon search")
-                            page.wait_for_timeout(3000)
-                        return actions_performed
-                    else:
-                        logging.error(f"Amazon search box not visible")
-                except Exception as e:
-                    logging.error(f"Amazon search failed: {e}")
-            
-            # Regular input handling with human-like typing
-            elif selector:
-                try:
-                    if page.is_visible(selector, timeout=3000):
-                        # Move mouse to input field naturally
-                        element_position = page.evaluate(f"""() => {{
-                            const element = document.querySelector('{selector}');
-                            if (!element) return null;
-                            const rect = element.getBoundingClientRect();
-                            return {{ x: rect.x + rect.width/2, y: rect.y + rect.height/2 }};
-                        }}""")
-                        
-                        if element_position:
-                            move_mouse_naturally(page, element_position['x'], element_position['y'])
-                        
-                        page.click(selector)
-                        
-                        # Clear field
-                        page.fill(selector, "")
-                        
-                        # Type with human-like delays
-                        for char in text:
-                            page.type(selector, char, delay=random.randint(50, 200))
-                            time.sleep(random.uniform(0.01, 0.05))
-                        
-                        actions_performed.append(f"Typed '{text}' into {selector}")
-                        
-                        if submit:
-                            # Pause before pressing Enter
-                            time.sleep(random.uniform(0.5, 1.5))
-                            page.press(selector, "Enter")
-                            actions_performed.append("Pressed Enter to submit")
-                    else:
-                        logging.error(f"Input field {selector} not visible")
-                except Exception as e:
-                    logging.error(f"Input action failed: {e}")
+    try:
+        # Consent button selectors for various sites
+        consent_selectors = [
+            "button[aria-label='Accept all']",
+            "#L2AGLb",  # Google's consent button ID
+            ".tHlp8d",  # Google's consent button class
+            "form[action*='consent'] button",
+            "div[role='dialog'] button:last-child",
+            "button:has-text('Accept')",
+            "button:has-text('Accept all')",
+            "button:has-text('I agree')"
+        ]
         
-        elif action == "scroll":
-            direction = cmd.get("direction", "down")
-            amount = cmd.get("amount", 300)
-            
+        # Probe all candidates in one call and click the best-ranked visible one
+        match = first_visible(page, consent_selectors)
+        if match:
             try:
-                # Make scrolling more natural with variable speed
-                total_scroll = 0
-                target_amount = amount
-                
-                # Break scrolling into smaller, variable chunks
-                while total_scroll < target_amount:
-                    # Variable chunk size
-                    chunk = min(random.randint(50, 120), target_amount - total_scroll)
-                    total_scroll += chunk
-                    
-                    if direction == "down":
-                        page.evaluate(f"window.scrollBy(0, {chunk})")
-                    elif direction == "up":
-                        page.evaluate(f"window.scrollBy(0, -{chunk})")
-                    
-                    # Variable pause between scroll chunks
-                    time.sleep(random.uniform(0.03, 0.10))
+                # Move mouse naturally to the element
+                if match["rect"]:
+                    move_mouse_naturally(page, *rect_center(match["rect"]))
                 
-                actions_performed.append(f"Scrolled {direction} {amount} pixels")
+                locator_for(page, match).click()
+                actions_performed.append(f"Clicked consent button: {match['selector']}")
+                # Wait to ensure the action completes
+                wait_until_settled(page, timeout_ms=2000)
             except Exception as e:
-                logging.error(f"Scroll failed: {e}")
+                logging.debug(f"Consent button click failed: {e}")
         
-        # Wait after each action with a variable delay
-        page.wait_for_timeout(random.randint(300, 1000))
-    
+        # If we couldn't click using selectors, look the consent texts up in the page's text index
+        if not actions_performed:
+            match = find_by_text(page, ["accept all", "i agree", "agree"], tags=("button", "a"))
+            if match:
+                actions_performed.extend(click_element(page, match))
+                if actions_performed:
+                    wait_until_settled(page, timeout_ms=2000)
+        
+        # Last resort: find and click the button via JavaScript
+        if not actions_performed:
+            clicked = call_helper(page, "clickByText", {"texts": ["accept all", "i agree", "agree"],
+                                                        "selector": "button"})
+            if clicked:
+                actions_performed.append("Clicked Accept button via JavaScript")
+                wait_until_settled(page, timeout_ms=2000)
+                
+    except Exception as e:
+        logging.error(f"Consent click action failed: {e}")
     return actions_performed
 
-# Add this function to action_executor.py after the existing functions
-
-def handle_cookie_banner(page):
+def click_selector(page, selector):
     """
-    Enhanced function to handle cookie banners with multiple strategies.
-    Prioritizes rejecting cookies when possible, falls back to accepting if needed.
-    Returns True if successfully handled, False otherwise.
-    """
-    print("Attempting to handle cookie banner with multiple strategies...")
-    
-    # # Strategy 1: Try to REJECT cookies first using common button selectors
-    reject_selectors = [
-        "button#CybotCookiebotDialogBodyButtonDecline",  # Common Cookiebot reject button
-        "button:has-text('Reject all')",
-        "button:has-text('Reject')",
-        "button:has-text('Decline')",
-        "button:has-text('No, thanks')",
-        "#reject-all-cookies",
-        ".reject-cookies-button",
-        "[aria-label='Reject all']"
-    ]
+    Click an element by selector with human-like mouse movement.
     
-    for selector in reject_selectors:
-        try:
-            if page.is_visible(selector, timeout=1000):
-                print(f"Found reject button with selector: {selector}")
-                page.click(selector)
-                page.wait_for_timeout(1000)
-                return True
-        except Exception as e:
-            print(f"Failed to click reject selector {selector}: {e}")        
-    # Strategy 2: If reject fails, try ACCEPT buttons (fallback)
-    accept_selectors = [
-        "button#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
-        "#cookie-accept-all",
-        ".cookie-accept-all",
-        ".accept-cookies-button",
-        "button[aria-label='Accept all']",
-        "#accept-all-cookies",
-        ".accept-all-cookies",
-        "button:has-text('Accept all')",
-        "button:has-text('Allow all')"
-    ]
+    :return: List of actions performed (empty on failure)
+    """
+    pacing = get_pacing_policy()
+    try:
+        match = get_element_cache(page).resolve(selector)
+        if not match:
+            logging.error(f"Element with selector {selector} not visible")
+            return []
+        
+        # Move mouse naturally to the element
+        if match["rect"]:
+            move_mouse_naturally(page, *rect_center(match["rect"]))
+        
+        # Add a small random delay before clicking (like a human deciding)
+        pacing.sleep(0.1, 0.5)
+        match["locator"].click()
+        return [f"Clicked element with selector: {selector}"]
+    except Exception as e:
+        logging.error(f"Click action failed: {e}")
+        return []
+
+def click_text(page, text):
+    """
+    Click an element by its visible text, trying several matching strategies.
     
-    for selector in accept_selectors:
-        try:
-            if page.is_visible(selector, timeout=1000):
-                print(f"Found accept button with selector: {selector}")
-                page.click(selector)
-                page.wait_for_timeout(1000)
-                return True
-        except Exception as e:
-            print(f"Failed to click accept selector {selector}: {e}")
+    :return: List of actions performed (empty on failure)
+    """
+    pacing = get_pacing_policy()
+    try:
+        # Look the text up among the snapshot's interactive elements first (no selector probing)
+        match = find_by_text(page, text)
+        if match:
+            if match["rect"]:
+                move_mouse_naturally(page, *rect_center(match["rect"]))
+            pacing.sleep(0.1, 0.3)
+            match["locator"].click()
+            return [f"Clicked element with text: {text}"]
+    except Exception as e:
+        logging.debug(f"Text index click failed, probing selectors: {e}")
+    try:
+        # Try different text matching strategies
+        text_strategies = [
+            f"text=\"{text}\"",            # Exact match
+            f"text='{text}'",              # Contains match
+            f"text=/^{text}$/i",           # Case-insensitive exact match
+            f"text=/.*{text}.*/i",         # Case-insensitive contains
+            f"[aria-label*='{text}']",     # Aria label contains
+            f"button:has-text('{text}')",  # Button with text
+            f":text('{text}')"             # Any element with text
+        ]
+        
+        # Probe every strategy in one call; the first visible match wins
+        match = get_element_cache(page).resolve(text_strategies)
+        if match:
+            # Use the probed position for natural mouse movement
+            if match["rect"]:
+                move_mouse_naturally(page, *rect_center(match["rect"]))
+            
+            pacing.sleep(0.1, 0.3)
+            match["locator"].click()
+            return [f"Clicked element with text: {text}"]
+    except Exception as e:
+        logging.error(f"Text click failed: {e}")
+    return []
+
+def click_element(page, match):
+    """
+    Click an element resolved from the element index (see src/dom/element_index.py).
     
-    # Strategy 3: Try iframe handling (many cookie banners are in iframes)
+    :return: List of actions performed (empty on failure)
+    """
+    pacing = get_pacing_policy()
     try:
-        frames = page.frames
-        for frame in frames:
-            if "cookie" in frame.url.lower() or "consent" in frame.url.lower():
-                print(f"Found cookie iframe: {frame.url}")
-                
-                # Try reject first in the iframe
-                frame_reject_selectors = [
-                    "button:has-text('Reject all')",
-                    "button:has-text('Reject')",
-                    "#reject-button"
-                ]
-                
-                for selector in frame_reject_selectors:
-                    try:
-                        if frame.is_visible(selector, timeout=1000):
-                            frame.click(selector)
-                            page.wait_for_timeout(1000)
-                            return True
-                    except:
-                        continue
-                
-                # Then try accept buttons in the iframe
-                frame_accept_selectors = [
-                    "button#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
-                    "button:has-text('Accept all')",
-                    "button:has-text('Allow all')",
-                    ".accept-all"
-                ]
-                
-                for selector in frame_accept_selectors:
-                    try:
-                        if frame.is_visible(selector, timeout=1000):
-                            frame.click(selector)
-                            page.wait_for_timeout(1000)
-                            return True
-                    except:
-                        continue
+        if match["rect"]:
+            move_mouse_naturally(page, *rect_center(match["rect"]))
+        pacing.sleep(0.1, 0.5)
+        match["locator"].click()
+        return [f"Clicked element [{match['id']}] {match['label']}"]
     except Exception as e:
-        print(f"Failed to handle cookie frame: {e}")
+        logging.error(f"Click on element {match.get('id')} failed: {e}")
+    # E.g. an overlay intercepts the pointer: click the indexed element in the page instead
+    try:
+        if call_helper(page, "clickById", {"generation": match["generation"], "id": match["id"]}).get("clicked"):
+            return [f"Clicked element [{match['id']}] {match['label']} via JavaScript"]
+    except Exception as e:
+        logging.error(f"JavaScript click on element {match.get('id')} failed: {e}")
+    return []
+
+def input_text(page, selector, text, submit=False, match=None):
+    """
+    Type text into an input field with human-like typing, optionally submitting it.
+    
+    :param match: Element already resolved from the element index; selector is then its tag selector
+    :return: List of actions performed (empty on failure)
+    """
+    pacing = get_pacing_policy()
+    actions_performed = []
+    target = f"element [{match['id']}] {match['label']}" if match else selector
+    
+    # Special handling for Amazon search
+    if match is None and "amazon" in page.url and (selector == "input[name='q']" or "search" in selector.lower()):
+        # Use the correct Amazon search box selector
+        selector = "input[id='twotabsearchtextbox']"
     
-    # Strategy 4: JavaScript approach - first reject, then accept as fallback
     try:
-        # First try to find and click reject buttons via JavaScript
-        reject_js = """
-        function findAndClickButton(searchTexts) {
-            // Get all buttons
-            const buttons = Array.from(document.querySelectorAll('button, a.button, input[type="button"], div[role="button"]'));
-            
-            // Check each button for text match
-            for (const button of buttons) {
-                const buttonText = button.textContent || button.value || '';
-                for (const searchText of searchTexts) {
-                    if (buttonText.toLowerCase().includes(searchText.toLowerCase()) && 
-                        button.offsetParent !== null) {
-                        button.click();
-                        return true;
-                    }
-                }
-            }
-            return false;
-        }
+        cache = get_element_cache(page)
+        if match is None:
+            match = cache.resolve(selector)
+        if not match:
+            logging.error(f"Input field {selector} not visible")
+            return []
         
-        // Try different reject button texts
-        return findAndClickButton(['reject all', 'reject', 'decline', 'no thanks']);
-        """
+        # Move mouse to input field naturally
+        if match["rect"]:
+            move_mouse_naturally(page, *rect_center(match["rect"]))
         
-        result = page.evaluate(reject_js)
-        if result:
-            print("Successfully clicked reject button via JavaScript")
-            page.wait_for_timeout(1000)
-            return True
-            
-        # If reject fails, try accept buttons
-        accept_js = """
-        function findAndClickButton(searchTexts) {
-            // Get all buttons
-            const buttons = Array.from(document.querySelectorAll('button, a.button, input[type="button"], div[role="button"]'));
-            
-            // Check each button for text match
-            for (const button of buttons) {
-                const buttonText = button.textContent || button.value || '';
-                for (const searchText of searchTexts) {
-                    if (buttonText.toLowerCase().includes(searchText.toLowerCase()) && 
-                        button.offsetParent !== null) {
-                        button.click();
-                        return true;
-                    }
-                }
-            }
-            return false;
-        }
+        locator = match["locator"]
+        locator.click()
+        
+        # Clear field
+        locator.fill("")
         
-        // Try different common accept button texts
-        return findAndClickButton(['allow all', 'accept all', 'accept cookies', 'agree', 'accept']);
-        """
+        # Type with human-like delays
+        pacing.type_text(locator, text, max_delay_ms=200, pause=(0.01, 0.05))
         
-        result = page.evaluate(accept_js)
-        if result:
-            print("Successfully clicked accept button via JavaScript")
-            page.wait_for_timeout(1000)
-            return True
+        actions_performed.append(f"Typed '{text}' into {target}")
+        
+        if submit:
+            # Pause before pressing Enter
+            pacing.sleep(0.5, 1.5)
+            # Amazon has a dedicated submit button next to its search box
+            submit_match = cache.resolve("input[id='nav-search-submit-button']") if "amazon" in page.url else None
+            if submit_match:
+                submit_match["locator"].click()
+            else:
+                locator.press("Enter")
+            actions_performed.append("Pressed Enter to submit")
+            wait_until_settled(page)
     except Exception as e:
-        print(f"JavaScript cookie handling failed: {e}")
+        logging.error(f"Input action failed: {e}")
+    return actions_performed
+
+def scroll_page(page, direction="down", amount=300):
+    """
+    Scroll the page in small, variable chunks like a human would.
     
-    # Strategy 5: Click at positions where cookie buttons typically appear
+    :return: List of actions performed (empty on failure)
+    """
+    pacing = get_pacing_policy()
     try:
-        # Common positions for buttons (percentages of viewport)
-        width = page.viewport_size["width"]
-        height = page.viewport_size["height"]
-        
-        # Common positions for Reject buttons (usually on the left side)
-        reject_positions = [
-            (width * 0.25, height * 0.9),  # Bottom left
-            (width * 0.35, height * 0.9)   # Bottom left-center
-        ]
-        
-        for x, y in reject_positions:
-            try:
-                page.mouse.click(x, y)
-                print(f"Attempted click at position x={x}, y={y} (reject)")
-                page.wait_for_timeout(1000)
-                
-                # Check if banner is still visible
-                ocr_text = " ".join([item.get('text', '').lower() for item in OCRProcessor().process_image(capture_screenshot(page))])
-                if "cookie" not in ocr_text and "consent" not in ocr_text:
-                    print("Banner appears to be gone after position click")
-                    return True
-            except:
-                continue
+        # Make scrolling more natural with variable speed
+        total_scroll = 0
+        target_amount = amount
         
-        # Common positions for Accept buttons (usually on the right side)
-        accept_positions = [
-            (width * 0.85, height * 0.9),  # Bottom right
-            (width * 0.75, height * 0.9),  # Bottom right-center
-            (width * 0.65, height * 0.9)   # Bottom center-right
-        ]
+        # Break scrolling into smaller, variable chunks
+        while total_scroll < target_amount:
+            # Variable chunk size; without human pacing scroll in one step
+            if pacing.scale == 0:
+                chunk = target_amount - total_scroll
+            else:
+                chunk = min(pacing.randint(50, 120), target_amount - total_scroll)
+            total_scroll += chunk
+            
+            if direction == "down":
+                call_helper(page, "scroll", {"dy": chunk})
+            elif direction == "up":
+                call_helper(page, "scroll", {"dy": -chunk})
+            
+            # Variable pause between scroll chunks
+            pacing.sleep(0.03, 0.10)
         
-        for x, y in accept_positions:
-            try:
-                page.mouse.click(x, y)
-                print(f"Attempted click at position x={x}, y={y} (accept)")
-                page.wait_for_timeout(1000)
-                
-                # Check if banner is still visible
-                ocr_text = " ".join([item.get('text', '').lower() for item in OCRProcessor().process_image(capture_screenshot(page))])
-                if "cookie" not in ocr_text and "consent" not in ocr_text:
-                    print("Banner appears to be gone after position click")
-                    return True
-            except:
-                continue
+        return [f"Scrolled {direction} {amount} pixels"]
     except Exception as e:
-        print(f"Position-based cookie handling failed: {e}")
+        logging.error(f"Scroll failed: {e}")
+        return []
+
+def execute_actions(page, ai_response: str):
+    """
+    Execute actions from AI response with enhanced human-like behavior
+    
+    :param page: A Playwright page instance
+    :param ai_response: The AI-generated response
+    :return: List of actions performed
+    """
+    from src.automation.command_pipeline import CommandPipeline
+    
+    commands_data = extract_json(ai_response)
+    if commands_data is None:
+        logging.error("Failed to extract commands from AI response.")
+        return []
     
-    print("All cookie banner handling strategies failed")
-    return False
+    if "analysis" in commands_data:
+        logging.info("AI Analysis: %s", commands_data["analysis"])
+    
+    return CommandPipeline(page).run(commands_data.get("commands", []))
+
+def handle_cookie_banner(page):
+    """
+    Dismiss the page's cookie banner, preferring reject over accept.
+    Runs the page's consent engine (see src/handlers/consent_engine.py).
+    Returns True if a banner was dismissed, False otherwise.
+    """
+    result = dismiss_consent(page)
+    if result["dismissed"]:
+        print(f"Cookie banner dismissed via '{result['strategy']}' ({result['elapsed_ms']} ms)")
+    return result["dismissed"]
 
 def find_natural_search_results(page):
     """Find natural (non-sponsored) search result links"""
     try:
         # Try to identify natural results while avoiding ads
-        natural_selectors = [
-            "div:not([data-text-ad]) a[ping]",
-            ".g:not(.ads-ad) a[href]",
-            "#search a[href]:not([data-jsarwt])",
-            "h3[class*='LC20lb']" # Google's organic result heading class
-        ]
-        
-        for selector in natural_selectors:
+        from src.browser.prefetcher import NATURAL_RESULT_SELECTORS
+        for selector in NATURAL_RESULT_SELECTORS:
             try:
                 # Get all natural results
                 links = page.query_selector_all(selector)
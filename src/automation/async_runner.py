@@ -0,0 +1,356 @@
+# File: src/automation/async_runner.py
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from playwright.async_api import async_playwright
+from src.automation.playwright_controller import BROWSER_ARGS, STEALTH_JS, find_chrome_executable
+from src.browser.settle import async_wait_until_settled, track_network
+from src.browser.asset_cache import asset_cache_from_env
+from src.browser.request_filter import request_filter_from_env
+from src.browser.profile_manager import storage_state_from_env
+from src.dom.element_cache import get_element_cache
+from src.dom.selector_probe import rect_center
+from src.automation.cursor import get_cursor_position, natural_path, dispatch_path_async
+from src.utils.pacing import get_pacing_policy
+from src.utils.cookie_captcha_handler import handle_cookie_captcha
+from src.utils.dom_utils import extract_dom_context
+from src.dom.page_snapshot import invalidate_snapshot
+from src.dom.element_index import async_index_page, async_resolve_element
+from src.dom.page_helpers import async_install_helpers
+from src.vision.accessibility_perception import Perception
+
+# Keep timers and rendering running in tabs that are not in the foreground;
+# otherwise every page but the visible one stalls.
+CONCURRENT_BROWSER_ARGS = BROWSER_ARGS + [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+
+class TaskState:
+    """Per-page state for one goal driven by the async runner."""
+
+    def __init__(self, task_id, goal):
+        self.task_id = task_id
+        self.goal = goal
+        self.status = "pending"          # pending, running, completed, failed, exhausted
+        self.current_state = "Starting browser automation"
+        self.iteration = 0
+        self.actions_taken = []
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.timings = {"vision": 0.0, "reasoning": 0.0, "actions": 0.0}
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "goal": self.goal,
+            "status": self.status,
+            "final_state": self.current_state,
+            "iterations": self.iteration,
+            "actions_taken": self.actions_taken,
+            "error": self.error,
+            "duration_seconds": round(self.duration, 2),
+            "timings": {key: round(value, 2) for key, value in self.timings.items()},
+        }
+
+
+class AsyncAgentRunner:
+    """
+    Drives many independent goals concurrently, one page per goal, in a
+    single browser on the async Playwright API.
+
+    Browser work (screenshots, clicks, typing, waits) is awaited on the event
+    loop so pages interleave. The vision models run on one worker thread
+    (they are loaded once and are not thread-safe) and reasoning requests on
+    a thread pool, so a slow model or API call never blocks the other pages.
+    """
+
+    def __init__(self, max_concurrency=4, max_iterations=20, headless=False,
+                 isolate_contexts=True, viewport=None):
+        """
+        Args:
+            max_concurrency: Maximum number of goals driven at the same time
+            max_iterations: Iteration limit per goal
+            headless: Whether to run the browser headless
+            isolate_contexts: Give every goal its own context (cookies, storage)
+                              instead of a tab in one shared context
+            viewport: Viewport for every page (defaults to 1920x1080)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_iterations = max_iterations
+        self.headless = headless
+        self.isolate_contexts = isolate_contexts
+        self.viewport = viewport or {"width": 1920, "height": 1080}
+        self.vision_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision")
+        self.reasoning_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="reasoning")
+        # Page model per iteration: screenshot vision, or the accessibility tree (AGENT_PERCEPTION)
+        self.perception = Perception()
+        self.metadata_gen = None
+        self.request_filter = request_filter_from_env()
+        self.asset_cache = asset_cache_from_env()
+        # Saved cookies/localStorage (AGENT_STORAGE_STATE) so every context starts logged in
+        self.storage_state = storage_state_from_env()
+        self.states = []
+
+    # ---- Models (loaded once, used from the vision thread) ----
+
+    def _load_models(self):
+        from src.metadata.metadata_generator import MetadataGenerator
+        # In accessibility mode the vision models load on the first fallback instead
+        if self.perception.mode == "vision":
+            self.perception.load_vision_models()
+        self.metadata_gen = MetadataGenerator()
+
+    def _analyze_screenshot(self, screenshot_path):
+        return self.metadata_gen.generate_metadata(*self.perception.analyze_screenshot(screenshot_path))
+
+    async def _in_executor(self, executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    # ---- Commands ----
+
+    async def _move_to(self, page, match):
+        if match and match.get("rect"):
+            path = natural_path(get_cursor_position(page), rect_center(match["rect"]))
+            await dispatch_path_async(page, path)
+
+    async def _execute_command(self, page, cmd):
+        """Execute one AI command on an async page. Returns the actions performed."""
+        pacing = get_pacing_policy()
+        cache = get_element_cache(page)
+        action = cmd.get("action")
+
+        if action == "navigate" and cmd.get("url"):
+            await page.goto(cmd["url"], wait_until="domcontentloaded")
+            await async_wait_until_settled(page)
+            return [f"Navigated to {cmd['url']}"]
+
+        if action == "click":
+            selector, text = cmd.get("selector"), cmd.get("text")
+            candidates = [selector] if selector else []
+            if text:
+                candidates += [f"text=\"{text}\"", f"button:has-text('{text}')", f":text('{text}')"]
+            if cmd.get("id") is not None:
+                match = await async_resolve_element(page, cmd["id"])
+            else:
+                match = await cache.async_resolve(candidates) if candidates else None
+            if not match:
+                return []
+            await self._move_to(page, match)
+            await pacing.async_sleep(0.1, 0.5)
+            await match["locator"].click()
+            await async_wait_until_settled(page, timeout_ms=3000)
+            return [f"Clicked {match.get('label') or match['selector']}"]
+
+        if action == "input" and (cmd.get("selector") or cmd.get("id") is not None):
+            if cmd.get("id") is not None:
+                match = await async_resolve_element(page, cmd["id"])
+            else:
+                match = await cache.async_resolve(cmd["selector"])
+            if not match:
+                return []
+            text = cmd.get("text", "")
+            await self._move_to(page, match)
+            await match["locator"].click()
+            await match["locator"].fill("")
+            if pacing.per_char_typing and not pacing.exhausted:
+                await match["locator"].type(text, delay=pacing.delay_ms(50, 200))
+            else:
+                await match["locator"].fill(text)
+            performed = [f"Typed '{text}' into {cmd.get('selector') or match['label']}"]
+            if cmd.get("submit"):
+                await pacing.async_sleep(0.5, 1.5)
+                await match["locator"].press("Enter")
+                await async_wait_until_settled(page)
+                performed.append("Pressed Enter to submit")
+            return performed
+
+        if action == "scroll":
+            amount = cmd.get("amount", 300)
+            await page.mouse.wheel(0, amount if cmd.get("direction", "down") == "down" else -amount)
+            return [f"Scrolled {cmd.get('direction', 'down')} {amount} pixels"]
+
+        logging.error(f"Unsupported command for async runner: {cmd}")
+        return []
+
+    # ---- Per-goal loop ----
+
+    async def _run_goal(self, page, state):
+        from src.reasoning.deepseek_reasoner import DeepSeekReasoner
+        from src.feedback.feedback_loop import parse_ai_commands
+
+        pacing = get_pacing_policy()
+        # One reasoner per goal: it keeps the conversation history for its task
+        reasoner = await self._in_executor(self.reasoning_executor, DeepSeekReasoner)
+        screenshot_dir = tempfile.mkdtemp(prefix=f"agent_task_{state.task_id}_")
+
+        for iteration in range(1, self.max_iterations + 1):
+            state.iteration = iteration
+            invalidate_snapshot(page)  # the previous iteration's commands changed the page
+            if iteration > 1:
+                await pacing.async_sleep(1.0, 3.0)
+
+            try:
+                await handle_cookie_captcha(page)
+            except Exception as e:
+                logging.debug(f"[task {state.task_id}] Cookie/captcha handling failed: {e}")
+
+            start = time.perf_counter()
+            page_model = None
+            if self.perception.mode == "accessibility":
+                page_model = await self.perception.async_perceive_accessibility(page)
+            if page_model is not None:
+                metadata = self.metadata_gen.generate_metadata(*page_model)
+            else:
+                screenshot_path = os.path.join(screenshot_dir, f"iteration_{iteration}.png")
+                await page.screenshot(path=screenshot_path)
+                metadata = await self._in_executor(self.vision_executor, self._analyze_screenshot, screenshot_path)
+            dom_context = await extract_dom_context(page)
+            try:
+                dom_data = dict(dom_context.get("elementCounts") or {},
+                                element_index=(await async_index_page(page)).prompt_text())
+            except Exception as e:
+                logging.debug(f"[task {state.task_id}] Could not index interactive elements: {e}")
+                dom_data = dom_context.get("elementCounts")
+            state.timings["vision"] += time.perf_counter() - start
+
+            context_message = (f"GOAL: {state.goal}\nCURRENT URL: {page.url}\n"
+                               f"CURRENT STATE: {state.current_state}\nITERATION: {iteration}/{self.max_iterations}")
+            start = time.perf_counter()
+            ai_response = await self._in_executor(
+                self.reasoning_executor, reasoner.get_response, context_message, metadata, dom_data
+            )
+            state.timings["reasoning"] += time.perf_counter() - start
+
+            response_json = parse_ai_commands(ai_response)
+            start = time.perf_counter()
+            for cmd in response_json.get("commands", []):
+                try:
+                    state.actions_taken.extend(await self._execute_command(page, cmd))
+                except Exception as e:
+                    logging.error(f"[task {state.task_id}] Command {cmd} failed: {e}")
+                await pacing.async_sleep(0.3, 1.0)
+            state.timings["actions"] += time.perf_counter() - start
+
+            if response_json.get("state"):
+                state.current_state = response_json["state"]
+            if response_json.get("complete") is True:
+                state.status = "completed"
+                return
+        state.status = "exhausted"
+
+    async def _new_context(self, browser):
+        options = {"viewport": self.viewport}
+        if self.storage_state:
+            options["storage_state"] = self.storage_state
+        context = await browser.new_context(**options)
+        await self._prepare_context(context)
+        return context
+
+    async def _prepare_context(self, context):
+        await context.add_init_script(STEALTH_JS)
+        await async_install_helpers(context)
+        track_network(context)
+        if self.asset_cache:
+            await self.asset_cache.async_attach(context)
+        if self.request_filter:
+            await self.request_filter.async_attach(context)
+
+    async def _run_task(self, browser, shared_context, semaphore, state):
+        async with semaphore:
+            state.status = "running"
+            state.started_at = time.perf_counter()
+            context = shared_context
+            page = None
+            try:
+                if context is None:
+                    context = await self._new_context(browser)
+                page = await context.new_page()
+                await self._run_goal(page, state)
+            except Exception as e:
+                logging.error(f"[task {state.task_id}] Failed: {e}")
+                state.status = "failed"
+                state.error = str(e)
+            finally:
+                state.finished_at = time.perf_counter()
+                try:
+                    if context is not shared_context:
+                        await context.close()
+                    elif page is not None:
+                        await page.close()
+                except Exception as e:
+                    logging.debug(f"[task {state.task_id}] Cleanup failed: {e}")
+                print(f"[task {state.task_id}] {state.status} in {state.duration:.1f}s: {state.goal}")
+
+    async def run(self, goals):
+        """
+        Drive every goal to completion (or its iteration limit), at most
+        max_concurrency at a time.
+
+        Returns:
+            list: One result dict per goal, in input order
+        """
+        self.states = [TaskState(index + 1, goal) for index, goal in enumerate(goals)]
+        start = time.perf_counter()
+        await self._in_executor(self.vision_executor, self._load_models)
+
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(
+                headless=self.headless,
+                executable_path=find_chrome_executable(),
+                args=CONCURRENT_BROWSER_ARGS
+            )
+            shared_context = None
+            if not self.isolate_contexts:
+                shared_context = await self._new_context(browser)
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            try:
+                await asyncio.gather(*(self._run_task(browser, shared_context, semaphore, state)
+                                       for state in self.states))
+            finally:
+                await browser.close()
+
+        elapsed = time.perf_counter() - start
+        completed = sum(1 for state in self.states if state.status == "completed")
+        print(f"\n=== Runner Summary: {completed}/{len(self.states)} goals completed in {elapsed:.1f}s "
+              f"({len(self.states) / elapsed * 60:.1f} goals/min, concurrency {self.max_concurrency}) ===")
+        if self.request_filter:
+            print(f"Request filter: {self.request_filter.summary()}")
+        if self.asset_cache:
+            print(f"Asset cache: {self.asset_cache.summary()}")
+        print(f"Perception: {self.perception.summary()}")
+        self.vision_executor.shutdown(wait=False)
+        self.reasoning_executor.shutdown(wait=False)
+        return [state.to_dict() for state in self.states]
+
+
+def run_goals(goals, max_concurrency=4, max_iterations=20, headless=False, isolate_contexts=True):
+    """Synchronous entry point: run the goals concurrently and return their results."""
+    runner = AsyncAgentRunner(max_concurrency=max_concurrency, max_iterations=max_iterations,
+                              headless=headless, isolate_contexts=isolate_contexts)
+    return asyncio.run(runner.run(goals))
+
+
+# Example usage: python -m src.automation.async_runner "Find a good pizza recipe" "Search for iPhone 16 Pro on Amazon"
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    goals = sys.argv[1:] or [line.strip() for line in sys.stdin if line.strip()]
+    concurrency = int(os.getenv("AGENT_CONCURRENCY", "4"))
+    for result in run_goals(goals, max_concurrency=concurrency):
+        print(result)
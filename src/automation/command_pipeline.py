@@ -0,0 +1,332 @@
+# File: src/automation/command_pipeline.py
+
+import logging
+import time
+
+from src.command_registry import CommandRegistry, CommandSchema
+from src.utils.pacing import get_pacing_policy
+from src.utils.startup import get_startup_profiler
+from src.browser.settle import wait_until_settled
+from src.browser.tab_cache import get_tab_cache
+from src.dom.element_cache import get_element_cache
+from src.dom.page_snapshot import invalidate_snapshot
+from src.dom.element_index import get_element_index, durable_selector, element_label
+from src.automation.action_executor import (
+    navigate_to,
+    click_consent_button,
+    click_element,
+    click_selector,
+    click_text,
+    input_text,
+    scroll_page,
+    simulate_human_mouse_movement,
+)
+
+# Fragments of an input command's selector that mark it as a search box,
+# making the flexible search handler a sensible fallback when typing fails
+SEARCH_HINTS = ("search", "'q'", '"q"', "query")
+
+
+def normalize_command(command):
+    """
+    Convert an AI command into the CommandSchema shape.
+
+    The AI emits flat commands ({"action": "click", "selector": "..."}) while
+    CommandSchema keeps arguments under "parameters"; both shapes are accepted.
+    """
+    if not isinstance(command, dict):
+        return {"action": None}
+    if "parameters" in command:
+        return command
+    return {
+        "action": command.get("action"),
+        "parameters": {key: value for key, value in command.items() if key != "action"},
+    }
+
+
+class CommandPipeline:
+    """
+    Executes AI commands exactly once per iteration.
+
+    Each command is validated once through the CommandRegistry, dispatched to
+    the single handler registered for its action, and timed. Fallbacks are
+    explicit and only run when the primary handler fails:
+        click - selector or element id failed and the command also has text: click by text
+        input - typing failed on a search-like field: use the SearchHandler
+    """
+
+    def __init__(self, page, search_handler=None, prefetcher=None):
+        """
+        Args:
+            page: Playwright page the commands act on. It is a plain attribute so
+                  callers can point the pipeline at a different tab.
+            search_handler: Optional SearchHandler used by the input fallback
+            prefetcher: Optional Prefetcher whose tabs are used for matching
+                        navigations and link clicks
+        """
+        self.page = page
+        self.search_handler = search_handler
+        self.prefetcher = prefetcher
+        self.registry = CommandRegistry()
+        self.registry.register("navigate", self._navigate)
+        self.registry.register("click", self._click)
+        self.registry.register("input", self._input)
+        self.registry.register("scroll", self._scroll)
+        self.registry.register("done", self._done)
+        self.fallbacks = {
+            "click": self._click_fallback,
+            "input": self._input_fallback,
+        }
+
+        # Per-run state
+        self.actions = []
+        self.ocr_results = []
+        self.done = False
+        self.commands_run = 0
+
+        # Outcome of every executed command across the session
+        self.history = []
+
+    # ---- Handlers (CommandSchema -> bool); they append descriptions to self.actions ----
+
+    def _record_actions(self, performed):
+        self.actions.extend(performed)
+        return bool(performed)
+
+    def _use_prefetched(self, page, url):
+        self.page = page
+        return self._record_actions([f"Switched to prefetched tab {url}"])
+
+    def _navigate(self, command: CommandSchema):
+        url = command.parameters.get("url")
+        prefetched = self.prefetcher.claim(url) if self.prefetcher and url else None
+        if prefetched:
+            return self._use_prefetched(prefetched, url)
+        tabs = get_tab_cache(self.page.context)
+        if not url or not tabs.enabled:
+            return self._record_actions(navigate_to(self.page, url))
+        # Keep the current page alive as a background tab; a URL that is
+        # still open in one is a tab switch. self.page follows the active tab.
+        try:
+            self.page, reused = tabs.navigate(self.page, url)
+        except Exception as e:
+            logging.error(f"Navigation failed: {e}")
+            return False
+        if reused:
+            return self._record_actions([f"Switched to open tab {url}"])
+        wait_until_settled(self.page)
+        return self._record_actions([f"Navigated to {url}"])
+
+    def _resolve_id(self, command: CommandSchema):
+        """
+        Resolve the element id of a click/input command through the element
+        index the reasoner was shown. The element's durable selector (and,
+        for clicks, its label) are added to the command so fallbacks and the
+        trajectory cache have something that outlives the id.
+        """
+        element_id = command.parameters.get("id")
+        index = get_element_index(self.page)
+        element = index.get(element_id) if index else None
+        if element is None:
+            logging.error(f"Element id {element_id} is not in the current element index")
+            return None
+        selector = durable_selector(element)
+        if selector:
+            command.parameters.setdefault("selector", selector)
+        if command.action == "click" and element_label(element):
+            command.parameters.setdefault("text", element_label(element))
+        return index.resolve(self.page, element_id)
+
+    def _click(self, command: CommandSchema):
+        if command.parameters.get("id") is not None:
+            match = self._resolve_id(command)
+            if not match:
+                return False
+            prefetched = self.prefetcher.claim_link(self.page, match["locator"]) if self.prefetcher else None
+            if prefetched:
+                return self._use_prefetched(prefetched, prefetched.url)
+            return self._record_actions(click_element(self.page, match))
+        selector = command.parameters.get("selector")
+        text = command.parameters.get("text")
+        # Consent buttons have their own ranked selectors and a JavaScript fallback
+        if text and ("accept" in text.lower() or "agree" in text.lower()):
+            return self._record_actions(click_consent_button(self.page, text))
+        if selector and self.prefetcher and self.prefetcher.pending:
+            # A click on a result link whose page is already loading in the background
+            match = get_element_cache(self.page).resolve(selector)
+            prefetched = self.prefetcher.claim_link(self.page, match["locator"]) if match else None
+            if prefetched:
+                return self._use_prefetched(prefetched, prefetched.url)
+        if selector:
+            return self._record_actions(click_selector(self.page, selector))
+        if text:
+            return self._record_actions(click_text(self.page, text))
+        logging.error("Click command has neither selector nor text")
+        return False
+
+    def _input(self, command: CommandSchema):
+        if command.parameters.get("id") is not None:
+            match = self._resolve_id(command)
+            if not match:
+                return False
+            return self._record_actions(input_text(
+                self.page,
+                match["selector"],
+                command.parameters.get("text", ""),
+                command.parameters.get("submit", False),
+                match=match,
+            ))
+        selector = command.parameters.get("selector")
+        if not selector:
+            logging.error("Input command has no selector")
+            return False
+        return self._record_actions(input_text(
+            self.page,
+            selector,
+            command.parameters.get("text", ""),
+            command.parameters.get("submit", False),
+        ))
+
+    def _scroll(self, command: CommandSchema):
+        return self._record_actions(scroll_page(
+            self.page,
+            command.parameters.get("direction", "down"),
+            command.parameters.get("amount", 300),
+        ))
+
+    def _done(self, command: CommandSchema):
+        self.done = True
+        self.actions.append("Marked task as done")
+        return True
+
+    # ---- Fallbacks, only used after the primary handler failed ----
+
+    def _click_fallback(self, command: CommandSchema):
+        text = command.parameters.get("text")
+        if not (command.parameters.get("selector") or command.parameters.get("id") is not None) or not text:
+            return False
+        logging.info(f"Selector click failed, falling back to clicking text '{text}'")
+        return self._record_actions(click_text(self.page, text))
+
+    def _input_fallback(self, command: CommandSchema):
+        text = command.parameters.get("text", "")
+        selector = (command.parameters.get("selector") or "").lower()
+        if self.search_handler is None or not text:
+            return False
+        if not any(hint in selector for hint in SEARCH_HINTS):
+            return False
+        logging.info(f"Input failed on {selector}, falling back to the flexible search handler")
+        if self.search_handler.perform_search(self.page, text, self.ocr_results):
+            self.actions.append(f"Searched for '{text}' using flexible search handler")
+            return True
+        return False
+
+    # ---- Execution ----
+
+    def execute(self, command_data):
+        """
+        Validate, dispatch and time a single command.
+
+        Returns:
+            dict: Outcome with action, parameters, status ("ok", "fallback", "failed",
+                  "invalid"), latency_ms, the actions it performed and the page URL after it
+        """
+        start = time.perf_counter()
+        performed_before = len(self.actions)
+        command = self.registry.validate(normalize_command(command_data))
+
+        if command is None:
+            status = "invalid"
+        elif command.action not in self.registry.registry:
+            logging.error(f"No handler registered for action: {command.action}")
+            status = "invalid"
+        else:
+            try:
+                ok = self.registry.dispatch(command)
+            except Exception as e:
+                logging.error(f"Command '{command.action}' raised: {e}")
+                ok = False
+            status = "ok"
+            if not ok:
+                status = "failed"
+                fallback = self.fallbacks.get(command.action)
+                try:
+                    if fallback and fallback(command):
+                        status = "fallback"
+                except Exception as e:
+                    logging.error(f"Fallback for '{command.action}' raised: {e}")
+
+        outcome = {
+            "action": command.action if command else None,
+            "parameters": dict(command.parameters) if command else {},
+            "status": status,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "actions": self.actions[performed_before:],
+            "url": self._current_url(),
+        }
+        self.history.append(outcome)
+        if outcome["actions"]:
+            # The page changed; the next DOM read needs a fresh snapshot
+            invalidate_snapshot(self.page)
+        logging.info("Command %s -> %s in %.1fms", outcome["action"], status, outcome["latency_ms"])
+        if status in ("ok", "fallback") and outcome["actions"]:
+            get_startup_profiler().mark("first_action")
+        return outcome
+
+    def _current_url(self):
+        try:
+            return self.page.url
+        except Exception:
+            return None
+
+    def run(self, commands, ocr_results=None):
+        """
+        Execute a list of AI commands once each, in order.
+
+        Args:
+            commands: Commands from the AI response
+            ocr_results: OCR results of the current screenshot, for the search fallback
+
+        Returns:
+            list: Descriptions of the actions performed
+        """
+        pacing = get_pacing_policy()
+        self.actions = []
+        self.ocr_results = ocr_results or []
+        self.done = False
+        self.commands_run = 0
+
+        for command_data in commands or []:
+            # Add human-like delay and mouse movement between actions
+            delay = pacing.sleep(0.5, 2.0)
+            logging.info(f"Added human-like delay of {delay:.1f} seconds")
+            simulate_human_mouse_movement(self.page)
+
+            self.execute(command_data)
+            self.commands_run += 1
+            if self.done:
+                break
+
+            # Wait after each action with a variable delay
+            pacing.sleep(0.3, 1.0)
+
+        return self.actions
+
+    @property
+    def last_run_failed(self):
+        """True if the last run had commands and none of them succeeded."""
+        return self.commands_run > 0 and not self.actions and not self.done
+
+    def summary(self):
+        """Return per-action counts and latency for every command executed so far."""
+        by_action = {}
+        for outcome in self.history:
+            stats = by_action.setdefault(outcome["action"], {"count": 0, "ok": 0, "fallback": 0,
+                                                             "failed": 0, "invalid": 0, "total_ms": 0.0})
+            stats["count"] += 1
+            stats[outcome["status"]] += 1
+            stats["total_ms"] += outcome["latency_ms"]
+        for stats in by_action.values():
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 1)
+            stats["total_ms"] = round(stats["total_ms"], 1)
+        return {"commands": len(self.history), "by_action": by_action}
@@ -0,0 +1,124 @@
+# File: src/automation/cursor.py
+
+import asyncio
+import logging
+import weakref
+
+import numpy as np
+
+from src.utils.pacing import get_pacing_policy
+
+DEFAULT_POSITION = (100.0, 100.0)
+
+# A path is replayed by the sync API as this many driver-side moves; Playwright
+# interpolates the points in between without further round trips
+PATH_SEGMENTS = 4
+
+# Last known cursor position and CDP session per page, tracked on the Python side
+# so we never have to ask the page where the mouse is.
+_positions = weakref.WeakKeyDictionary()
+_cdp_sessions = weakref.WeakKeyDictionary()
+
+
+def get_cursor_position(page):
+    """Return the last position the agent moved the mouse to on this page."""
+    return _positions.get(page, DEFAULT_POSITION)
+
+
+def set_cursor_position(page, x, y):
+    """Record a mouse position for the page (call after any direct page.mouse use)."""
+    _positions[page] = (float(x), float(y))
+
+
+def bezier_path(start, end, steps, control):
+    """
+    Compute a quadratic Bezier path from start to end in one vectorized step.
+
+    Args:
+        start: (x, y) start point
+        end: (x, y) end point
+        steps: Number of segments; the path has steps + 1 points
+        control: (x, y) control point that bends the curve
+
+    Returns:
+        numpy.ndarray: Array of shape (steps + 1, 2) with the path points
+    """
+    t = np.linspace(0.0, 1.0, steps + 1)[:, None]
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    control = np.asarray(control, dtype=float)
+    return (1 - t) ** 2 * start + 2 * (1 - t) * t * control + t ** 2 * end
+
+
+def natural_path(start, end, pacing=None):
+    """
+    Build a human-looking curved path between two points.
+    Longer distances get more points; the curve bend comes from the pacing RNG.
+    """
+    pacing = pacing or get_pacing_policy()
+    distance = float(np.hypot(end[0] - start[0], end[1] - start[1]))
+    steps = max(5, int(distance / 30))
+    control = (
+        (start[0] + end[0]) / 2 + pacing.randint(-100, 100),
+        (start[1] + end[1]) / 2 + pacing.randint(-100, 100),
+    )
+    return bezier_path(start, end, steps, control)
+
+
+def _mouse_move_events(points):
+    return [{"type": "mouseMoved", "x": float(x), "y": float(y)} for x, y in points]
+
+
+def path_waypoints(points, segments=PATH_SEGMENTS):
+    """
+    Reduce a path to at most `segments` waypoints along it.
+
+    Returns:
+        list: (x, y, steps) per waypoint, where steps is the number of path
+              points the segment ending there covers
+    """
+    last = len(points) - 1
+    if last <= 0:
+        return [(float(x), float(y), 1) for x, y in points]
+    indices = sorted(set(np.linspace(0, last, min(segments, last) + 1).round().astype(int)))
+    return [(float(points[end][0]), float(points[end][1]), int(end - begin))
+            for begin, end in zip(indices, indices[1:])]
+
+
+def dispatch_path(page, points):
+    """
+    Replay a mouse path as a few driver-side page.mouse.move(..., steps=n)
+    calls, one per waypoint (see path_waypoints()). The driver generates the
+    intermediate mouse events itself, so the whole path costs PATH_SEGMENTS
+    round trips from Python instead of one per point; the curve is followed
+    piecewise-linearly between the waypoints.
+    """
+    if len(points) == 0:
+        return
+
+    for x, y, steps in path_waypoints(points):
+        page.mouse.move(x, y, steps=steps)
+
+    set_cursor_position(page, *points[-1])
+
+
+async def dispatch_path_async(page, points):
+    """Async counterpart of dispatch_path() for async Playwright pages."""
+    if len(points) == 0:
+        return
+
+    if page not in _cdp_sessions:
+        try:
+            _cdp_sessions[page] = await page.context.new_cdp_session(page)
+        except Exception as e:
+            logging.debug(f"CDP session unavailable, falling back to page.mouse: {e}")
+            _cdp_sessions[page] = None
+
+    session = _cdp_sessions[page]
+    if session is None:
+        for x, y in points:
+            await page.mouse.move(float(x), float(y))
+    else:
+        await asyncio.gather(*(session.send("Input.dispatchMouseEvent", event) for event in _mouse_move_events(points)))
+
+    set_cursor_position(page, *points[-1])
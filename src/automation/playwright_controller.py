@@ -4,15 +4,106 @@ import os
 import random
 import shutil
 import tempfile
-import time
 import logging
 import asyncio
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
+from src.browser.settle import async_wait_until_settled, track_network
+from src.dom.page_helpers import install_helpers
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Arguments every agent-launched Chrome gets
+BROWSER_ARGS = [
+    "--start-maximized",
+    "--window-size=1920,1080",
+    "--disable-blink-features=AutomationControlled"  # Critical for avoiding detection
+]
+
+# Init script that hides automation markers; install per page or per context
+STEALTH_JS = """
+    // Override webdriver property
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => false,
+    });
+    
+    // Override Chrome's automation property
+    window.navigator.chrome = {
+        runtime: {},
+    };
+    
+    // Modify plugins to look like regular browser
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+    
+    // Modify languages
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en'],
+    });
+    
+    // Prevent detection via permissions
+    if (window.navigator.permissions) {
+        const originalQuery = window.navigator.permissions.query;
+        window.navigator.permissions.query = (parameters) => (
+            parameters.name === 'notifications'
+                ? Promise.resolve({ state: Notification.permission })
+                : originalQuery(parameters)
+        );
+    }
+    
+    // Hide automation-specific Chrome DevTools Protocol (CDP)
+    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+    
+    // Set a consistent user agent
+    Object.defineProperty(navigator, 'userAgent', {
+        get: () => 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    });
+"""
+
+
+def find_chrome_executable():
+    """Return the installed Chrome executable, or None to let Playwright pick its Chromium."""
+    chrome_executable_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+    if not os.path.exists(chrome_executable_path):
+        print("Chrome executable not found at expected path, using auto-detection")
+        return None
+    return chrome_executable_path
+
+
+def domain_matches(domain: str, patterns) -> bool:
+    """True if the domain equals one of the patterns or is a subdomain of one."""
+    domain = domain.lower()
+    return any(
+        domain == pattern.lower() or domain.endswith('.' + pattern.lower())
+        for pattern in patterns
+    )
+
+
+def is_url_allowed(url: str, allowed_domains: list | None = None) -> bool:
+    """Check if a URL is allowed based on the allowlist configuration."""
+    if not allowed_domains:
+        return True
+
+    try:
+        from urllib.parse import urlparse
+        parsed_url = urlparse(url)
+        domain = parsed_url.netloc.lower()
+
+        # Remove port number if present
+        if ':' in domain:
+            domain = domain.split(':')[0]
+
+        # Check if domain matches any allowed domain pattern
+        return domain_matches(domain, allowed_domains)
+    except Exception as e:
+        logging.error(f'Error checking URL allowlist: {str(e)}')
+        return False
+
+
 class PlaywrightConfig:
     """Configuration for the Playwright browser controller."""
     def __init__(
@@ -50,6 +141,9 @@ class PlaywrightController:
         self.navigation_history = None
         self.browser_context = None
         self.playwright = None
+        self.request_filter = None
+        self.asset_cache = None
+        self.tabs = None
 
     def initialize_navigation_history(self):
         """Initialize navigation history tracking for the browser session."""
@@ -59,6 +153,15 @@ class PlaywrightController:
             "max_history": 100  # Maximum number of URLs to keep in history
         }
 
+    def get_navigation_history(self):
+        """
+        Return the navigation history with each entry marked live if a
+        background tab still shows it (going back to it is a tab switch).
+        """
+        return [{"url": url, "live": bool(self.tabs and self.tabs.is_live(url)),
+                 "current": index == self.navigation_history["current_index"]}
+                for index, url in enumerate(self.navigation_history["urls"])]
+
     def add_to_navigation_history(self, url):
         """Add a URL to navigation history."""
         # If we've gone back and now navigate somewhere new, truncate forward history
@@ -95,7 +198,14 @@ class PlaywrightController:
         
         while retries <= max_retries:
             try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                if self.tabs:
+                    # Revisits switch to the still-open tab; new URLs open in a new one
+                    page, reused = await self.tabs.async_navigate(page, url)
+                    if reused:
+                        self.add_to_navigation_history(url)
+                        return True
+                else:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
                 await self._wait_for_page_and_frames_load()
                 
                 # Add successful navigation to history
@@ -140,6 +250,14 @@ class PlaywrightController:
         
         page = await self.get_current_page()
         try:
+            previous_url = self.navigation_history["urls"][self.navigation_history["current_index"] - 1]
+            live_page = self.tabs.find(previous_url) if self.tabs else None
+            if live_page is not None and live_page != page:
+                # The previous page is still open in a background tab: switch instead of reloading
+                await live_page.bring_to_front()
+                self.tabs.mark_active(live_page)
+                self.navigation_history["current_index"] -= 1
+                return True
             await page.go_back(timeout=10000)
             self.navigation_history["current_index"] -= 1
             
@@ -189,42 +307,10 @@ class PlaywrightController:
             bool: True if page loaded successfully, False if timeout occurred
         """
         page = await self.get_current_page()
-        start_time = time.time()
-        timeout_seconds = timeout_ms / 1000
         
         try:
-            # First wait for domcontentloaded as a baseline
-            await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
-            
-            # Then wait for network to be mostly idle
-            pending_requests = []
-            completed = False
-            
-            # Set up request monitoring
-            def on_request(request):
-                pending_requests.append(request)
-                
-            def on_response(response):
-                if response.request in pending_requests:
-                    pending_requests.remove(response.request)
-                    
-            page.on("request", on_request)
-            page.on("response", on_response)
-            
-            # Wait for network idle with timeout
-            while time.time() - start_time < timeout_seconds:
-                if len(pending_requests) == 0:
-                    # No pending requests for at least 500ms indicates network idle
-                    if not completed:
-                        await asyncio.sleep(0.5)
-                        if len(pending_requests) == 0:
-                            completed = True
-                            break
-                await asyncio.sleep(0.1)
-                
-            # Clean up listeners
-            page.remove_listener("request", on_request)
-            page.remove_listener("response", on_response)
+            # Navigation events, in-flight request counting and a DOM quiet period, with a hard deadline
+            completed = await async_wait_until_settled(page, timeout_ms=timeout_ms, quiet_ms=500, max_inflight=0)
             
             # Optionally wait for a specific selector if provided
             if wait_for_selector:
@@ -232,12 +318,6 @@ class PlaywrightController:
                     await page.wait_for_selector(wait_for_selector, timeout=2000)
                 except Exception:
                     logging.warning(f"Selector {wait_for_selector} not found within timeout.")
-            
-            # Try to wait for load state, but continue even if it times out
-            try:
-                await page.wait_for_load_state("load", timeout=2000)
-            except Exception:
-                pass
                 
             return completed
         except Exception as e:
@@ -246,81 +326,99 @@ class PlaywrightController:
 
     def is_url_allowed(self, url: str, allowed_domains: list | None = None) -> bool:
         """Check if a URL is allowed based on the allowlist configuration."""
-        if not allowed_domains:
-            return True
-
-        try:
-            from urllib.parse import urlparse
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc.lower()
-
-            # Remove port number if present
-            if ':' in domain:
-                domain = domain.split(':')[0]
-
-            # Check if domain matches any allowed domain pattern
-            return any(
-                domain == allowed_domain.lower() or domain.endswith('.' + allowed_domain.lower())
-                for allowed_domain in allowed_domains
-            )
-        except Exception as e:
-            logging.error(f'Error checking URL allowlist: {str(e)}')
-            return False
+        return is_url_allowed(url, allowed_domains)
 
     async def get_current_page(self):
         """
         Retrieve the current active page from the browser context.
         (Implement this method according to your application logic.)
         """
-        # Example implementation:
+        # The tab cache knows which tab is in front; otherwise use the first page
+        if self.tabs and self.tabs.current:
+            return self.tabs.current
         return self.browser_context.pages[0] if self.browser_context and self.browser_context.pages else None
 
     def launch_browser_with_profile(self):
         """
         Launches Chrome browser using your actual profile to maintain all settings/login state.
         This method is an instance method and uses the controller's configuration.
+        
+        With AGENT_PROFILE_MODE=clone the session runs on a fast copy-on-write
+        clone of a golden profile (built from CHROME_PROFILE_PATH on first use),
+        so several sessions can run at once. The clone's path is returned as the
+        second value so the caller can delete it.
         """
+        from src.browser.profile_manager import ProfileManager
+        profile_mode = os.getenv("AGENT_PROFILE_MODE", "direct").strip().lower()
+        profile_manager = ProfileManager() if profile_mode == "clone" else None
+        
         chrome_profile_path = os.getenv("CHROME_PROFILE_PATH")
-        if not chrome_profile_path:
+        if not chrome_profile_path and not (profile_manager and profile_manager.has_golden()):
             raise ValueError("CHROME_PROFILE_PATH not set in environment variables.")
         
         # Verify this is the User Data directory and not a specific profile
-        if chrome_profile_path.endswith("Default"):
+        if chrome_profile_path and chrome_profile_path.endswith("Default"):
             # Strip off the "Default" part if it was incorrectly included
             chrome_profile_path = chrome_profile_path.replace("\\Default", "")
             print(f"Adjusting profile path to: {chrome_profile_path}")
         
-        # Get path to Chrome executable
-        chrome_executable_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-        if not os.path.exists(chrome_executable_path):
-            # Fallback to auto-detection
-            chrome_executable_path = None
-            print("Chrome executable not found at expected path, using auto-detection")
+        cloned_profile_path = None
+        if profile_manager:
+            profile_manager.build_golden(chrome_profile_path)  # no-op once the golden profile exists
+            chrome_profile_path = cloned_profile_path = profile_manager.clone()
+        
+        # Get path to Chrome executable (falls back to auto-detection)
+        chrome_executable_path = find_chrome_executable()
         
         try:
             # Launch Playwright with the actual profile (no temporary copy)
             self.playwright = sync_playwright().start()
             
+            # AGENT_RECORD_SESSION=<dir> records every network response for offline replay
+            record_options = {}
+            record_dir = os.getenv("AGENT_RECORD_SESSION")
+            if record_dir:
+                from src.history.session_recorder import HAR_FILE
+                os.makedirs(record_dir, exist_ok=True)
+                record_options = {"record_har_path": os.path.join(record_dir, HAR_FILE),
+                                  "record_har_content": "embed"}
+            
             browser_context = self.playwright.chromium.launch_persistent_context(
                 user_data_dir=chrome_profile_path,  # Your actual Chrome profile directory
                 headless=self.config.headless,
                 executable_path=chrome_executable_path,
-                args=[
-                    "--start-maximized",
-                    "--window-size=1920,1080",
-                    "--disable-blink-features=AutomationControlled"  # Critical for avoiding detection
-                ]
+                args=BROWSER_ARGS,
+                **record_options
             )
+            # Count every page's requests from its creation on, so the first settle wait isn't network-blind
+            track_network(browser_context)
+            
+            # Serve static assets from the shared disk cache (attached first so the filter runs before it)
+            from src.browser.asset_cache import asset_cache_from_env
+            self.asset_cache = asset_cache_from_env()
+            if self.asset_cache:
+                self.asset_cache.attach(browser_context)
+            
+            # Block heavy or irrelevant resources if a filter preset or allowlist is configured
+            from src.browser.request_filter import request_filter_from_env
+            self.request_filter = request_filter_from_env(self.config.allowed_domains)
+            if self.request_filter:
+                self.request_filter.attach(browser_context)
             
             # Apply stealth mode to all pages
             for page in browser_context.pages:
                 page.set_viewport_size({"width": 1920, "height": 1080})
                 apply_stealth_mode(page)
             
+            # Keep recently visited pages open as background tabs (AGENT_TAB_CACHE)
+            from src.browser.tab_cache import get_tab_cache
+            self.tabs = get_tab_cache(browser_context, on_new_page=apply_stealth_mode)
+            
             # Initialize navigation history
             self.initialize_navigation_history()
             self.browser_context = browser_context
-            return browser_context, None  # Return None as second param since we don't need to clean up
+            # The cloned profile (if any) is the caller's to clean up; the real profile is never removed
+            return browser_context, cloned_profile_path
         except Exception as e:
             print(f"Error launching browser: {e}")
             raise e
@@ -328,50 +426,13 @@ class PlaywrightController:
 
 def apply_stealth_mode(page):
     """
-    Apply stealth mode JavaScript to hide automation markers.
-    """
-    stealth_js = """
-    // Override webdriver property
-    Object.defineProperty(navigator, 'webdriver', {
-        get: () => false,
-    });
-    
-    // Override Chrome's automation property
-    window.navigator.chrome = {
-        runtime: {},
-    };
-    
-    // Modify plugins to look like regular browser
-    Object.defineProperty(navigator, 'plugins', {
-        get: () => [1, 2, 3, 4, 5],
-    });
-    
-    // Modify languages
-    Object.defineProperty(navigator, 'languages', {
-        get: () => ['en-US', 'en'],
-    });
-    
-    // Prevent detection via permissions
-    if (window.navigator.permissions) {
-        const originalQuery = window.navigator.permissions.query;
-        window.navigator.permissions.query = (parameters) => (
-            parameters.name === 'notifications'
-                ? Promise.resolve({ state: Notification.permission })
-                : originalQuery(parameters)
-        );
-    }
-    
-    // Hide automation-specific Chrome DevTools Protocol (CDP)
-    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-    delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-    
-    // Set a consistent user agent
-    Object.defineProperty(navigator, 'userAgent', {
-        get: () => 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-    });
+    Apply stealth mode JavaScript to hide automation markers, install the
+    page helper library in the page's context and track the network
+    activity of its pages.
     """
-    page.add_init_script(stealth_js)
+    page.add_init_script(STEALTH_JS)
+    install_helpers(page.context)
+    track_network(page.context)
 
 
 def execute_dom_action(page, command):
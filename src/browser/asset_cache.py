@@ -0,0 +1,410 @@
+# File: src/browser/asset_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+
+# Only static subresources are cached; documents and API calls always go to the network
+CACHEABLE_TYPES = ("script", "stylesheet", "image", "font")
+
+# Headers that describe the original transfer, not the (decoded) body we serve back
+HOP_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive")
+
+# RFC 9111 heuristic freshness: a fraction of the time since Last-Modified, capped
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_SECONDS = 7 * 24 * 3600
+
+
+def parse_cache_control(value):
+    """Parse a Cache-Control header into {directive: value or True}."""
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers, now=None):
+    """
+    Seconds a response may be served without revalidation.
+
+    Returns:
+        float: Lifetime in seconds (0 means revalidate before use), or None if
+               the response must not be stored at all
+    """
+    now = now or time.time()
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except ValueError:
+            return 0.0
+    date = _http_date(headers.get("date")) or now
+    expires = headers.get("expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        return max(0.0, expires_at - date) if expires_at else 0.0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified:
+        return min(HEURISTIC_MAX_SECONDS, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0.0
+
+
+def _atomic_write(path, data):
+    """Write to a temp file in the same directory and rename it into place."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AssetCache:
+    """
+    On-disk HTTP cache for static assets, shared by every context and process
+    that points at the same directory.
+
+    Layout:
+        <cache_dir>/objects/ab/abcdef...   response bodies, named by SHA-256 of the content
+        <cache_dir>/index/12/1234...json   one entry per request key (URL + Vary headers)
+
+    Bodies are content-addressed, so the same bundle served from two URLs is
+    stored once. Every file is written to a temp file and renamed into place,
+    so concurrent readers see either the old or the new file, never a partial
+    one. Since the cache is shared, responses meant for one user (private,
+    to an Authorization request, or setting cookies) are never stored. Freshness follows Cache-Control / Expires (or the Last-Modified
+    heuristic); stale entries with an ETag or Last-Modified are revalidated
+    with a conditional request. When the objects exceed max_bytes the least
+    recently used ones (by mtime, touched on every hit) are deleted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024, resource_types=CACHEABLE_TYPES):
+        """
+        Args:
+            cache_dir: Directory holding the cache (created if missing)
+            max_bytes: Size cap for stored bodies
+            resource_types: Playwright resource types that are cached
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_dir = os.path.join(cache_dir, "index")
+        self.max_bytes = max_bytes
+        self.resource_types = frozenset(resource_types)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.stats = {"requests": 0, "hits": 0, "revalidated": 0, "misses": 0, "stored": 0,
+                      "bytes_from_cache": 0, "bytes_from_network": 0, "evictions": 0, "errors": 0}
+        self.stored_bytes = self._scan_size()
+
+    # ---- Storage ----
+
+    def _scan_size(self):
+        total = 0
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _index_path(self, key):
+        return os.path.join(self.index_dir, key[:2], key + ".json")
+
+    def _vary_key(self, url, request_headers, vary):
+        parts = [url]
+        for name in sorted(vary):
+            parts.append(f"{name}={request_headers.get(name, '')}")
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def _lookup(self, url, request_headers):
+        """Return (key, entry, body) for a request, or (key, None, None) on a miss."""
+        url_key = self._vary_key(url, {}, [])
+        try:
+            with open(self._index_path(url_key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return url_key, None, None
+        # Entries stored under a Vary header point to the per-variant entry
+        if entry.get("vary"):
+            key = self._vary_key(url, request_headers, entry["vary"])
+            try:
+                with open(self._index_path(key), "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return key, None, None
+        else:
+            key = url_key
+        try:
+            path = self._object_path(entry["digest"])
+            with open(path, "rb") as f:
+                body = f.read()
+            os.utime(path)  # mark as recently used for LRU eviction
+        except (OSError, KeyError):
+            return key, None, None
+        return key, entry, body
+
+    def _write_entry(self, key, entry):
+        _atomic_write(self._index_path(key), json.dumps(entry).encode("utf-8"))
+
+    @staticmethod
+    def _shareable(request_headers, headers, directives):
+        """
+        Whether a response may be kept in a cache other sessions and profiles
+        read from: not marked private (RFC 9111 5.2.2.7), not answering an
+        authorized request unless explicitly allowed (RFC 9111 3.5), and not
+        setting cookies.
+        """
+        if "private" in directives or "set-cookie" in headers:
+            return False
+        authorized = any(name.lower() == "authorization" for name in request_headers)
+        if authorized and not any(name in directives for name in ("public", "s-maxage", "must-revalidate")):
+            return False
+        return True
+
+    def store(self, url, request_headers, status, headers, body):
+        """
+        Store a response if its headers allow it.
+
+        Returns:
+            bool: True if the response was stored
+        """
+        if status != 200 or body is None:
+            return False
+        headers = {name.lower(): value for name, value in headers.items()}
+        directives = parse_cache_control(headers.get("cache-control"))
+        if not self._shareable(request_headers, headers, directives):
+            return False
+        vary = [name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()]
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None or "*" in vary:
+            return False
+        if lifetime == 0 and not (headers.get("etag") or headers.get("last-modified")):
+            return False  # could never be served without a full download anyway
+
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            _atomic_write(path, body)
+            self.stored_bytes += len(body)
+
+        entry = {
+            "url": url,
+            "digest": digest,
+            "size": len(body),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name not in HOP_HEADERS},
+            "stored_at": time.time(),
+            "expires_at": time.time() + lifetime,
+            "immutable": "immutable" in directives,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+        }
+        if vary:
+            self._write_entry(self._vary_key(url, {}, []), {"url": url, "vary": vary})
+            self._write_entry(self._vary_key(url, request_headers, vary), entry)
+        else:
+            self._write_entry(self._vary_key(url, {}, []), entry)
+        self.stats["stored"] += 1
+
+        if self.stored_bytes > self.max_bytes:
+            self.evict()
+        return True
+
+    def evict(self, target_ratio=0.9):
+        """
+        Delete least recently used bodies until the cache is under target_ratio
+        of max_bytes. Index entries pointing at deleted bodies become misses.
+        """
+        files = []
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * target_ratio
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                self.stats["evictions"] += 1
+            except OSError:
+                pass
+        self.stored_bytes = total
+
+    # ---- Request handling ----
+
+    def _is_fresh(self, entry):
+        return entry.get("immutable") or entry["expires_at"] > time.time()
+
+    def _conditional_headers(self, request_headers, entry):
+        headers = dict(request_headers)
+        if entry.get("etag"):
+            headers["if-none-match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["if-modified-since"] = entry["last_modified"]
+        return headers
+
+    def _refresh(self, key, entry, response_headers):
+        """Extend a revalidated entry's lifetime from the 304 response headers."""
+        headers = dict(entry["headers"])
+        headers.update({name.lower(): value for name, value in response_headers.items()
+                        if name.lower() not in HOP_HEADERS})
+        lifetime = freshness_lifetime(headers) or 0.0
+        entry = dict(entry, headers=headers, expires_at=time.time() + lifetime)
+        self._write_entry(key, entry)
+        return entry
+
+    def _serve(self, entry, body):
+        self.stats["bytes_from_cache"] += len(body)
+        return {"status": entry["status"], "headers": entry["headers"], "body": body}
+
+    def _cacheable(self, request):
+        return request.method == "GET" and request.resource_type in self.resource_types
+
+    def handle(self, route, request):
+        """Sync Playwright route handler."""
+        if not self._cacheable(request):
+            route.fallback()
+            return
+        self.stats["requests"] += 1
+        try:
+            key, entry, body = self._lookup(request.url, request.headers)
+            if entry is not None and self._is_fresh(entry):
+                self.stats["hits"] += 1
+                route.fulfill(**self._serve(entry, body))
+                return
+
+            if entry is not None and (entry.get("etag") or entry.get("last_modified")):
+                response = route.fetch(headers=self._conditional_headers(request.headers, entry))
+                if response.status == 304:
+                    self.stats["revalidated"] += 1
+                    route.fulfill(**self._serve(self._refresh(key, entry, response.headers), body))
+                    return
+            else:
+                response = route.fetch()
+
+            self.stats["misses"] += 1
+            network_body = response.body()
+            self.stats["bytes_from_network"] += len(network_body)
+            self.store(request.url, request.headers, response.status, response.headers, network_body)
+            route.fulfill(response=response, body=network_body)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.debug(f"Asset cache passing {request.url} through: {e}")
+            try:
+                route.fallback()
+            except Exception:
+                pass
+
+    async def async_handle(self, route, request):
+        """Async Playwright route handler."""
+        if not self._cacheable(request):
+            await route.fallback()
+            return
+        self.stats["requests"] += 1
+        try:
+            key, entry, body = self._lookup(request.url, request.headers)
+            if entry is not None and self._is_fresh(entry):
+                self.stats["hits"] += 1
+                await route.fulfill(**self._serve(entry, body))
+                return
+
+            if entry is not None and (entry.get("etag") or entry.get("last_modified")):
+                response = await route.fetch(headers=self._conditional_headers(request.headers, entry))
+                if response.status == 304:
+                    self.stats["revalidated"] += 1
+                    await route.fulfill(**self._serve(self._refresh(key, entry, response.headers), body))
+                    return
+            else:
+                response = await route.fetch()
+
+            self.stats["misses"] += 1
+            network_body = await response.body()
+            self.stats["bytes_from_network"] += len(network_body)
+            self.store(request.url, request.headers, response.status, response.headers, network_body)
+            await route.fulfill(response=response, body=network_body)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.debug(f"Asset cache passing {request.url} through: {e}")
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+
+    def attach(self, context):
+        """
+        Install the cache on a sync browser context. Attach it before a
+        RequestFilter: the handler registered last runs first, so blocked
+        requests never reach the cache.
+        """
+        context.route("**/*", self.handle)
+        return self
+
+    async def async_attach(self, context):
+        """Install the cache on an async browser context (see attach())."""
+        await context.route("**/*", self.async_handle)
+        return self
+
+    def hit_ratio(self):
+        """Fraction of cacheable requests served without downloading the body."""
+        served = self.stats["hits"] + self.stats["revalidated"]
+        return served / self.stats["requests"] if self.stats["requests"] else 0.0
+
+    def summary(self):
+        """Return cache statistics for this session."""
+        return dict(self.stats, hit_ratio=round(self.hit_ratio(), 3),
+                    stored_mb=round(self.stored_bytes / (1024 * 1024), 2))
+
+
+def asset_cache_from_env():
+    """
+    Build a cache from AGENT_ASSET_CACHE (a directory), or return None when it
+    is unset or "off". AGENT_ASSET_CACHE_MB sets the size cap (default 500).
+    """
+    cache_dir = os.getenv("AGENT_ASSET_CACHE", "off").strip()
+    if not cache_dir or cache_dir.lower() == "off":
+        return None
+    try:
+        max_mb = float(os.getenv("AGENT_ASSET_CACHE_MB", "500"))
+        return AssetCache(os.path.expanduser(cache_dir), max_bytes=int(max_mb * 1024 * 1024))
+    except (OSError, ValueError) as e:
+        logging.error(f"Asset cache disabled: {e}")
+        return None
@@ -0,0 +1,240 @@
+# File: src/browser/context_pool.py
+
+import logging
+import time
+from urllib.parse import urlparse
+
+from playwright.sync_api import sync_playwright
+from src.automation.playwright_controller import BROWSER_ARGS, STEALTH_JS, find_chrome_executable
+from src.browser.asset_cache import asset_cache_from_env
+from src.browser.request_filter import request_filter_from_env
+from src.browser.settle import track_network
+from src.browser.tab_cache import forget_tab_cache
+from src.dom.page_helpers import install_helpers
+
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+
+
+class ContextLease:
+    """A browser context handed out by the pool, with the page to drive."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.visited_origins = set()
+        context.on("page", self._track_page)
+        self._track_page(page)
+
+    def _track_page(self, page):
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_navigated(self, frame):
+        parsed = urlparse(frame.url)
+        if parsed.scheme in ("http", "https"):
+            self.visited_origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+
+class ContextPool:
+    """
+    Keeps N pre-launched, pre-warmed browser contexts in one browser so
+    back-to-back tasks skip browser startup.
+
+    Every context gets the stealth init script and the viewport when it is
+    created, and a page that has already rendered about:blank. Leased
+    contexts are reset on release (their pages replaced by a fresh one,
+    cookies, permissions and the storage of every visited origin cleared),
+    health-checked before they are handed out again, and replaced after
+    max_uses leases.
+
+    Pooled contexts are fresh (non-persistent) contexts: pass storage_state
+    to start them logged in.
+    """
+
+    def __init__(self, size=2, max_uses=10, headless=False, viewport=None, storage_state=None):
+        """
+        Args:
+            size: Number of warm contexts to keep
+            max_uses: Leases after which a context is closed and replaced
+            headless: Whether to run the browser headless
+            viewport: Viewport for every page (defaults to 1920x1080)
+            storage_state: Optional Playwright storage state (path or dict) for new contexts
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self.storage_state = storage_state
+        # One filter for every pooled context so its counters cover the whole session
+        self.request_filter = request_filter_from_env()
+        self.asset_cache = asset_cache_from_env()
+        self.playwright = None
+        self.browser = None
+        self.idle = []
+        self.leased = set()
+        self.stats = {"leases": 0, "created": 0, "reused": 0, "recycled": 0, "health_failures": 0,
+                      "reset_failures": 0, "lease_ms_total": 0.0}
+
+    # ---- Lifecycle ----
+
+    def start(self):
+        """Launch the browser and pre-warm the pool."""
+        start = time.perf_counter()
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(
+            headless=self.headless,
+            executable_path=find_chrome_executable(),
+            args=BROWSER_ARGS
+        )
+        for _ in range(self.size):
+            self.idle.append(self._new_lease())
+        logging.info(f"Context pool warmed with {self.size} contexts in {time.perf_counter() - start:.2f}s")
+        return self
+
+    def close(self):
+        """Close every context, the browser and Playwright."""
+        for lease in self.idle + list(self.leased):
+            self._close_lease(lease)
+        self.idle = []
+        self.leased = set()
+        try:
+            if self.browser:
+                self.browser.close()
+        finally:
+            if self.playwright:
+                self.playwright.stop()
+            self.browser = None
+            self.playwright = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---- Leasing ----
+
+    def _new_lease(self):
+        options = {"viewport": self.viewport}
+        if self.storage_state:
+            options["storage_state"] = self.storage_state
+        context = self.browser.new_context(**options)
+        context.add_init_script(STEALTH_JS)
+        install_helpers(context)
+        track_network(context)
+        if self.asset_cache:
+            self.asset_cache.attach(context)
+        if self.request_filter:
+            self.request_filter.attach(context)
+        page = context.new_page()
+        # Pre-warm the renderer so the first real navigation doesn't pay for it
+        page.goto("about:blank")
+        self.stats["created"] += 1
+        return ContextLease(context, page)
+
+    def _close_lease(self, lease):
+        try:
+            lease.context.close()
+        except Exception as e:
+            logging.debug(f"Failed to close pooled context: {e}")
+
+    def _is_healthy(self, lease):
+        try:
+            return not lease.page.is_closed() and lease.page.evaluate("1 + 1") == 2
+        except Exception:
+            return False
+
+    def lease(self):
+        """
+        Hand out a warm context.
+
+        Returns:
+            ContextLease: Lease with .context and .page; give it back with release()
+        """
+        start = time.perf_counter()
+        lease = None
+        while self.idle and lease is None:
+            candidate = self.idle.pop()
+            if self._is_healthy(candidate):
+                lease = candidate
+                self.stats["reused"] += 1
+            else:
+                self.stats["health_failures"] += 1
+                self._close_lease(candidate)
+        if lease is None:
+            # Pool exhausted or every idle context was unhealthy
+            lease = self._new_lease()
+
+        lease.uses += 1
+        self.leased.add(lease)
+        self.stats["leases"] += 1
+        self.stats["lease_ms_total"] += (time.perf_counter() - start) * 1000
+        return lease
+
+    def _reset(self, lease):
+        """
+        Return a context to a clean state on a fresh page.
+
+        The leased page is closed rather than navigated to about:blank, since
+        its sessionStorage and back/forward history would survive a navigation.
+        """
+        context = lease.context
+        # Open the replacement first so the context keeps a live renderer
+        page = context.new_page()
+        for old_page in context.pages:
+            if old_page != page:
+                old_page.close()
+        lease.page = page
+
+        forget_tab_cache(context)
+        context.clear_cookies()
+        context.clear_permissions()
+        page.goto("about:blank")
+        if lease.visited_origins:
+            session = context.new_cdp_session(page)
+            try:
+                for origin in lease.visited_origins:
+                    session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            finally:
+                session.detach()
+        lease.visited_origins.clear()
+
+    def release(self, lease):
+        """Reset a leased context and return it to the pool (or replace it if it is worn out)."""
+        self.leased.discard(lease)
+        if self.browser is None:
+            return
+
+        if lease.uses >= self.max_uses:
+            self._close_lease(lease)
+            self.stats["recycled"] += 1
+        else:
+            try:
+                self._reset(lease)
+                if len(self.idle) < self.size:
+                    self.idle.append(lease)
+                    return
+            except Exception as e:
+                logging.warning(f"Failed to reset pooled context, replacing it: {e}")
+                self.stats["reset_failures"] += 1
+            self._close_lease(lease)
+
+        # Keep the pool at its configured size
+        if len(self.idle) < self.size:
+            try:
+                self.idle.append(self._new_lease())
+            except Exception as e:
+                logging.error(f"Failed to replenish context pool: {e}")
+
+    def summary(self):
+        """Return pool statistics."""
+        leases = self.stats["leases"]
+        return dict(
+            self.stats,
+            lease_ms_total=round(self.stats["lease_ms_total"], 2),
+            idle=len(self.idle),
+            leased=len(self.leased),
+            avg_lease_ms=round(self.stats["lease_ms_total"] / leases, 2) if leases else 0.0,
+            request_filter=self.request_filter.summary() if self.request_filter else None,
+            asset_cache=self.asset_cache.summary() if self.asset_cache else None,
+        )
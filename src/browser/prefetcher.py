@@ -0,0 +1,252 @@
+# File: src/browser/prefetcher.py
+
+import logging
+import os
+from urllib.parse import urljoin, urlparse
+
+from src.browser.tab_cache import tab_key
+
+SEARCH_ENGINES = ("google.", "bing.com", "duckduckgo.com")
+
+# Same ranking as find_natural_search_results(): organic results, ads excluded
+NATURAL_RESULT_SELECTORS = [
+    "div:not([data-text-ad]) a[ping]",
+    ".g:not(.ads-ad) a[href]",
+    "#search a[href]:not([data-jsarwt])",
+    "h3[class*='LC20lb']",
+]
+
+# Collects the hrefs of the top organic results in one round trip. Headings
+# (h3) are resolved to their enclosing link.
+TOP_RESULTS_JS = """
+({selectors, limit}) => {
+    const urls = [];
+    const seen = new Set();
+    const pageHost = location.hostname;
+    for (const selector of selectors) {
+        let elements;
+        try { elements = document.querySelectorAll(selector); } catch (e) { continue; }
+        for (const el of elements) {
+            const link = el.closest('a[href]') || el.querySelector('a[href]');
+            if (!link) continue;
+            const rect = link.getBoundingClientRect();
+            if (rect.width === 0 || rect.height === 0) continue;
+            const url = link.href;
+            if (!/^https?:/.test(url) || seen.has(url)) continue;
+            // Links back into the search engine (tabs, pagination, related searches)
+            if (new URL(url).hostname === pageHost) continue;
+            seen.add(url);
+            urls.push(url);
+            if (urls.length >= limit) return urls;
+        }
+        if (urls.length) return urls;
+    }
+    return urls;
+}
+"""
+
+NAVIGATE_JS = "url => { window.location.href = url; }"
+
+
+def is_search_results_page(url):
+    """True for a search engine results page (Google, Bing, DuckDuckGo)."""
+    parsed = urlparse(url or "")
+    host = parsed.netloc.lower()
+    return any(engine in host for engine in SEARCH_ENGINES) and (
+        parsed.path.startswith("/search") or "q=" in parsed.query)
+
+
+def top_result_urls(page, limit=3):
+    """Return up to limit organic result URLs from a search results page."""
+    try:
+        return page.evaluate(TOP_RESULTS_JS, {"selectors": NATURAL_RESULT_SELECTORS, "limit": limit}) or []
+    except Exception as e:
+        logging.debug(f"Could not collect search result links: {e}")
+        return []
+
+
+class Prefetch:
+    """One speculative page load in a background tab."""
+
+    def __init__(self, url, page):
+        self.url = url
+        self.page = page
+        self.bytes = 0
+        # Requests blocked while prefetching; the page is incomplete if any were
+        self.aborted = 0
+        self.route_handler = None
+        self.response_handler = None
+
+
+class Prefetcher:
+    """
+    Opens the likely next pages (the top organic search results) in
+    background tabs while the LLM is deliberating.
+
+    The navigation is started with location.href, which returns immediately,
+    so the pages load in the browser while Python waits for the reasoner.
+    Prefetch tabs block media and, once the byte budget for the round is
+    spent, every further request. If the chosen action goes to a prefetched
+    URL, claim() hands over the already loaded tab, reloading it first if any
+    of its requests were blocked so the claimed page is never missing scripts
+    or stylesheets; discard() closes the rest and counts their bytes as wasted.
+    """
+
+    def __init__(self, context, max_tabs=2, max_bytes=5 * 1024 * 1024, tabs=None):
+        """
+        Args:
+            context: Browser context to open prefetch tabs in
+            max_tabs: Results prefetched per search page
+            max_bytes: Download budget for one round of prefetches
+            tabs: Optional TabLRU that claimed tabs are handed to
+        """
+        self.context = context
+        self.max_tabs = max_tabs
+        self.max_bytes = max_bytes
+        self.tabs = tabs
+        self.pending = []
+        self.round_bytes = 0
+        self.stats = {"rounds": 0, "prefetched": 0, "hits": 0, "reloaded": 0, "used_bytes": 0, "wasted_bytes": 0}
+
+    @property
+    def enabled(self):
+        return self.max_tabs > 0
+
+    # ---- Budget ----
+
+    def _route(self, prefetch, route, request):
+        if request.resource_type == "media" or self.round_bytes >= self.max_bytes:
+            prefetch.aborted += 1
+            route.abort()
+        else:
+            route.fallback()
+
+    def _on_response(self, prefetch, response):
+        try:
+            length = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            length = 0
+        prefetch.bytes += length
+        self.round_bytes += length
+
+    # ---- Prefetching ----
+
+    def prefetch(self, page):
+        """
+        Start loading the top results of a search results page in background
+        tabs. Anything still pending from an earlier round is discarded first.
+
+        Returns:
+            list: URLs being prefetched
+        """
+        self.discard()
+        if not self.enabled or not is_search_results_page(page.url):
+            return []
+
+        started = []
+        for url in top_result_urls(page, self.max_tabs):
+            if self.tabs and self.tabs.is_live(url):
+                continue  # already open, a revisit is a tab switch anyway
+            try:
+                tab = self.context.new_page()
+                if self.tabs and self.tabs.on_new_page:
+                    self.tabs.on_new_page(tab)
+                prefetch = Prefetch(url, tab)
+                prefetch.route_handler = lambda route, request, prefetch=prefetch: self._route(prefetch, route, request)
+                prefetch.response_handler = lambda response, prefetch=prefetch: self._on_response(prefetch, response)
+                tab.route("**/*", prefetch.route_handler)
+                tab.on("response", prefetch.response_handler)
+                tab.evaluate(NAVIGATE_JS, url)
+                self.pending.append(prefetch)
+                started.append(url)
+            except Exception as e:
+                logging.debug(f"Prefetch of {url} failed to start: {e}")
+        if started:
+            # new_page() brings the new tab to the front; keep the agent's page in front
+            page.bring_to_front()
+            self.stats["rounds"] += 1
+            self.stats["prefetched"] += len(started)
+            logging.info(f"Prefetching {len(started)} results: {started}")
+        return started
+
+    def claim(self, url):
+        """
+        Take over the prefetched tab for url, if there is one.
+
+        Returns:
+            Page: The prefetched page, brought to the front, or None if there
+            is none (or its incomplete load could not be repeated)
+        """
+        key = tab_key(url)
+        for prefetch in self.pending:
+            if prefetch.page.is_closed():
+                continue
+            if key in (tab_key(prefetch.url), tab_key(prefetch.page.url)):
+                self.pending.remove(prefetch)
+                page = prefetch.page
+                page.unroute("**/*", prefetch.route_handler)
+                page.remove_listener("response", prefetch.response_handler)
+                if prefetch.aborted:
+                    # Blocked scripts or stylesheets would leave the page half-broken
+                    logging.info(f"Prefetched tab {url} had {prefetch.aborted} blocked requests, reloading it")
+                    try:
+                        page.reload()
+                    except Exception as e:
+                        logging.debug(f"Reload of prefetched tab {url} failed: {e}")
+                        self.stats["wasted_bytes"] += prefetch.bytes
+                        self._close(page)
+                        return None
+                    self.stats["reloaded"] += 1
+                page.bring_to_front()
+                if self.tabs:
+                    self.tabs.mark_active(page)
+                self.stats["hits"] += 1
+                self.stats["used_bytes"] += prefetch.bytes
+                logging.info(f"Promoted prefetched tab {url}")
+                return page
+        return None
+
+    def claim_link(self, page, locator):
+        """Claim the prefetched tab for the link a locator points at (see claim())."""
+        if not self.pending:
+            return None
+        try:
+            href = locator.get_attribute("href", timeout=1000)
+        except Exception:
+            return None
+        return self.claim(urljoin(page.url, href)) if href else None
+
+    def discard(self):
+        """Close every unclaimed prefetch tab and count its bytes as wasted."""
+        for prefetch in self.pending:
+            self.stats["wasted_bytes"] += prefetch.bytes
+            self._close(prefetch.page)
+        self.pending = []
+        self.round_bytes = 0
+
+    def _close(self, page):
+        try:
+            page.close()
+        except Exception as e:
+            logging.debug(f"Failed to close prefetch tab: {e}")
+
+    def hit_rate(self):
+        """Fraction of prefetch rounds where one of the prefetched pages was used."""
+        return self.stats["hits"] / self.stats["rounds"] if self.stats["rounds"] else 0.0
+
+    def summary(self):
+        """Return prefetch statistics."""
+        return dict(self.stats, hit_rate=round(self.hit_rate(), 3))
+
+
+def prefetcher_from_env(context, tabs=None):
+    """
+    Build a prefetcher from AGENT_PREFETCH (results per search page, default 0
+    = off) and AGENT_PREFETCH_MB (download budget per round, default 5), or
+    return None when it is off.
+    """
+    max_tabs = int(os.getenv("AGENT_PREFETCH", "0"))
+    if max_tabs <= 0:
+        return None
+    max_mb = float(os.getenv("AGENT_PREFETCH_MB", "5"))
+    return Prefetcher(context, max_tabs=max_tabs, max_bytes=int(max_mb * 1024 * 1024), tabs=tabs)
@@ -0,0 +1,238 @@
+# File: src/browser/profile_manager.py
+
+import fnmatch
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+import uuid
+
+DEFAULT_ROOT = os.path.join("~", ".agent_profiles")
+
+# Never copied: locks of a running Chrome and caches that are rebuilt on demand
+EXCLUDED_PATTERNS = [
+    "Singleton*", "lockfile", "LOCK", "*.tmp", "Crashpad", "Crashpad/*",
+    "*/Cache", "*/Cache/*", "*/Code Cache", "*/Code Cache/*", "*/GPUCache", "*/GPUCache/*",
+    "ShaderCache", "ShaderCache/*", "GrShaderCache", "GrShaderCache/*", "*/Service Worker/CacheStorage/*",
+]
+
+# Files Chrome never modifies in place (LevelDB tables are write-once, extensions
+# are replaced, not edited), so a clone may share them through hardlinks
+IMMUTABLE_PATTERNS = ["*.ldb", "*/Extensions/*"]
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+
+def _matches(relative_path, patterns):
+    return any(fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def reflink(src, dst):
+    """
+    Copy-on-write clone of one file. Raises OSError if the filesystem or
+    platform does not support it.
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.unlink(dst)
+                raise
+        shutil.copystat(src, dst)
+        return
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL("libc.dylib", use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            raise OSError(ctypes.get_errno(), "clonefile failed")
+        return
+    raise OSError("Reflinks are not supported on this platform")
+
+
+class ProfileManager:
+    """
+    Fast, isolated browser profiles for parallel sessions.
+
+    Two modes:
+        - Golden profile: copy a logged-in profile once (slow, done once) and
+          clone it per session. Files are reflinked where the filesystem
+          supports copy-on-write, hardlinked when Chrome never modifies them
+          in place, and copied otherwise. Each clone is its own user data
+          dir, so sessions don't fight over the profile lock.
+        - Storage-state snapshots: save cookies and localStorage of a context
+          to JSON and start fresh contexts from it (milliseconds, no disk
+          copy, but no history, extensions or IndexedDB).
+    """
+
+    def __init__(self, root=None):
+        """
+        Args:
+            root: Directory for the golden profile, clones and snapshots
+                  (defaults to AGENT_PROFILE_ROOT or ~/.agent_profiles)
+        """
+        self.root = os.path.expanduser(root or os.getenv("AGENT_PROFILE_ROOT", DEFAULT_ROOT))
+        self.golden_dir = os.path.join(self.root, "golden")
+        self.sessions_dir = os.path.join(self.root, "sessions")
+        self.states_dir = os.path.join(self.root, "states")
+        self.reflink_supported = None  # unknown until the first attempt
+        self.stats = {"clones": 0, "reflinked": 0, "hardlinked": 0, "copied": 0, "last_clone_ms": 0.0}
+
+    # ---- Golden profile ----
+
+    def has_golden(self):
+        return os.path.isdir(self.golden_dir)
+
+    def build_golden(self, source_profile, force=False):
+        """
+        Copy a Chrome user data directory into the golden profile, leaving out
+        locks and caches. Close Chrome first so the databases are consistent.
+
+        Args:
+            source_profile: Chrome "User Data" directory to copy
+            force: Rebuild even if a golden profile already exists
+
+        Returns:
+            str: Path of the golden profile
+        """
+        if self.has_golden() and not force:
+            return self.golden_dir
+        start = time.perf_counter()
+        building = self.golden_dir + ".building"
+        shutil.rmtree(building, ignore_errors=True)
+        self._copy_tree(source_profile, building, share=False)
+        with open(os.path.join(building, "golden.json"), "w") as f:
+            json.dump({"source": os.path.abspath(source_profile), "built_at": time.time()}, f)
+        # Swap in with renames so concurrent sessions never clone a half-deleted
+        # or half-built profile: move the old golden aside, rename the new one
+        # into place, and only then delete the old copy
+        retired = self.golden_dir + ".old"
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(self.golden_dir):
+            os.replace(self.golden_dir, retired)
+        os.replace(building, self.golden_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+        logging.info(f"Built golden profile from {source_profile} in {time.perf_counter() - start:.1f}s")
+        return self.golden_dir
+
+    # ---- Cloning ----
+
+    def _clone_file(self, src, dst, relative_path, share):
+        if share and self.reflink_supported is not False:
+            try:
+                reflink(src, dst)
+                self.reflink_supported = True
+                self.stats["reflinked"] += 1
+                return
+            except OSError:
+                self.reflink_supported = False
+        if share and _matches(relative_path, IMMUTABLE_PATTERNS):
+            try:
+                os.link(src, dst)
+                self.stats["hardlinked"] += 1
+                return
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        self.stats["copied"] += 1
+
+    def _copy_tree(self, src_root, dst_root, share=True):
+        for directory, dirnames, filenames in os.walk(src_root):
+            relative_dir = os.path.relpath(directory, src_root)
+            relative_dir = "" if relative_dir == "." else relative_dir
+            dirnames[:] = [name for name in dirnames
+                           if not _matches(os.path.join(relative_dir, name), EXCLUDED_PATTERNS)]
+            os.makedirs(os.path.join(dst_root, relative_dir), exist_ok=True)
+            for name in filenames:
+                relative_path = os.path.join(relative_dir, name)
+                if _matches(relative_path, EXCLUDED_PATTERNS) or name == "golden.json":
+                    continue
+                src = os.path.join(directory, name)
+                if os.path.islink(src):
+                    continue
+                try:
+                    self._clone_file(src, os.path.join(dst_root, relative_path), relative_path, share)
+                except OSError as e:
+                    logging.debug(f"Skipped {relative_path} while copying profile: {e}")
+
+    def clone(self, session_id=None):
+        """
+        Create an isolated copy of the golden profile for one session.
+
+        Returns:
+            str: User data directory for launch_persistent_context; remove it with release()
+        """
+        if not self.has_golden():
+            raise FileNotFoundError(f"No golden profile in {self.golden_dir}; call build_golden() first")
+        start = time.perf_counter()
+        session_dir = os.path.join(self.sessions_dir, session_id or uuid.uuid4().hex[:12])
+        self._copy_tree(self.golden_dir, session_dir, share=True)
+        self.stats["clones"] += 1
+        self.stats["last_clone_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logging.info(f"Cloned golden profile to {session_dir} in {self.stats['last_clone_ms']}ms "
+                     f"(reflinked {self.stats['reflinked']}, hardlinked {self.stats['hardlinked']}, "
+                     f"copied {self.stats['copied']} files so far)")
+        return session_dir
+
+    def release(self, session_dir):
+        """Delete a cloned profile. Hardlinked files in the golden profile are unaffected."""
+        if os.path.abspath(session_dir).startswith(os.path.abspath(self.sessions_dir)):
+            shutil.rmtree(session_dir, ignore_errors=True)
+
+    # ---- Storage-state snapshots ----
+
+    def state_path(self, name):
+        return os.path.join(self.states_dir, f"{name}.json")
+
+    def has_state(self, name):
+        return os.path.exists(self.state_path(name))
+
+    def save_state(self, context, name):
+        """
+        Snapshot a context's cookies and localStorage.
+
+        Returns:
+            str: Path of the snapshot
+        """
+        os.makedirs(self.states_dir, exist_ok=True)
+        path = self.state_path(name)
+        state = context.storage_state()
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+        logging.info(f"Saved storage state '{name}' ({len(state.get('cookies', []))} cookies, "
+                     f"{len(state.get('origins', []))} origins)")
+        return path
+
+    async def async_save_state(self, context, name):
+        """Async counterpart of save_state()."""
+        os.makedirs(self.states_dir, exist_ok=True)
+        path = self.state_path(name)
+        state = await context.storage_state()
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def load_state(self, name):
+        """Return the snapshot path for new_context(storage_state=...), or None if there is none."""
+        return self.state_path(name) if self.has_state(name) else None
+
+    def summary(self):
+        return dict(self.stats, reflink_supported=self.reflink_supported, golden=self.has_golden())
+
+
+def storage_state_from_env(manager=None):
+    """
+    Snapshot to start fresh contexts from: the AGENT_STORAGE_STATE snapshot
+    name, if set and saved. Returns None otherwise.
+    """
+    name = os.getenv("AGENT_STORAGE_STATE")
+    if not name:
+        return None
+    return (manager or ProfileManager()).load_state(name)
@@ -0,0 +1,270 @@
+# File: src/browser/request_filter.py
+
+import fnmatch
+import logging
+import os
+import re
+from urllib.parse import urlparse
+
+from src.automation.playwright_controller import is_url_allowed
+
+# Ad, analytics and tracking hosts (subdomains included)
+TRACKER_DOMAINS = [
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "amazon-adsystem.com",
+    "facebook.net", "connect.facebook.net", "scorecardresearch.com", "adnxs.com", "criteo.com",
+    "criteo.net", "taboola.com", "outbrain.com", "hotjar.com", "quantserve.com", "moatads.com",
+    "rubiconproject.com", "pubmatic.com", "casalemedia.com", "adsrvr.org",
+]
+
+# Hosts that serve a site's own assets from a differently named domain
+FIRST_PARTY_ALIASES = {
+    "google": ["gstatic.com", "googleapis.com", "googleusercontent.com", "ggpht.com"],
+    "youtube": ["ytimg.com", "googlevideo.com", "ggpht.com"],
+    "amazon": ["media-amazon.com", "ssl-images-amazon.com", "images-amazon.com"],
+    "netflix": ["nflxext.com", "nflximg.net", "nflxso.net", "nflxvideo.net"],
+}
+
+# Typical transfer sizes per resource type, used until real sizes have been seen
+DEFAULT_SIZES = {
+    "image": 40_000, "media": 500_000, "font": 35_000, "script": 60_000, "stylesheet": 25_000,
+    "xhr": 5_000, "fetch": 5_000, "document": 80_000, "other": 5_000,
+}
+
+
+class FilterRule:
+    """
+    One allow/block rule. Every condition that is set must hold for the rule to match.
+
+    Args:
+        action: "allow" or "block"
+        resource_types: Playwright resource types (image, media, font, script, ...); None for any
+        domains: Hosts the rule applies to, subdomains included; None for any
+        url_patterns: Glob patterns matched against the full URL; None for any
+        third_party: True/False to only match third-party/first-party requests; None for both
+    """
+
+    def __init__(self, action, resource_types=None, domains=None, url_patterns=None, third_party=None):
+        if action not in ("allow", "block"):
+            raise ValueError(f"Unknown rule action '{action}'")
+        self.action = action
+        self.resource_types = frozenset(resource_types) if resource_types else None
+        self.domains = frozenset(domain.lower() for domain in domains) if domains else None
+        self.url_regex = (re.compile("|".join(fnmatch.translate(pattern) for pattern in url_patterns))
+                          if url_patterns else None)
+        self.third_party = third_party
+
+    def matches(self, resource_type, host_suffixes, url, third_party):
+        if self.resource_types is not None and resource_type not in self.resource_types:
+            return False
+        if self.third_party is not None and third_party != self.third_party:
+            return False
+        if self.domains is not None and self.domains.isdisjoint(host_suffixes):
+            return False
+        if self.url_regex is not None and not self.url_regex.match(url):
+            return False
+        return True
+
+
+def _tracker_rule():
+    return [FilterRule("block", domains=TRACKER_DOMAINS)]
+
+
+# Rule presets, first matching rule wins; unmatched requests are allowed
+PRESETS = {
+    "off": lambda: [],
+    # Drops what never matters for page state: trackers, video/audio, web fonts
+    "light": lambda: _tracker_rule() + [
+        FilterRule("block", resource_types=["media", "font"]),
+    ],
+    # Keeps everything screenshots and OCR depend on (images, stylesheets, first-party scripts)
+    "vision-safe": lambda: _tracker_rule() + [
+        FilterRule("block", resource_types=["media"]),
+        FilterRule("block", resource_types=["script"], third_party=True),
+    ],
+    # DOM-only runs: layout and text, nothing else
+    "text-only": lambda: _tracker_rule() + [
+        FilterRule("block", resource_types=["image", "media", "font"]),
+        FilterRule("block", resource_types=["script"], third_party=True),
+    ],
+}
+
+
+def host_suffixes(host):
+    """All dot-suffixes of a host: "a.b.example.com" -> {"a.b.example.com", "b.example.com", "example.com", "com"}."""
+    labels = host.split(".")
+    return {".".join(labels[i:]) for i in range(len(labels))}
+
+
+def site_of(host):
+    """Approximate registrable domain (last two labels, three for short second-level labels like co.uk)."""
+    labels = host.split(".")
+    if len(labels) >= 3 and len(labels[-2]) <= 3 and len(labels[-1]) == 2:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class RequestFilter:
+    """
+    Context-level routing layer that aborts requests the agent does not need.
+
+    Rules are compiled once. Per request the matcher does a handful of set
+    lookups, and decisions are memoized per (resource type, host, page site)
+    for rules that do not look at the URL path. Navigations outside
+    allowed_domains are blocked with the same semantics as is_url_allowed().
+    """
+
+    def __init__(self, rules=None, allowed_domains=None, preset=None):
+        """
+        Args:
+            rules: List of FilterRule, evaluated in order before any preset rules
+            allowed_domains: Optional document allowlist (see PlaywrightConfig.allowed_domains)
+            preset: Name of a rule preset to append (see PRESETS)
+        """
+        if preset is not None and preset not in PRESETS:
+            raise ValueError(f"Unknown request filter preset '{preset}'. Choose from: {', '.join(PRESETS)}")
+        self.preset = preset
+        self.rules = list(rules or []) + (PRESETS[preset]() if preset else [])
+        self.allowed_domains = allowed_domains
+        self.url_dependent = any(rule.url_regex is not None for rule in self.rules)
+        self._decisions = {}
+        self.stats = {"requests": 0, "blocked": 0, "bytes_saved_estimate": 0, "blocked_by_type": {}}
+        self._size_totals = {}
+
+    # ---- Matching ----
+
+    def _is_third_party(self, host, page_host):
+        if not page_host:
+            return False
+        request_site, page_site = site_of(host), site_of(page_host)
+        if request_site == page_site:
+            return False
+        page_name = page_site.split(".")[0]
+        if page_name and page_name in request_site:
+            return False
+        return request_site not in FIRST_PARTY_ALIASES.get(page_name, [])
+
+    def decide(self, url, resource_type, page_url=None, is_navigation=False):
+        """
+        Decide whether a request should be blocked.
+
+        Returns:
+            bool: True to block
+        """
+        if is_navigation:
+            return not is_url_allowed(url, self.allowed_domains)
+
+        host = (urlparse(url).hostname or "").lower()
+        page_host = (urlparse(page_url).hostname or "").lower() if page_url else ""
+        key = (resource_type, host, site_of(page_host) if page_host else "")
+        if not self.url_dependent and key in self._decisions:
+            return self._decisions[key]
+
+        suffixes = host_suffixes(host)
+        third_party = self._is_third_party(host, page_host)
+        block = False
+        for rule in self.rules:
+            if rule.matches(resource_type, suffixes, url, third_party):
+                block = rule.action == "block"
+                break
+
+        if not self.url_dependent:
+            self._decisions[key] = block
+        return block
+
+    # ---- Accounting ----
+
+    def _estimated_size(self, resource_type):
+        total, count = self._size_totals.get(resource_type, (0, 0))
+        if count:
+            return total // count
+        return DEFAULT_SIZES.get(resource_type, DEFAULT_SIZES["other"])
+
+    def _count(self, resource_type, blocked):
+        self.stats["requests"] += 1
+        if blocked:
+            self.stats["blocked"] += 1
+            by_type = self.stats["blocked_by_type"]
+            by_type[resource_type] = by_type.get(resource_type, 0) + 1
+            self.stats["bytes_saved_estimate"] += self._estimated_size(resource_type)
+
+    def _on_response(self, response):
+        """Learn real transfer sizes of allowed requests from Content-Length."""
+        try:
+            length = response.headers.get("content-length")
+            if length:
+                resource_type = response.request.resource_type
+                total, count = self._size_totals.get(resource_type, (0, 0))
+                self._size_totals[resource_type] = (total + int(length), count + 1)
+        except Exception:
+            pass
+
+    def _request_info(self, request):
+        page_url = None
+        try:
+            page_url = request.frame.page.main_frame.url
+        except Exception:
+            pass
+        try:
+            is_navigation = request.is_navigation_request() and request.frame.parent_frame is None
+        except Exception:
+            is_navigation = False
+        return page_url, is_navigation
+
+    # ---- Route handlers ----
+
+    def handle(self, route, request):
+        """Sync Playwright route handler."""
+        page_url, is_navigation = self._request_info(request)
+        blocked = self.decide(request.url, request.resource_type, page_url, is_navigation)
+        self._count(request.resource_type, blocked)
+        if blocked:
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    async def async_handle(self, route, request):
+        """Async Playwright route handler."""
+        page_url, is_navigation = self._request_info(request)
+        blocked = self.decide(request.url, request.resource_type, page_url, is_navigation)
+        self._count(request.resource_type, blocked)
+        if blocked:
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def attach(self, context):
+        """Install the filter on a sync browser context (covers every page in it)."""
+        context.route("**/*", self.handle)
+        context.on("response", self._on_response)
+        return self
+
+    async def async_attach(self, context):
+        """Install the filter on an async browser context."""
+        await context.route("**/*", self.async_handle)
+        context.on("response", self._on_response)
+        return self
+
+    def summary(self):
+        """Return per-session counters (bytes saved are estimates: blocked requests are never downloaded)."""
+        requests = self.stats["requests"]
+        return dict(
+            self.stats,
+            preset=self.preset,
+            blocked_ratio=round(self.stats["blocked"] / requests, 3) if requests else 0.0,
+        )
+
+
+def request_filter_from_env(allowed_domains=None):
+    """
+    Build a filter from AGENT_REQUEST_FILTER (a preset name), or return None
+    when it is unset or "off" and the allowlist is empty, so no route is installed.
+    """
+    preset = os.getenv("AGENT_REQUEST_FILTER", "off").strip().lower()
+    if preset == "off" and not allowed_domains:
+        return None
+    try:
+        return RequestFilter(allowed_domains=allowed_domains, preset=preset)
+    except ValueError as e:
+        logging.error(str(e))
+        return None
@@ -0,0 +1,174 @@
+# File: src/browser/settle.py
+
+import logging
+import time
+import weakref
+
+# Consecutive evaluation failures (navigations, closed page) tolerated during one wait
+MAX_INTERRUPTIONS = 5
+
+# Resolves once the DOM has seen no mutations for quietMs, or with false after timeoutMs.
+DOM_QUIET_JS = """
+({quietMs, timeoutMs}) => new Promise(resolve => {
+    const root = document.documentElement || document;
+    const start = performance.now();
+    let lastMutation = start;
+    const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    const tick = Math.max(16, Math.min(50, quietMs));
+    const check = () => {
+        const now = performance.now();
+        if (now - lastMutation >= quietMs) {
+            observer.disconnect();
+            resolve(true);
+        } else if (now - start >= timeoutMs) {
+            observer.disconnect();
+            resolve(false);
+        } else {
+            setTimeout(check, tick);
+        }
+    };
+    setTimeout(check, tick);
+})
+"""
+
+
+class NetworkActivityTracker:
+    """
+    Counts in-flight requests for a page using Playwright request events.
+    One tracker is attached per page and kept for the page's lifetime, so
+    requests that started before a wait began are still accounted for.
+
+    Trackers are attached when the page is created (see track_network()),
+    so the requests of its first navigation are counted as well.
+    """
+
+    def __init__(self, page):
+        self.inflight = 0
+        self.last_change = time.monotonic()
+        page.on("request", self._on_request_started)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+
+    def _on_request_started(self, request):
+        self.inflight += 1
+        self.last_change = time.monotonic()
+
+    def _on_request_done(self, request):
+        # Requests started before the tracker attached can finish afterwards
+        self.inflight = max(0, self.inflight - 1)
+        self.last_change = time.monotonic()
+
+    def is_idle(self, max_inflight, quiet_seconds):
+        """True if at most max_inflight requests are pending and nothing changed for quiet_seconds."""
+        return self.inflight <= max_inflight and time.monotonic() - self.last_change >= quiet_seconds
+
+
+_trackers = weakref.WeakKeyDictionary()
+_tracked_contexts = weakref.WeakSet()
+
+
+def get_network_tracker(page):
+    """Return the page's network tracker, attaching one on first use."""
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = NetworkActivityTracker(page)
+        _trackers[page] = tracker
+    return tracker
+
+
+def track_network(context):
+    """
+    Attach a network tracker to every page of the context as soon as it is
+    created, before its first navigation starts. Works for sync and async
+    contexts; once per context.
+    """
+    if context in _tracked_contexts:
+        return
+    try:
+        for page in context.pages:
+            get_network_tracker(page)
+        context.on("page", get_network_tracker)
+        _tracked_contexts.add(context)
+    except Exception as e:
+        logging.debug(f"Network trackers will attach on the first settle wait: {e}")
+
+
+def wait_until_settled(page, timeout_ms=5000, quiet_ms=300, max_inflight=2):
+    """
+    Wait until the page is ready to be looked at or interacted with again,
+    returning as soon as it is rather than after a fixed delay.
+
+    The page counts as settled once it has reached DOMContentLoaded, at most
+    max_inflight requests are still pending, and the DOM has not changed for
+    quiet_ms. Navigations that start while waiting (e.g. after a click) are
+    followed automatically.
+
+    Args:
+        page: Playwright page object
+        timeout_ms: Hard deadline for the whole wait
+        quiet_ms: How long the DOM and network must stay quiet
+        max_inflight: Pending requests tolerated (long-polling, analytics beacons)
+
+    Returns:
+        bool: True if the page settled, False if the deadline was hit first
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    tracker = get_network_tracker(page)
+
+    def remaining_ms():
+        return max(0, int((deadline - time.monotonic()) * 1000))
+
+    errors = 0
+    while remaining_ms() > 0:
+        try:
+            page.wait_for_load_state("domcontentloaded", timeout=remaining_ms() or 1)
+            dom_quiet = page.evaluate(DOM_QUIET_JS, {"quietMs": quiet_ms, "timeoutMs": remaining_ms()})
+        except Exception as e:
+            errors += 1
+            if page.is_closed() or errors >= MAX_INTERRUPTIONS:
+                logging.debug(f"Giving up settle wait: {e}")
+                return False
+            # Most often the execution context was destroyed by a navigation; wait for the new document
+            logging.debug(f"Settle wait interrupted, retrying: {e}")
+            continue
+
+        errors = 0
+        if tracker.is_idle(max_inflight, quiet_ms / 1000):
+            return True
+        if not dom_quiet:
+            break
+
+    logging.debug(f"Page did not settle within {timeout_ms}ms ({tracker.inflight} requests in flight)")
+    return False
+
+
+async def async_wait_until_settled(page, timeout_ms=5000, quiet_ms=300, max_inflight=2):
+    """Async counterpart of wait_until_settled() for async Playwright pages."""
+    deadline = time.monotonic() + timeout_ms / 1000
+    tracker = get_network_tracker(page)
+
+    def remaining_ms():
+        return max(0, int((deadline - time.monotonic()) * 1000))
+
+    errors = 0
+    while remaining_ms() > 0:
+        try:
+            await page.wait_for_load_state("domcontentloaded", timeout=remaining_ms() or 1)
+            dom_quiet = await page.evaluate(DOM_QUIET_JS, {"quietMs": quiet_ms, "timeoutMs": remaining_ms()})
+        except Exception as e:
+            errors += 1
+            if page.is_closed() or errors >= MAX_INTERRUPTIONS:
+                logging.debug(f"Giving up settle wait: {e}")
+                return False
+            logging.debug(f"Settle wait interrupted, retrying: {e}")
+            continue
+
+        errors = 0
+        if tracker.is_idle(max_inflight, quiet_ms / 1000):
+            return True
+        if not dom_quiet:
+            break
+
+    logging.debug(f"Page did not settle within {timeout_ms}ms ({tracker.inflight} requests in flight)")
+    return False
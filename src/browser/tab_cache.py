@@ -0,0 +1,267 @@
+# File: src/browser/tab_cache.py
+
+import asyncio
+import logging
+import os
+import weakref
+from urllib.parse import urlparse, urlunparse
+
+from src.browser.settle import get_network_tracker
+
+HEAP_JS = "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+
+
+def tab_key(url):
+    """Normalize a URL for tab lookup: lowercase host, no fragment, no trailing slash, no www."""
+    parsed = urlparse(url or "")
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunparse((parsed.scheme.lower(), host, parsed.path.rstrip("/"), "", parsed.query, ""))
+
+
+class TabLRU:
+    """
+    Keeps the last max_tabs pages of a browser context alive as background
+    tabs so backtracking is a tab switch instead of a reload.
+
+    navigate() opens a URL in a new tab and parks the current one; if a live
+    tab already shows that URL it is brought to the front instead. Tabs are
+    looked up by the URL they show now (not the one they were opened with),
+    so in-tab navigation by clicks is tracked for free. When there are more
+    than max_tabs tabs, or their combined JS heap exceeds the memory cap, the
+    least recently used tabs are closed.
+
+    Callers must continue with the page navigate()/back() return.
+    """
+
+    def __init__(self, context, max_tabs=4, memory_cap_mb=1024, on_new_page=None):
+        """
+        Args:
+            context: Browser context the tabs live in
+            max_tabs: Maximum live tabs, the current one included; 0 disables tab reuse
+            memory_cap_mb: Maximum combined JS heap of the live tabs
+            on_new_page: Optional callback run on every tab this cache opens (e.g. apply_stealth_mode)
+        """
+        self.context = context
+        self.max_tabs = max_tabs
+        self.memory_cap_bytes = memory_cap_mb * 1024 * 1024
+        self.on_new_page = on_new_page
+        self.pages = []      # least recently used first; the last one is the current tab
+        self.history = []    # tab keys in visit order, for back()
+        self.stats = {"switches": 0, "opened": 0, "evicted": 0, "back_reloads": 0}
+
+    # ---- Bookkeeping ----
+
+    @property
+    def enabled(self):
+        return self.max_tabs > 0
+
+    @property
+    def current(self):
+        self._prune()
+        return self.pages[-1] if self.pages else None
+
+    def _prune(self):
+        self.pages = [page for page in self.pages if not page.is_closed()]
+
+    def _touch(self, page):
+        if page in self.pages:
+            self.pages.remove(page)
+        self.pages.append(page)
+
+    def _visit(self, page):
+        key = tab_key(page.url)
+        if not self.history or self.history[-1] != key:
+            self.history.append(key)
+
+    def find(self, url):
+        """Return the live tab currently showing url, or None."""
+        key = tab_key(url)
+        self._prune()
+        for page in reversed(self.pages):
+            if tab_key(page.url) == key:
+                return page
+        return None
+
+    def is_live(self, url):
+        return self.find(url) is not None
+
+    def _previous_key(self, page):
+        """The most recent visited URL that differs from the page's current one."""
+        current = tab_key(page.url)
+        for key in reversed(self.history):
+            if key != current:
+                return key
+        return None
+
+    def _heap_bytes(self, page):
+        try:
+            return page.evaluate(HEAP_JS) or 0
+        except Exception:
+            return 0
+
+    def _evict(self):
+        self._prune()
+        while len(self.pages) > self.max_tabs:
+            self._close(self.pages[0])
+        if self.memory_cap_bytes and len(self.pages) > 1:
+            heaps = {page: self._heap_bytes(page) for page in self.pages}
+            total = sum(heaps.values())
+            for page in list(self.pages[:-1]):
+                if total <= self.memory_cap_bytes:
+                    break
+                total -= heaps[page]
+                self._close(page)
+
+    def _close(self, page):
+        try:
+            page.close()
+        except Exception as e:
+            logging.debug(f"Failed to close background tab: {e}")
+        if page in self.pages:
+            self.pages.remove(page)
+        self.stats["evicted"] += 1
+
+    def mark_active(self, page):
+        """Record that page is now the tab in front (after the caller brought it there)."""
+        self._touch(page)
+        self._visit(page)
+        self.stats["switches"] += 1
+        logging.info(f"Switched to live tab {page.url}")
+        return page
+
+    def _switch(self, page):
+        page.bring_to_front()
+        return self.mark_active(page)
+
+    # ---- Navigation ----
+
+    def navigate(self, page, url, wait_until="domcontentloaded"):
+        """
+        Show url, switching to a live tab when one has it.
+
+        Args:
+            page: The page the caller is currently driving
+            url: URL to show
+
+        Returns:
+            tuple: (page to continue with, True if a live tab was reused)
+        """
+        self._touch(page)
+        self._visit(page)
+        live = self.find(url) if self.enabled else None
+        if live is not None and live != page:
+            return self._switch(live), True
+        if not self.enabled or live == page:
+            page.goto(url, wait_until=wait_until)
+            self._visit(page)
+            return page, False
+
+        new_page = self.context.new_page()
+        get_network_tracker(new_page)  # before goto, so the navigation's requests are counted
+        try:
+            if self.on_new_page:
+                self.on_new_page(new_page)
+            new_page.goto(url, wait_until=wait_until)
+        except Exception:
+            new_page.close()
+            raise
+        self._touch(new_page)
+        self._visit(new_page)
+        self.stats["opened"] += 1
+        self._evict()
+        return new_page, False
+
+    def back(self, page, wait_until="domcontentloaded"):
+        """
+        Go back to the previously visited URL, switching tabs when it is still live.
+
+        Returns:
+            tuple: (page to continue with, True if a live tab was reused)
+        """
+        self._touch(page)
+        previous = self._previous_key(page)
+        live = self.find(previous) if previous and self.enabled else None
+        if live is not None and live != page:
+            return self._switch(live), True
+        self.stats["back_reloads"] += 1
+        page.go_back(wait_until=wait_until)
+        self._visit(page)
+        return page, False
+
+    async def async_navigate(self, page, url, wait_until="domcontentloaded"):
+        """Async counterpart of navigate() for async Playwright pages."""
+        self._touch(page)
+        self._visit(page)
+        live = self.find(url) if self.enabled else None
+        if live is not None and live != page:
+            await live.bring_to_front()
+            return self.mark_active(live), True
+        if not self.enabled or live == page:
+            await page.goto(url, wait_until=wait_until)
+            self._visit(page)
+            return page, False
+
+        new_page = await self.context.new_page()
+        get_network_tracker(new_page)  # before goto, so the navigation's requests are counted
+        if self.on_new_page:
+            result = self.on_new_page(new_page)
+            if asyncio.iscoroutine(result):
+                await result
+        await new_page.goto(url, wait_until=wait_until)
+        self._touch(new_page)
+        self._visit(new_page)
+        self.stats["opened"] += 1
+        # Async pages are evicted by count only; heap probing would need one await per tab
+        self._prune()
+        while len(self.pages) > self.max_tabs:
+            page_to_close = self.pages.pop(0)
+            await page_to_close.close()
+            self.stats["evicted"] += 1
+        return new_page, False
+
+    async def async_back(self, page, wait_until="domcontentloaded"):
+        """Async counterpart of back()."""
+        self._touch(page)
+        previous = self._previous_key(page)
+        live = self.find(previous) if previous and self.enabled else None
+        if live is not None and live != page:
+            await live.bring_to_front()
+            return self.mark_active(live), True
+        self.stats["back_reloads"] += 1
+        await page.go_back(wait_until=wait_until)
+        self._visit(page)
+        return page, False
+
+    def summary(self):
+        """Return tab cache statistics."""
+        self._prune()
+        return dict(self.stats, live_tabs=len(self.pages), max_tabs=self.max_tabs)
+
+
+_tab_caches = weakref.WeakKeyDictionary()
+
+
+def get_tab_cache(context, on_new_page=None):
+    """
+    Return the context's tab cache, creating it on first use with
+    AGENT_TAB_CACHE (max live tabs; default 0, which keeps navigation in
+    place on the current page) and
+    AGENT_TAB_CACHE_MB (JS heap cap, default 1024).
+    """
+    tabs = _tab_caches.get(context)
+    if tabs is None:
+        tabs = TabLRU(context,
+                      max_tabs=int(os.getenv("AGENT_TAB_CACHE", "0")),
+                      memory_cap_mb=float(os.getenv("AGENT_TAB_CACHE_MB", "1024")),
+                      on_new_page=on_new_page)
+        _tab_caches[context] = tabs
+    elif on_new_page and tabs.on_new_page is None:
+        tabs.on_new_page = on_new_page
+    return tabs
+
+
+def forget_tab_cache(context):
+    """Drop a context's tab cache (e.g. when a pooled context is reset)."""
+    _tab_caches.pop(context, None)
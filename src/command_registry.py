@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ValidationError, Field
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 import logging
 
 class CommandSchema(BaseModel):
@@ -23,28 +23,54 @@ class CommandRegistry:
             logging.warning(f"Handler for action '{action}' is already registered. Overwriting.")
         self.registry[action] = handler
     
-    def execute(self, command_data: Dict[str, Any]) -> bool:
+    def validate(self, command_data: Dict[str, Any]) -> Optional[CommandSchema]:
         """
-        Validate and execute a command.
+        Validate a command without executing it.
         
         Args:
             command_data: A dictionary representing the command.
             
         Returns:
-            bool: True if command executed successfully, False otherwise.
+            Optional[CommandSchema]: The validated command, or None if it is invalid.
         """
         try:
-            command = CommandSchema(**command_data)
-        except ValidationError as e:
+            return CommandSchema(**command_data)
+        except (ValidationError, TypeError) as e:
             logging.error(f"Command validation error: {e}")
-            return False
+            return None
+    
+    def dispatch(self, command: CommandSchema) -> bool:
+        """
+        Execute an already validated command.
         
+        Args:
+            command: A validated CommandSchema.
+            
+        Returns:
+            bool: True if command executed successfully, False otherwise.
+        """
         handler = self.registry.get(command.action)
         if not handler:
             logging.error(f"No handler registered for action: {command.action}")
             return False
         
         return handler(command)
+    
+    def execute(self, command_data: Dict[str, Any]) -> bool:
+        """
+        Validate and execute a command.
+        
+        Args:
+            command_data: A dictionary representing the command.
+            
+        Returns:
+            bool: True if command executed successfully, False otherwise.
+        """
+        command = self.validate(command_data)
+        if command is None:
+            return False
+        
+        return self.dispatch(command)
 
     def list_registered(self) -> List[str]:
         """
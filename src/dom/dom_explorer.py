@@ -2,25 +2,50 @@
 
 import logging
 
-# Try to import BeautifulSoup but don't fail if it's not available
-try:
-    from bs4 import BeautifulSoup
-    BS4_AVAILABLE = True
-except ImportError:
-    BS4_AVAILABLE = False
-    logging.warning("BeautifulSoup4 (bs4) not found. Some DOM parsing features will be unavailable. Install with: pip install beautifulsoup4")
+from src.dom.page_snapshot import get_page_snapshot
+
+# Same banner selectors as the page snapshot's cookieBanner check (src/dom/page_snapshot.py)
+COOKIE_BANNER_SELECTORS = [
+    '[id*="cookie" i]', '[class*="cookie" i]', '[id*="consent" i]', '[class*="consent" i]',
+    '[id*="gdpr" i]', '[class*="gdpr" i]', '[aria-label*="cookie" i]', '#CybotCookiebotDialog',
+    '.cc-window', '.cookie-banner', '.cookie-policy', '.cookie-notice'
+]
+
+# Interactive elements, as probed inside shadow trees by find_shadow_dom()
+SHADOW_SELECTORS = ("button", "a[href]", "input:not([type='hidden'])", "textarea", "select", "[role='button']")
+
+def _load_beautifulsoup():
+    """Import BeautifulSoup on first use; returns None (with a warning) if it's not available."""
+    try:
+        from bs4 import BeautifulSoup
+        return BeautifulSoup
+    except ImportError:
+        logging.warning("BeautifulSoup4 (bs4) not found. Some DOM parsing features will be unavailable. Install with: pip install beautifulsoup4")
+        return None
 
 class DOMExplorer:
     def __init__(self, html_content=None):
-        if BS4_AVAILABLE and html_content:
+        BeautifulSoup = _load_beautifulsoup() if html_content else None
+        if BeautifulSoup:
             self.soup = BeautifulSoup(html_content, 'html.parser')
         else:
             self.soup = None
+        self._text_index = None
 
     def find_by_text(self, text):
+        """
+        Text nodes matching the text, best match first, looked up in an
+        inverted index over the document's text nodes (built on first use)
+        instead of scanning every node per query.
+        """
         if not self.soup:
             return []
-        return self.soup.find_all(text=lambda t: text.lower() in t.lower())
+        if self._text_index is None:
+            from src.dom.text_index import TextIndex
+            nodes = [node for node in self.soup.find_all(string=True) if node.strip()]
+            self._text_index = TextIndex((i, str(node), 1.0, node) for i, node in enumerate(nodes))
+        index = self._text_index
+        return [node for _, _, node in index.search(text, limit=len(index.labels), fuzzy=False, min_score=1.0)]
 
     def find_interactive_elements(self):
         if not self.soup:
@@ -47,9 +72,29 @@ class DOMExplorer:
         else:
             return self.soup.find_all(lambda tag: tag.has_attr(attribute))
 
-    def find_shadow_dom(self):
-        # This is a placeholder as BeautifulSoup can't directly handle shadow DOM
-        pass
+    def find_shadow_dom(self, page=None, selectors=SHADOW_SELECTORS):
+        """
+        Find elements inside open shadow roots, in every frame: the first
+        visible match of each selector per frame.
+
+        Serialized HTML has no shadow trees, so the parsed document cannot
+        show them; this queries the live page instead.
+
+        Args:
+            page: Playwright page object (without one there is nothing to query)
+            selectors: Selectors to look for inside the shadow trees
+
+        Returns:
+            list: Frame query matches (see src/dom/frame_query.py) of shadow-tree elements
+        """
+        if page is None:
+            return []
+        try:
+            from src.dom.frame_query import query_frames
+            return [match for match in query_frames(page, selectors, deep=True) if match.get("shadow")]
+        except Exception as e:
+            logging.error(f"Error querying shadow DOM: {e}")
+            return []
     
     @staticmethod
     def find_interactive_elements(page):
@@ -63,38 +108,8 @@ class DOMExplorer:
             dict: Counts of different interactive element types
         """
         try:
-            result = page.evaluate("""() => {
-                const buttons = document.querySelectorAll('button, input[type="button"], input[type="submit"], [role="button"]');
-                const links = document.querySelectorAll('a');
-                const inputs = document.querySelectorAll('input[type="text"], input[type="email"], textarea, [contenteditable="true"]');
-                const selects = document.querySelectorAll('select, [role="listbox"]');
-                const searchBoxes = Array.from(document.querySelectorAll('input[type="search"], input[name="q"], input[placeholder*="search" i], input[aria-label*="search" i]'))
-                    .map(el => ({
-                        id: el.id,
-                        name: el.name,
-                        placeholder: el.placeholder,
-                        ariaLabel: el.getAttribute('aria-label')
-                    }));
-                
-                // Extract heading text content
-                const headings = {};
-                for (let i = 1; i <= 6; i++) {
-                    const headingEls = document.querySelectorAll(`h${i}`);
-                    if (headingEls.length > 0) {
-                        headings[`h${i}`] = Array.from(headingEls).map(el => el.textContent.trim()).slice(0, 3);
-                    }
-                }
-                
-                return {
-                    buttons: buttons.length,
-                    links: links.length,
-                    inputs: inputs.length,
-                    selects: selects.length,
-                    search_boxes: searchBoxes,
-                    headings: headings
-                };
-            }""")
-            return result
+            # Served from the iteration's page snapshot (one round trip shared with other consumers)
+            return get_page_snapshot(page).interactive_elements()
         except Exception as e:
             logging.error(f"Error finding interactive elements: {e}")
             return {
@@ -111,6 +126,9 @@ class DOMExplorer:
         """
         Find and handle cookie consent banners using DOM techniques.
         
+        Runs the page's consent engine (see src/handlers/consent_engine.py),
+        which only goes to the page when the snapshot shows a banner.
+        
         Args:
             page: Playwright page object
             
@@ -118,64 +136,8 @@ class DOMExplorer:
             bool: True if a cookie banner was successfully handled, False otherwise
         """
         try:
-            result = page.evaluate("""() => {
-                // Common cookie banner selectors
-                const cookieSelectors = [
-                    '[id*="cookie" i]',
-                    '[class*="cookie" i]',
-                    '[id*="consent" i]',
-                    '[class*="consent" i]',
-                    '[id*="gdpr" i]',
-                    '[class*="gdpr" i]',
-                    '[aria-label*="cookie" i]',
-                    '#CybotCookiebotDialog',
-                    '.cc-window',
-                    '.cookie-banner',
-                    '.cookie-policy',
-                    '.cookie-notice'
-                ];
-                
-                // Check if any cookie banner is present
-                let cookieBanner = null;
-                for (const selector of cookieSelectors) {
-                    const element = document.querySelector(selector);
-                    if (element && element.offsetParent !== null) {
-                        cookieBanner = element;
-                        break;
-                    }
-                }
-                
-                // If found, try to handle it
-                if (cookieBanner) {
-                    // First try to find and click reject/decline buttons
-                    const rejectTexts = ['reject', 'decline', 'no, thanks', 'opt-out', 'refuse'];
-                    for (const text of rejectTexts) {
-                        const buttons = Array.from(cookieBanner.querySelectorAll('button, a, .button'));
-                        for (const button of buttons) {
-                            if (button.textContent.toLowerCase().includes(text) && button.offsetParent !== null) {
-                                button.click();
-                                return true;
-                            }
-                        }
-                    }
-                    
-                    // If no reject button found, try accept/agree buttons
-                    const acceptTexts = ['accept', 'agree', 'allow', 'got it', 'understand', 'i accept', 'ok', 'continue'];
-                    for (const text of acceptTexts) {
-                        const buttons = Array.from(cookieBanner.querySelectorAll('button, a, .button'));
-                        for (const button of buttons) {
-                            if (button.textContent.toLowerCase().includes(text) && button.offsetParent !== null) {
-                                button.click();
-                                return true;
-                            }
-                        }
-                    }
-                }
-                
-                return false;
-            }""")
-            
-            return result
+            from src.handlers.consent_engine import dismiss_consent
+            return dismiss_consent(page)["dismissed"]
         except Exception as e:
             logging.error(f"Error handling cookie consent: {e}")
             return False
@@ -0,0 +1,335 @@
+# File: src/dom/dom_mirror.py
+
+import logging
+import os
+import time
+
+from src.dom.page_helpers import call_helper, async_call_helper, random_name
+
+BINDING_NAME = random_name()
+MAX_TRACKED = 2000
+FLUSH_MS = 100
+
+# Installs (once per document) a MutationObserver that keeps track of the
+# visible interactive elements and pushes batched deltas to Python:
+#     {token, seq, added: [records], changed: [records], removed: [ids],
+#      order: [ids in document order] (when membership changed),
+#      summaryStale: true (when the page may have changed since the last summary)}
+# Mutations are coalesced for FLUSH_MS; only the subtrees they touched are
+# rescanned. Scrolling, resizing, the load event and size changes of the
+# document or a tracked element (ResizeObserver) re-measure the tracked
+# elements' rects. The page summary is not recomputed per flush; Python
+# fetches it with the "mirrorSummary" helper when it is read and stale.
+# Runs as the "mirror" helper (see src/dom/page_helpers.py), which returns the
+# full state Python resyncs from; the mirror lives in the library's private
+# state and its ids become the library's element index.
+MIRROR_FUNCTION_JS = """
+let domMirror = null;
+
+function startMirror({maxTracked, binding, flushMs}) {
+    if (!domMirror) {
+        const token = Math.random().toString(36).slice(2, 10);
+        const nodes = new Map();      // id -> element
+        const ids = new WeakMap();    // element -> id
+        const sent = new Map();       // id -> last record sent, as JSON
+        const dirty = new Set();
+        let nextId = 1, seq = 0, scheduled = false, rectsDirty = false, summaryStale = false;
+        const schedule = () => {
+            if (!scheduled) {
+                scheduled = true;
+                setTimeout(flush, flushMs);
+            }
+        };
+        const remeasure = () => { rectsDirty = true; summaryStale = true; schedule(); };
+        // Layout shifts (images, fonts, lazy content) move elements without a mutation
+        const resizes = typeof ResizeObserver === 'function' ? new ResizeObserver(remeasure) : null;
+
+        const track = (id, el) => {
+            nodes.set(id, el);
+            if (resizes) resizes.observe(el);
+        };
+        const untrack = id => {
+            const el = nodes.get(id);
+            if (el && resizes) resizes.unobserve(el);
+            nodes.delete(id);
+            sent.delete(id);
+        };
+
+        const update = (el, delta) => {
+            let id = ids.get(el);
+            if (!el.isConnected || !isVisible(el)) {
+                if (id !== undefined && nodes.has(id)) {
+                    untrack(id);
+                    delta.removed.push(id);
+                }
+                return;
+            }
+            if (id === undefined) {
+                if (nodes.size >= maxTracked) return;
+                id = nextId++;
+                ids.set(el, id);
+            }
+            const record = describeElement(el, id);
+            const key = JSON.stringify(record);
+            if (!nodes.has(id)) {
+                track(id, el);
+                delta.added.push(record);
+            } else if (sent.get(id) !== key) {
+                delta.changed.push(record);
+            }
+            sent.set(id, key);
+        };
+
+        // The element itself, the interactive element it sits in, and the interactive elements below it
+        const affected = node => {
+            const root = node.nodeType === 1 ? node : node.parentElement;
+            if (!root || !root.isConnected) return [];
+            const found = Array.from(root.querySelectorAll(INTERACTIVE_SELECTOR));
+            const owner = root.closest(INTERACTIVE_SELECTOR);
+            if (owner) found.push(owner);
+            return found;
+        };
+
+        const order = () => Array.from(document.querySelectorAll(INTERACTIVE_SELECTOR))
+            .map(el => ids.get(el))
+            .filter(id => id !== undefined && nodes.has(id));
+
+        const flush = () => {
+            scheduled = false;
+            const delta = {token, added: [], changed: [], removed: []};
+            for (const [id, el] of nodes) {
+                if (!el.isConnected) {
+                    untrack(id);
+                    delta.removed.push(id);
+                }
+            }
+            let roots = Array.from(dirty);
+            dirty.clear();
+            // Many scattered mutations: one rescan of the whole body is cheaper
+            if (roots.length > 200 && document.body) roots = [document.body];
+            const seen = new Set();
+            for (const root of roots) {
+                if (roots.length > 1 && roots.some(other => other !== root && other.contains && other.contains(root))) continue;
+                for (const el of affected(root)) {
+                    if (!seen.has(el)) {
+                        seen.add(el);
+                        update(el, delta);
+                    }
+                }
+            }
+            if (rectsDirty) {
+                rectsDirty = false;
+                for (const el of Array.from(nodes.values())) {
+                    if (!seen.has(el)) update(el, delta);
+                }
+            }
+            if (summaryStale) {
+                summaryStale = false;
+                delta.summaryStale = true;
+            }
+            if (!delta.added.length && !delta.changed.length && !delta.removed.length && !delta.summaryStale) return;
+            if (delta.added.length || delta.removed.length) delta.order = order();
+            delta.seq = ++seq;
+            // Without the binding the delta is lost; Python notices the gap in seq and resyncs
+            if (window[binding]) window[binding](delta);
+        };
+
+        new MutationObserver(records => {
+            for (const record of records) dirty.add(record.target);
+            summaryStale = true;
+            schedule();
+        }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+        // Scrolling moves rects but leaves the summary as it was
+        window.addEventListener('scroll', () => { rectsDirty = true; schedule(); }, {capture: true, passive: true});
+        window.addEventListener('resize', remeasure, {passive: true});
+        window.addEventListener('load', remeasure);
+        if (resizes) resizes.observe(document.documentElement);
+
+        const full = () => {
+            for (const id of Array.from(nodes.keys())) untrack(id);
+            dirty.clear();
+            const delta = {added: [], changed: [], removed: []};
+            for (const el of document.querySelectorAll(INTERACTIVE_SELECTOR)) update(el, delta);
+            summaryStale = false;
+            return {token, seq, elements: delta.added, order: order(), summary: pageSummary()};
+        };
+
+        hideGlobal(binding);
+        domMirror = {token, full, get: id => nodes.get(id)};
+    }
+    // Element ids are mirror ids, valid for as long as this document lives
+    elementIndex = {generation: domMirror.token, get: domMirror.get};
+    return domMirror.full();
+}
+
+// The current page summary, or null if the page is a different document
+// than the mirror's (Python then resyncs)
+function mirrorSummary({token}) {
+    return domMirror && domMirror.token === token ? pageSummary() : null;
+}
+"""
+
+
+class DOMMirror:
+    """
+    A live copy of a page's interactive elements and page summary, kept up
+    to date by deltas the page pushes through expose_binding.
+
+    Deltas carry sequence numbers. A gap (a delta that was lost), a delta
+    from another document or a main-frame navigation marks the mirror out of
+    sync, and the next read resyncs from a full capture. While in sync,
+    reading the interactive elements costs no round trip.
+
+    Deltas are delivered whenever the Playwright connection is pumped (any
+    call on the page), so the mirror is current as of the last page call,
+    e.g. the iteration's screenshot. The page summary (headings, text, forms,
+    banner) is only recomputed when it is read after the page changed, which
+    costs one small round trip instead of a pageSummary() run per flush.
+    """
+
+    def __init__(self, page, max_tracked=MAX_TRACKED, flush_ms=FLUSH_MS):
+        self.page = page
+        self.max_tracked = max_tracked
+        self.flush_ms = flush_ms
+        self.token = None
+        self.seq = 0
+        self.elements = {}
+        self.order = []
+        self.summary = {}
+        self.summary_stale = False
+        self.in_sync = False
+        self.attached = False
+        self.observing = False
+        self.stats = {"deltas": 0, "resyncs": 0, "gaps": 0, "reads": 0, "summary_reads": 0,
+                      "resync_ms": 0.0}
+        page.on("framenavigated", self._on_frame_navigated)
+
+    # ---- Deltas ----
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self.in_sync = False
+
+    def _on_binding(self, source, delta):
+        if not self.in_sync or delta.get("token") != self.token:
+            return  # a resync is pending anyway
+        seq = delta.get("seq", 0)
+        if seq <= self.seq:
+            return  # already part of the last full capture
+        if seq != self.seq + 1:
+            self.stats["gaps"] += 1
+            self.in_sync = False
+            logging.debug(f"DOM mirror missed deltas ({self.seq} -> {seq}); resyncing on next read")
+            return
+        self.seq = seq
+        self.stats["deltas"] += 1
+        for element_id in delta.get("removed", []):
+            self.elements.pop(element_id, None)
+        for record in delta.get("added", []) + delta.get("changed", []):
+            self.elements[record["id"]] = record
+        if "order" in delta:
+            self.order = delta["order"]
+        if delta.get("summaryStale"):
+            self.summary_stale = True
+
+    # ---- Full capture ----
+
+    def _args(self):
+        return {"maxTracked": self.max_tracked, "binding": BINDING_NAME, "flushMs": self.flush_ms}
+
+    def _load(self, state, start):
+        self.token = state["token"]
+        self.seq = state["seq"]
+        self.elements = {record["id"]: record for record in state["elements"]}
+        self.order = state["order"]
+        self.summary = state["summary"]
+        self.summary_stale = False
+        self.in_sync = True
+        self.stats["resyncs"] += 1
+        self.stats["resync_ms"] = round(self.stats["resync_ms"] + (time.perf_counter() - start) * 1000, 1)
+
+    def attach(self):
+        """
+        Expose the delta binding to the page. Without it the page cannot push
+        deltas, so the mirror is unusable and callers capture snapshots instead.
+        """
+        self.attached = True
+        try:
+            self.page.expose_binding(BINDING_NAME, self._on_binding)
+            self.observing = True
+        except Exception as e:
+            logging.debug(f"DOM mirror unavailable: {e}")
+        return self.observing
+
+    async def async_attach(self):
+        """Async counterpart of attach()."""
+        self.attached = True
+        try:
+            await self.page.expose_binding(BINDING_NAME, self._on_binding)
+            self.observing = True
+        except Exception as e:
+            logging.debug(f"DOM mirror unavailable: {e}")
+        return self.observing
+
+    def resync(self):
+        """Install the observer if needed and reload the full state (one round trip)."""
+        start = time.perf_counter()
+        self._load(call_helper(self.page, "mirror", self._args()), start)
+
+    async def async_resync(self):
+        """Async counterpart of resync()."""
+        start = time.perf_counter()
+        self._load(await async_call_helper(self.page, "mirror", self._args()), start)
+
+    def refresh(self):
+        """
+        Bring the mirror up to date for a read: a full resync when out of
+        sync, otherwise a fresh page summary if the page changed since the
+        last one.
+
+        Returns:
+            bool: True if a full resync was needed
+        """
+        if self.in_sync and self.summary_stale:
+            summary = call_helper(self.page, "mirrorSummary", {"token": self.token})
+            if summary is not None:
+                self._load_summary(summary)
+                return False
+        if not self.in_sync or self.summary_stale:
+            self.resync()
+            return True
+        return False
+
+    async def async_refresh(self):
+        """Async counterpart of refresh()."""
+        if self.in_sync and self.summary_stale:
+            summary = await async_call_helper(self.page, "mirrorSummary", {"token": self.token})
+            if summary is not None:
+                self._load_summary(summary)
+                return False
+        if not self.in_sync or self.summary_stale:
+            await self.async_resync()
+            return True
+        return False
+
+    def _load_summary(self, summary):
+        self.summary = summary
+        self.summary_stale = False
+        self.stats["summary_reads"] += 1
+
+    # ---- Reading ----
+
+    def snapshot_data(self, max_elements):
+        """The mirror's state in the shape of a full snapshot capture."""
+        self.stats["reads"] += 1
+        elements = [self.elements[element_id] for element_id in self.order if element_id in self.elements]
+        return dict(self.summary, url=self.page.url, elements=elements[:max_elements], generation=self.token)
+
+    def summary_stats(self):
+        """Return mirror statistics."""
+        return dict(self.stats, tracked=len(self.elements), in_sync=self.in_sync)
+
+
+def dom_mirror_enabled():
+    """The mirror is on unless AGENT_DOM_MIRROR is set to 0."""
+    return os.getenv("AGENT_DOM_MIRROR", "1") != "0"
@@ -0,0 +1,330 @@
+# File: src/dom/element_cache.py
+
+import logging
+import time
+import weakref
+
+from src.dom.page_helpers import call_helper, async_call_helper, random_name
+from src.dom.selector_probe import MATCH_ATTRIBUTE, probe_selectors, async_probe_selectors, locator_for
+
+BINDING_NAME = random_name()
+
+# A cache hit the watcher reported nothing about is trusted without a page
+# call for this long after it was last confirmed
+RECHECK_AFTER_MS = 2000
+
+# Registers an element matched by the "probe" helper (see src/dom/page_helpers.py)
+# with the in-page watcher, which reports {removed: [ids], changed: [ids]}:
+# removed when the element left the document, changed when its subtree or
+# the attributes of an ancestor (a class that hides it) mutated, or the page
+# scrolled or resized (which makes the recorded geometry stale). Reports are
+# batched per microtask. Watched elements keep their tags (see startTagBatch()
+# in page_helpers.py) for as long as they are watched.
+#
+# A cache hit the watcher reported as changed, or one that has not been
+# confirmed for a while, is confirmed by the "recheck" helper first: still
+# connected, visible (and enabled if required), and no higher-ranked selector
+# visible. A confirmed element is tagged again; a stale one is unwatched.
+WATCHER_FUNCTION_JS = """
+let elementWatcher = null;
+
+function isWatched(el) {
+    return !!elementWatcher && elementWatcher.has(el);
+}
+
+function watchElement(id, el, binding) {
+    if (!elementWatcher) {
+        const watched = new Map();
+        const removed = new Set();
+        const changed = new Set();
+        let scheduled = false;
+        const flush = () => {
+            scheduled = false;
+            const report = {removed: Array.from(removed), changed: Array.from(changed)};
+            removed.clear();
+            changed.clear();
+            if ((report.removed.length || report.changed.length) && window[binding]) {
+                window[binding](report);
+            }
+        };
+        const schedule = () => {
+            if (!scheduled) {
+                scheduled = true;
+                queueMicrotask(flush);
+            }
+        };
+        const observer = new MutationObserver(records => {
+            for (const [id, el] of watched) {
+                if (!el.isConnected) {
+                    watched.delete(id);
+                    removed.add(id);
+                    schedule();
+                } else if (records.some(record => el.contains(record.target) ||
+                                        (record.type === 'attributes' && record.target.contains(el)))) {
+                    changed.add(id);
+                    schedule();
+                }
+            }
+        });
+        observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+        const moved = () => {
+            for (const id of watched.keys()) changed.add(id);
+            if (watched.size) schedule();
+        };
+        window.addEventListener('scroll', moved, {capture: true, passive: true});
+        window.addEventListener('resize', moved, {passive: true});
+        hideGlobal(binding);
+        elementWatcher = {
+            watch: (id, el) => watched.set(id, el),
+            unwatch: id => watched.delete(id),
+            get: id => watched.get(id),
+            has: el => Array.from(watched.values()).includes(el)
+        };
+    }
+    elementWatcher.watch(id, el);
+}
+
+function recheckWatched({watchId, higher, requireEnabled, tag}) {
+    const el = elementWatcher && elementWatcher.get(watchId);
+    const stale = reason => {
+        if (elementWatcher) elementWatcher.unwatch(watchId);
+        return {stale: reason};
+    };
+    if (!el || !el.isConnected) return stale('removed');
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0 || getComputedStyle(el).visibility === 'hidden') {
+        return stale('hidden');
+    }
+    if (requireEnabled && (el.matches(':disabled') || el.getAttribute('aria-disabled') === 'true')) {
+        return stale('disabled');
+    }
+    if (higher && higher.length && probeSelectors(higher, true, requireEnabled).some(result => result.visible)) {
+        return stale('outranked');
+    }
+    if (tag) {
+        startTagBatch();
+        tagElement(el, tag.attribute, tag.value);
+    }
+    return {rect: rectOf(el)};
+}
+"""
+
+
+class ElementCache:
+    """
+    Per-page cache of resolved selectors: the locator for the matched element
+    and its last-known geometry.
+
+    Repeated lookups of the same selector list (the search box on every
+    iteration, a button that is checked and then clicked) are answered from
+    the cache without probing the selectors again. A hit is returned without
+    any page call unless the in-page watcher reported the element changed
+    (its subtree or an ancestor's attributes mutated, the page scrolled or
+    resized) or it was last confirmed more than RECHECK_AFTER_MS ago; then
+    one small "recheck" call confirms the element, refreshes its rect and
+    renews its tag.
+    Entries are dropped when:
+        - the main frame navigates (everything) or a child frame navigates or
+          detaches (that frame's entries)
+        - the in-page MutationObserver sees the element removed
+        - the recheck finds the element removed, hidden (e.g. through an
+          ancestor), disabled when an enabled one is required, or outranked by
+          a higher-ranked selector that became visible
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.entries = {}
+        self.keys_by_id = {}
+        self.next_id = 1
+        self.attached = False
+        self.observing = False
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "stale_hits": 0, "rechecks": 0}
+        page.on("framenavigated", self._on_frame_navigated)
+        page.on("framedetached", self._on_frame_detached)
+
+    # ---- Invalidation ----
+
+    def _on_binding(self, source, report):
+        for cache_id in report.get("removed", []):
+            key = self.keys_by_id.pop(cache_id, None)
+            if key is not None and self.entries.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+        for cache_id in report.get("changed", []):
+            entry = self.entries.get(self.keys_by_id.get(cache_id))
+            if entry is not None:
+                entry["changed"] = True
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self.invalidate()
+        else:
+            self.invalidate(target=frame)
+
+    def _on_frame_detached(self, frame):
+        self.invalidate(target=frame)
+
+    def invalidate(self, target=None):
+        """Drop every entry, or only the entries resolved in the given frame."""
+        for key in list(self.entries):
+            if target is None or key[0] is target:
+                entry = self.entries.pop(key)
+                self.keys_by_id.pop(entry["cache_id"], None)
+                self.stats["invalidations"] += 1
+
+    # ---- Lookup ----
+
+    @staticmethod
+    def _recheck_args(entry, selectors, require_enabled):
+        args = {"watchId": entry["cache_id"], "higher": list(selectors[:entry["rank"]]),
+                "requireEnabled": require_enabled}
+        if entry.get("tag"):
+            args["tag"] = {"attribute": MATCH_ATTRIBUTE, "value": entry["tag"]}
+        return args
+
+    @staticmethod
+    def _needs_recheck(entry):
+        return entry["changed"] or (time.perf_counter() - entry["checked_at"]) * 1000 >= RECHECK_AFTER_MS
+
+    def _confirm(self, key, entry, result):
+        """The entry with its rect refreshed if the recheck confirmed it; otherwise drop it."""
+        self.stats["rechecks"] += 1
+        if result and not result.get("stale"):
+            entry["rect"] = result.get("rect") or entry["rect"]
+            entry["changed"] = False
+            entry["checked_at"] = time.perf_counter()
+            self.stats["hits"] += 1
+            return entry
+        logging.debug(f"Cached match {entry['selector']} is stale: {(result or {}).get('stale', 'recheck failed')}")
+        self.stats["stale_hits"] += 1
+        if self.entries.pop(key, None) is not None:
+            self.keys_by_id.pop(entry["cache_id"], None)
+            self.stats["invalidations"] += 1
+        return None
+
+    def _lookup(self, key, selectors, require_enabled, target):
+        entry = self.entries.get(key)
+        if entry is not None and not self._needs_recheck(entry):
+            self.stats["hits"] += 1
+            return entry
+        if entry is not None:
+            try:
+                result = call_helper(target, "recheck", self._recheck_args(entry, selectors, require_enabled))
+            except Exception as e:
+                logging.debug(f"Element cache recheck failed: {e}")
+                result = None
+            entry = self._confirm(key, entry, result)
+        if entry is None:
+            self.stats["misses"] += 1
+        return entry
+
+    async def _async_lookup(self, key, selectors, require_enabled, target):
+        entry = self.entries.get(key)
+        if entry is not None and not self._needs_recheck(entry):
+            self.stats["hits"] += 1
+            return entry
+        if entry is not None:
+            try:
+                result = await async_call_helper(target, "recheck",
+                                                 self._recheck_args(entry, selectors, require_enabled))
+            except Exception as e:
+                logging.debug(f"Element cache recheck failed: {e}")
+                result = None
+            entry = self._confirm(key, entry, result)
+        if entry is None:
+            self.stats["misses"] += 1
+        return entry
+
+    def _store(self, key, target, cache_id, match):
+        entry = dict(match, cache_id=cache_id, locator=locator_for(target, match), changed=False,
+                     checked_at=time.perf_counter())
+        # Matches found through the per-selector locator fallback are not watched in the page
+        if self.observing and not match.get("fallback"):
+            self.entries[key] = entry
+            self.keys_by_id[cache_id] = key
+        return entry
+
+    def resolve(self, selectors, require_enabled=False, target=None):
+        """
+        Return the best-ranked visible match for the selectors, from the cache
+        when possible.
+
+        Args:
+            selectors: Candidate selectors, best first (a single selector is accepted)
+            require_enabled: Skip disabled elements
+            target: Frame to search in; defaults to the page
+
+        Returns:
+            dict: Probe match (selector, rank, rect, tag_selector, ...) plus a
+                  "locator" for exactly that element, or None if nothing is visible
+        """
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        target = target or self.page
+        key = (target, tuple(selectors), require_enabled)
+        entry = self._lookup(key, selectors, require_enabled, target)
+        if entry is not None:
+            return entry
+
+        if not self.attached:
+            self.attach()
+        cache_id = self.next_id
+        self.next_id += 1
+        matches = probe_selectors(target, selectors, first=True, require_enabled=require_enabled,
+                                  options={"watchId": cache_id, "binding": BINDING_NAME})
+        return self._store(key, target, cache_id, matches[0]) if matches else None
+
+    async def async_resolve(self, selectors, require_enabled=False, target=None):
+        """Async counterpart of resolve() for async Playwright pages."""
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        target = target or self.page
+        key = (target, tuple(selectors), require_enabled)
+        entry = await self._async_lookup(key, selectors, require_enabled, target)
+        if entry is not None:
+            return entry
+
+        if not self.attached:
+            await self.async_attach()
+        cache_id = self.next_id
+        self.next_id += 1
+        matches = await async_probe_selectors(target, selectors, first=True, require_enabled=require_enabled,
+                                              options={"watchId": cache_id, "binding": BINDING_NAME})
+        return self._store(key, target, cache_id, matches[0]) if matches else None
+
+    # ---- Setup ----
+
+    def attach(self):
+        """
+        Expose the invalidation binding to the page. Without it mutations
+        cannot be reported, so results are returned but never cached.
+        """
+        self.attached = True
+        try:
+            self.page.expose_binding(BINDING_NAME, self._on_binding)
+            self.observing = True
+        except Exception as e:
+            logging.debug(f"Element cache running without mutation tracking: {e}")
+        return self.observing
+
+    async def async_attach(self):
+        """Async counterpart of attach()."""
+        self.attached = True
+        try:
+            await self.page.expose_binding(BINDING_NAME, self._on_binding)
+            self.observing = True
+        except Exception as e:
+            logging.debug(f"Element cache running without mutation tracking: {e}")
+        return self.observing
+
+
+_caches = weakref.WeakKeyDictionary()
+
+
+def get_element_cache(page):
+    """Return the page's element cache, creating it on first use."""
+    cache = _caches.get(page)
+    if cache is None:
+        cache = ElementCache(page)
+        _caches[page] = cache
+    return cache
@@ -0,0 +1,244 @@
+# File: src/dom/element_index.py
+
+import logging
+import weakref
+
+from src.dom.page_helpers import call_helper, async_call_helper, random_name
+from src.dom.page_snapshot import get_page_snapshot, async_get_page_snapshot
+from src.dom.text_index import element_rank
+
+PROMPT_LIMIT = 80
+ID_ATTRIBUTE = random_name("data-")
+
+# Looks up a numbered element among the handles the snapshot kept in the page
+# and tags it so Playwright can address it with a plain CSS selector (the tag
+# expires like the probe's, see page_helpers.py). Fails
+# (instead of guessing) when a newer snapshot replaced the numbering, the page
+# navigated, or the element was removed. Runs as the "resolveId" helper, and
+# "clickById" clicks the element in the page (see src/dom/page_helpers.py).
+RESOLVE_FUNCTION_JS = """
+function indexedElement(generation, id) {
+    if (!elementIndex || elementIndex.generation !== generation) return {stale: true};
+    const el = elementIndex.get(id);
+    if (!el || !el.isConnected) return {missing: true};
+    return {el};
+}
+
+function resolveIndexed({generation, id, attribute}) {
+    const found = indexedElement(generation, id);
+    if (!found.el) return found;
+    const tag = `${generation}-${id}`;
+    startTagBatch();
+    tagElement(found.el, attribute, tag);
+    return {tag, rect: rectOf(found.el)};
+}
+
+function clickIndexed({generation, id}) {
+    const found = indexedElement(generation, id);
+    if (!found.el) return found;
+    found.el.click();
+    return {clicked: true};
+}
+"""
+
+
+def element_label(element):
+    """Short human-readable label of an indexed element."""
+    label = (element.get("text") or element.get("ariaLabel") or element.get("placeholder")
+             or element.get("name") or element.get("domId") or "")
+    return " ".join(label.split())[:60]
+
+
+def durable_selector(element):
+    """
+    A selector for the element that still works on a later visit (for the
+    trajectory cache), or None when nothing identifies it.
+    """
+    tag = element.get("tag") or "*"
+    if element.get("domId"):
+        return f"[id='{element['domId']}']"
+    if element.get("name"):
+        return f"{tag}[name='{element['name']}']"
+    label = element_label(element)
+    if label and "'" not in label:
+        return f"{tag}:has-text('{label[:40]}')"
+    return None
+
+
+class ElementIndex:
+    """
+    Numbered list of the visible interactive elements of one page snapshot.
+
+    The reasoner is shown the ids instead of having to invent selectors; a
+    command like {"action": "click", "id": 17} is resolved straight to the
+    element the snapshot numbered, with its current rect, in one round trip
+    and without selector probing.
+    """
+
+    def __init__(self, snapshot):
+        self.generation = snapshot.generation
+        self.url = snapshot.url
+        self.elements = {element["id"]: element for element in snapshot.elements if "id" in element}
+        self.stats = {"resolved": 0, "stale": 0, "missing": 0}
+
+    def get(self, element_id):
+        try:
+            return self.elements.get(int(element_id))
+        except (TypeError, ValueError):
+            return None
+
+    def describe(self, element):
+        kind = element.get("role") or element.get("tag")
+        if element.get("tag") == "input":
+            kind = f"input[{element.get('type') or 'text'}]"
+        x, y, width, height = element.get("rect") or (0, 0, 0, 0)
+        disabled = " disabled" if element.get("enabled") is False else ""
+        return f"[{element['id']}] {kind} \"{element_label(element)}\" at ({x},{y},{width}x{height}){disabled}"
+
+    def prompt_text(self, limit=PROMPT_LIMIT):
+        """The elements as prompt lines, one per element, in document order."""
+        lines = [self.describe(element) for element in list(self.elements.values())[:limit]]
+        if len(self.elements) > limit:
+            lines.append(f"... {len(self.elements) - limit} more not listed")
+        return "\n".join(lines)
+
+    def _match(self, element_id, result):
+        if not result or result.get("stale") or result.get("missing"):
+            key = "stale" if result and result.get("stale") else "missing"
+            self.stats[key] += 1
+            logging.error(f"Element id {element_id} is no longer on the page ({key})")
+            return None
+        self.stats["resolved"] += 1
+        element = self.elements[int(element_id)]
+        return {
+            "id": int(element_id),
+            "generation": self.generation,
+            "selector": f"[{ID_ATTRIBUTE}='{result['tag']}']",
+            "index": 0,
+            "rect": result["rect"],
+            "label": element_label(element),
+            "durable_selector": durable_selector(element),
+        }
+
+    def resolve(self, page, element_id):
+        """
+        Resolve an id to the element the snapshot numbered.
+
+        Returns:
+            dict: selector (tagging exactly that element), rect, label,
+                  durable_selector and a "locator", or None if it is gone
+        """
+        if self.get(element_id) is None:
+            logging.error(f"Unknown element id {element_id}")
+            return None
+        try:
+            result = call_helper(page, "resolveId", {"generation": self.generation, "id": int(element_id),
+                                                     "attribute": ID_ATTRIBUTE})
+        except Exception as e:
+            logging.error(f"Failed to resolve element id {element_id}: {e}")
+            return None
+        match = self._match(element_id, result)
+        if match:
+            match["locator"] = page.locator(match["selector"])
+        return match
+
+    async def async_resolve(self, page, element_id):
+        """Async counterpart of resolve() for async Playwright pages."""
+        if self.get(element_id) is None:
+            logging.error(f"Unknown element id {element_id}")
+            return None
+        try:
+            result = await async_call_helper(page, "resolveId", {"generation": self.generation, "id": int(element_id),
+                                                                 "attribute": ID_ATTRIBUTE})
+        except Exception as e:
+            logging.error(f"Failed to resolve element id {element_id}: {e}")
+            return None
+        match = self._match(element_id, result)
+        if match:
+            match["locator"] = page.locator(match["selector"])
+        return match
+
+
+_indexes = weakref.WeakKeyDictionary()
+
+
+def index_page(page):
+    """
+    Number the page's interactive elements from its current snapshot and
+    remember the index as the one the reasoner is shown.
+    """
+    index = ElementIndex(get_page_snapshot(page))
+    _indexes[page] = index
+    return index
+
+
+async def async_index_page(page):
+    """Async counterpart of index_page()."""
+    index = ElementIndex(await async_get_page_snapshot(page))
+    _indexes[page] = index
+    return index
+
+
+def get_element_index(page):
+    """Return the index last shown to the reasoner for this page, or None."""
+    return _indexes.get(page)
+
+
+def resolve_element(page, element_id):
+    """Resolve an id from the page's current element index (see ElementIndex.resolve())."""
+    index = get_element_index(page)
+    if index is None:
+        logging.error(f"No element index for this page; cannot resolve id {element_id}")
+        return None
+    return index.resolve(page, element_id)
+
+
+async def async_resolve_element(page, element_id):
+    """Async counterpart of resolve_element()."""
+    index = get_element_index(page)
+    if index is None:
+        logging.error(f"No element index for this page; cannot resolve id {element_id}")
+        return None
+    return await index.async_resolve(page, element_id)
+
+
+def _text_lookup(snapshot, queries, tags, near, viewport, min_score):
+    if isinstance(queries, str):
+        queries = [queries]
+    where = None
+    if tags:
+        where = lambda element: bool(element) and (element.get("tag") in tags or element.get("role") in tags)
+    results = snapshot.text_index().search_any(queries, limit=1, where=where, min_score=min_score,
+                                               rank=element_rank(viewport, near))
+    return results[0][1] if results else None
+
+
+def find_by_text(page, queries, tags=None, near=None, min_score=1.0):
+    """
+    Resolve the element whose text best matches one of the queries, through
+    the snapshot's inverted text index instead of probing selectors.
+
+    Args:
+        queries: Text, or texts in order of preference (the first that matches wins)
+        tags: Optional tag names or roles to restrict the match to (e.g. ("button", "a"))
+        near: Optional (x, y) point; closer elements rank higher
+        min_score: Weakest match accepted (see TextIndex.search()); the default
+                   asks for every word, exactly or as a prefix, plus the phrase
+
+    Returns:
+        dict: Resolved match (see ElementIndex.resolve()), or None
+    """
+    snapshot = get_page_snapshot(page)
+    element_id = _text_lookup(snapshot, queries, tags, near, page.viewport_size, min_score)
+    if element_id is None:
+        return None
+    return ElementIndex(snapshot).resolve(page, element_id)
+
+
+async def async_find_by_text(page, queries, tags=None, near=None, min_score=1.0):
+    """Async counterpart of find_by_text()."""
+    snapshot = await async_get_page_snapshot(page)
+    element_id = _text_lookup(snapshot, queries, tags, near, page.viewport_size, min_score)
+    if element_id is None:
+        return None
+    return await ElementIndex(snapshot).async_resolve(page, element_id)
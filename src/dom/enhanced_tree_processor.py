@@ -1,62 +1,173 @@
 # File: src/dom/enhanced_tree_processor.py
 
-from bs4 import BeautifulSoup
+from lxml import etree
+
+INTERACTIVE_TAGS = {'button', 'a', 'input', 'select', 'textarea'}
+INTERACTIVE_ROLES = {'button', 'link', 'checkbox', 'radio', 'menuitem', 'tab', 'textbox', 'combobox', 'switch'}
+
+# Subtrees that never hold anything visible or interactive
+SKIPPED_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object'}
+
+# The only attributes kept on a node; everything else (class lists, data-*,
+# inline handlers) stays in the parsed document instead of being copied
+KEPT_ATTRIBUTES = ('id', 'name', 'type', 'href', 'role', 'aria-label', 'placeholder', 'value', 'title')
+
+TEXT_LIMIT = 80
+
+
+class DOMNode:
+    """One element of the processed tree. Only the kept attributes are stored."""
+
+    __slots__ = ('tag', 'attributes', 'visible', 'interactive', 'text', 'children')
+
+    def __init__(self, tag, attributes, visible=True, interactive=False, text=None):
+        self.tag = tag
+        self.attributes = attributes
+        self.visible = visible
+        self.interactive = interactive
+        self.text = text
+        self.children = []
+
+    def to_dict(self):
+        """The nested dict shape earlier versions returned (built iteratively)."""
+        root = {}
+        stack = [(self, root)]
+        while stack:
+            node, out = stack.pop()
+            out.update(tag=node.tag, attributes=node.attributes, visible=node.visible,
+                       interactive=node.interactive, text=node.text, children=[])
+            for child in node.children:
+                child_out = {}
+                out['children'].append(child_out)
+                stack.append((child, child_out))
+        return root
+
+    def __repr__(self):
+        return f"DOMNode({self.tag!r}, interactive={self.interactive}, children={len(self.children)})"
+
 
 class EnhancedDOMTreeProcessor:
     def __init__(self, html_content):
         """
         Initialize the processor with the raw HTML content.
         """
-        self.soup = BeautifulSoup(html_content, 'html.parser')
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        # Plain etree elements: lxml.html's element class lookup costs more than the walk itself
+        self.document = etree.fromstring(html_content or b'<html></html>', etree.HTMLParser())
+        if self.document is None:
+            self.document = etree.fromstring(b'<html></html>', etree.HTMLParser())
         self.dom_tree = None
 
-    def build_dom_tree(self):
+    def build_dom_tree(self, prune=True):
         """
         Build the enhanced DOM tree with detailed element information,
         including visibility and interactivity status.
-        Returns a structured representation of the DOM.
+
+        The walk is iterative (no recursion limit) and invisible subtrees are
+        skipped without being visited. With prune=True only interactive
+        elements and their ancestors become nodes; they are attached to the
+        tree by walking up from each one, so pruned elements never get a node.
+
+        Returns:
+            DOMNode: Root of the tree (call to_dict() for plain dicts)
         """
-        self.dom_tree = self._process_element(self.soup)
+        root = self._make_node(self.document, interactive=False)
+        nodes = {self.document: root}
+        make_node = self._make_node
+        for element, interactive in self._walk():
+            if prune and not interactive:
+                continue
+            node = make_node(element, interactive)
+            nodes[element] = node
+            # Create the missing ancestors; the walk is in document order, so
+            # appending keeps every children list in document order too
+            parent = element.getparent()
+            while parent not in nodes:
+                nodes[parent] = make_node(parent, interactive=False)
+                nodes[parent].children.append(node)
+                node = nodes[parent]
+                parent = parent.getparent()
+            nodes[parent].children.append(node)
+        self.dom_tree = root
         return self.dom_tree
 
-    def _process_element(self, element):
-        """
-        Recursively process an element and its children.
-        Check for visibility, interactivity, and gather relevant attributes.
-        """
-        # Build a node representation for the current element
-        node = {
-            'tag': element.name,
-            'attributes': element.attrs,
-            'visible': self._is_visible(element),
-            'interactive': self._is_interactive(element),
-            'children': []
-        }
-        # Process child elements recursively
-        for child in element.children:
-            if child.name is not None:
-                node['children'].append(self._process_element(child))
-        return node
+    def _walk(self):
+        """(element, interactive) for the visible elements below the root, in document order."""
+        walker = etree.iterwalk(self.document, events=('start',))
+        next(walker)  # the root itself
+        classify = self._classify
+        for _, element in walker:
+            interactive = classify(element)
+            if interactive is None:
+                walker.skip_subtree()
+                continue
+            yield element, interactive
+
+    def iter_interactive(self):
+        """
+        Stream the visible interactive elements in document order without
+        building a tree.
+
+        Yields:
+            DOMNode: One childless node per interactive element
+        """
+        for element, interactive in self._walk():
+            if interactive:
+                yield self._make_node(element, interactive=True)
+
+    def _classify(self, element):
+        """
+        None for elements whose subtree is skipped (invisible, script-like,
+        comments), otherwise whether the element is interactive. Most
+        elements have no attributes, so those are decided by tag alone.
+        """
+        tag = element.tag
+        if not isinstance(tag, str) or tag in SKIPPED_TAGS:
+            return None
+        if not element.attrib:
+            return tag in INTERACTIVE_TAGS
+        if not self._is_visible(element):
+            return None
+        return self._is_interactive(element)
+
+    def _make_node(self, element, interactive):
+        get = element.get
+        attributes = {key: value for key in KEPT_ATTRIBUTES if (value := get(key)) is not None}
+        # Text is only gathered for interactive elements; it is what labels them
+        text = ' '.join(''.join(element.itertext()).split())[:TEXT_LIMIT] if interactive else None
+        return DOMNode(element.tag, attributes, visible=True, interactive=interactive, text=text)
 
     def _is_visible(self, element):
         """
         Determine if an element is visible based on its style attributes or properties.
-        Checks for inline styles like 'display:none' or 'visibility:hidden'.
+        Checks for inline styles like 'display:none' or 'visibility:hidden', the
+        hidden attribute, aria-hidden and hidden inputs.
         """
-        style = element.get('style', '')
-        if 'display:none' in style or 'visibility:hidden' in style:
+        style = element.get('style')
+        if style:
+            style = style.replace(' ', '').lower()
+            if 'display:none' in style or 'visibility:hidden' in style:
+                return False
+        if element.get('hidden') is not None or element.get('aria-hidden') == 'true':
+            return False
+        if element.tag == 'input' and (element.get('type') or '').lower() == 'hidden':
             return False
         return True
 
     def _is_interactive(self, element):
         """
         Determine if an element is interactive.
-        Heuristics include checking the tag name (e.g., button, a, input)
-        and the presence of event handler attributes like 'onclick'.
+        Heuristics include checking the tag name (e.g., button, a, input),
+        interactive ARIA roles, contenteditable and the presence of event
+        handler attributes like 'onclick'.
         """
-        interactive_tags = ['button', 'a', 'input', 'select', 'textarea']
-        if element.name in interactive_tags:
+        if element.tag in INTERACTIVE_TAGS:
+            return True
+        if element.get('onclick') is not None:
+            return True
+        if (element.get('role') or '').lower() in INTERACTIVE_ROLES:
             return True
-        if element.get('onclick'):
+        if (element.get('contenteditable') or '').lower() in ('', 'true') and element.get('contenteditable') is not None:
             return True
         return False
@@ -0,0 +1,283 @@
+# File: src/dom/frame_query.py
+
+import asyncio
+import logging
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from src.dom.page_helpers import call_helper, async_call_helper
+from src.dom.selector_probe import collect_matches, locator_for, probe_args
+
+SLOW_FRAME_MS = 1000     # frames (per origin) slower than this on average are skipped
+FRAME_TIMEOUT_MS = 2000  # queries give up on a frame after this long (and skip its origin)
+MIN_SAMPLES = 2          # calls before an origin can be judged slow by its average
+
+
+def is_child_frame(frame):
+    """Frame filter for queries that already covered the main frame."""
+    return frame.parent_frame is not None
+
+
+def frame_key(frame, main_frame):
+    """Key the timings are kept under: "main", or the frame's origin."""
+    if frame == main_frame:
+        return "main"
+    parts = urlsplit(frame.url or "")
+    return f"{parts.scheme}://{parts.netloc}" if parts.netloc else (frame.url or "about:blank")
+
+
+class FrameQuery:
+    """
+    Runs one selector query in every frame of a page and merges the matches
+    into page coordinates.
+
+    Matches inside child frames are shifted by the frame element's position
+    on the page. Every frame's round trip is timed per origin; origins that
+    are consistently slow (typically third-party ad or tracking frames) or
+    that timed out are skipped by later queries.
+    """
+
+    def __init__(self, page, slow_ms=SLOW_FRAME_MS, timeout_ms=FRAME_TIMEOUT_MS):
+        self.page = page
+        self.slow_ms = slow_ms
+        self.timeout_ms = timeout_ms
+        self.timings = {}   # frame key -> {"calls", "total_ms", "max_ms", "errors", "timeouts", "skipped"}
+        self.queries = 0
+
+    # ---- Frame selection and timing ----
+
+    def _timing(self, key):
+        return self.timings.setdefault(key, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                             "errors": 0, "timeouts": 0, "skipped": 0})
+
+    def _record(self, key, start, error=None, timed_out=False):
+        elapsed = (time.perf_counter() - start) * 1000
+        timing = self._timing(key)
+        timing["calls"] += 1
+        timing["total_ms"] = round(timing["total_ms"] + elapsed, 1)
+        timing["max_ms"] = round(max(timing["max_ms"], elapsed), 1)
+        if timed_out:
+            timing["timeouts"] += 1
+        elif error is not None:
+            timing["errors"] += 1
+        return round(elapsed, 1)
+
+    def _timed_out(self, start):
+        return (time.perf_counter() - start) * 1000 >= self.timeout_ms
+
+    def is_slow(self, key):
+        """Whether frames under this key are skipped: they timed out, or are slow on average."""
+        if key == "main":
+            return False
+        timing = self.timings.get(key)
+        if not timing:
+            return False
+        if timing["timeouts"]:
+            return True
+        return timing["calls"] >= MIN_SAMPLES and timing["total_ms"] / timing["calls"] > self.slow_ms
+
+    def frames(self, include=None, skip_slow=True):
+        """
+        The frames to query, main frame first.
+
+        Args:
+            include: Optional predicate on frames (e.g. only child frames)
+            skip_slow: Leave out origins judged slow (see is_slow())
+
+        Returns:
+            list: (frame, key) pairs
+        """
+        main_frame = self.page.main_frame
+        selected = []
+        for frame in self.page.frames:
+            try:
+                if (frame != main_frame and frame.is_detached()) or (include and not include(frame)):
+                    continue
+            except Exception:
+                continue
+            key = frame_key(frame, main_frame)
+            if skip_slow and self.is_slow(key):
+                self._timing(key)["skipped"] += 1
+                continue
+            selected.append((frame, key))
+        return selected
+
+    # ---- Merging ----
+
+    def _args(self, selectors, first, require_enabled, deep, order):
+        # Matches are tagged (see locator_for()); Playwright's CSS engine pierces open shadow roots too
+        return probe_args(selectors, first, require_enabled, {"deep": deep}, prefix=f"f{self.queries}-{order}")
+
+    def _matches(self, frame, key, order, results, offset, elapsed, first, visible=None):
+        fallback = lambda selector: (visible or {}).get(selector, False)
+        matches = []
+        for match in collect_matches(results, first, fallback):
+            match = dict(match, frame=frame, frame_key=key, frame_order=order, frame_ms=elapsed)
+            if match.get("rect") and offset:
+                rect = match["rect"]
+                match["rect"] = dict(rect, x=rect["x"] + offset[0], y=rect["y"] + offset[1])
+            match["locator"] = locator_for(frame, match)
+            matches.append(match)
+        return matches
+
+    @staticmethod
+    def _merge(matches, first):
+        # Best-ranked selector wins; between frames, the main frame and then document order
+        matches.sort(key=lambda match: (match["rank"], match["frame_order"]))
+        return matches[:1] if first else matches
+
+    # ---- Queries ----
+
+    def query(self, selectors, first=False, require_enabled=False, deep=True, include=None):
+        """
+        Probe the selectors in every frame and merge the matches.
+
+        The sync Playwright API drives one connection from one thread, so the
+        frames are queried one after another here (one round trip each); the
+        async variant queries them concurrently. Each frame's probe waits at
+        most timeout_ms for the frame's document, and a frame that takes
+        longer than that is counted as timed out, so its origin is skipped
+        from then on.
+
+        Args:
+            selectors: Candidate selectors, best first (see probe_selectors())
+            first: Return only the best match across all frames
+            require_enabled: Skip disabled elements
+            deep: Also match inside open shadow roots
+            include: Optional predicate on frames
+
+        Returns:
+            list: Match dicts as from probe_selectors(), plus frame, frame_key,
+                  frame_ms and a locator; rects are in page coordinates
+        """
+        if not selectors:
+            return []
+        self.queries += 1
+        matches = []
+        for order, (frame, key) in enumerate(self.frames(include)):
+            start = time.perf_counter()
+            try:
+                results = call_helper(frame, "probe", self._args(selectors, first, require_enabled, deep, order),
+                                      timeout_ms=self.timeout_ms)
+                offset = self._offset(frame)
+            except Exception as e:
+                if self._timed_out(start):
+                    self._record(key, start, timed_out=True)
+                    logging.info(f"Frame query timed out in {key}; skipping it from now on")
+                else:
+                    self._record(key, start, error=e)
+                    logging.debug(f"Frame query failed in {key}: {e}")
+                continue
+            # Too slow: its matches still count, but later queries leave the origin out
+            timed_out = self._timed_out(start)
+            elapsed = self._record(key, start, timed_out=timed_out)
+            if timed_out:
+                logging.info(f"Frame query timed out in {key}; skipping it from now on")
+            visible = {}
+            for result in results:
+                if result.get("unsupported"):
+                    try:
+                        visible[result["selector"]] = frame.locator(result["selector"]).first.is_visible()
+                    except Exception:
+                        visible[result["selector"]] = False
+            matches.extend(self._matches(frame, key, order, results, offset, elapsed, first, visible))
+        return self._merge(matches, first)
+
+    async def async_query(self, selectors, first=False, require_enabled=False, deep=True, include=None):
+        """
+        Async counterpart of query(): all frames are queried concurrently, and
+        a frame that takes longer than timeout_ms is abandoned (and its
+        origin skipped from then on).
+        """
+        if not selectors:
+            return []
+        self.queries += 1
+
+        async def run(order, frame, key):
+            start = time.perf_counter()
+            try:
+                results, offset = await asyncio.wait_for(
+                    asyncio.gather(
+                        async_call_helper(frame, "probe", self._args(selectors, first, require_enabled, deep, order)),
+                        self._async_offset(frame)),
+                    self.timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                self._record(key, start, timed_out=True)
+                logging.info(f"Frame query timed out in {key}; skipping it from now on")
+                return []
+            except Exception as e:
+                self._record(key, start, error=e)
+                logging.debug(f"Frame query failed in {key}: {e}")
+                return []
+            elapsed = self._record(key, start)
+            visible = {}
+            for result in results:
+                if result.get("unsupported"):
+                    try:
+                        visible[result["selector"]] = await frame.locator(result["selector"]).first.is_visible()
+                    except Exception:
+                        visible[result["selector"]] = False
+            return self._matches(frame, key, order, results, offset, elapsed, first, visible)
+
+        per_frame = await asyncio.gather(*(run(order, frame, key)
+                                           for order, (frame, key) in enumerate(self.frames(include))))
+        return self._merge([match for matches in per_frame for match in matches], first)
+
+    # ---- Frame offsets ----
+
+    def _offset(self, frame):
+        """Position of the frame's viewport on the page, or None for the main frame."""
+        if frame == self.page.main_frame:
+            return None
+        box = frame.frame_element().bounding_box()
+        return (box["x"], box["y"]) if box else None
+
+    async def _async_offset(self, frame):
+        if frame == self.page.main_frame:
+            return None
+        element = await frame.frame_element()
+        box = await element.bounding_box()
+        return (box["x"], box["y"]) if box else None
+
+    def summary(self):
+        """Per-frame timings (averages included), slowest first."""
+        report = {}
+        for key, timing in self.timings.items():
+            average = timing["total_ms"] / timing["calls"] if timing["calls"] else 0.0
+            report[key] = dict(timing, avg_ms=round(average, 1), slow=self.is_slow(key))
+        return dict(sorted(report.items(), key=lambda item: -item[1]["avg_ms"]))
+
+
+_queries = weakref.WeakKeyDictionary()
+
+
+def get_frame_query(page):
+    """Return the page's frame query (and its timings), creating it on first use."""
+    frame_query = _queries.get(page)
+    if frame_query is None:
+        frame_query = FrameQuery(page)
+        _queries[page] = frame_query
+    return frame_query
+
+
+def query_frames(page, selectors, **kwargs):
+    """Probe the selectors in all frames of the page (see FrameQuery.query())."""
+    return get_frame_query(page).query(selectors, **kwargs)
+
+
+async def async_query_frames(page, selectors, **kwargs):
+    """Async counterpart of query_frames()."""
+    return await get_frame_query(page).async_query(selectors, **kwargs)
+
+
+def first_visible_in_frames(page, selectors, **kwargs):
+    """Return the best-ranked visible match in any frame, or None."""
+    matches = query_frames(page, selectors, first=True, **kwargs)
+    return matches[0] if matches else None
+
+
+async def async_first_visible_in_frames(page, selectors, **kwargs):
+    """Async counterpart of first_visible_in_frames()."""
+    matches = await async_query_frames(page, selectors, first=True, **kwargs)
+    return matches[0] if matches else None
@@ -0,0 +1,336 @@
+# File: src/dom/page_helpers.py
+
+import json
+import logging
+import secrets
+import time
+import weakref
+
+HELPERS_VERSION = 3
+
+
+def random_name(prefix="_"):
+    """
+    A name for something the agent leaves in pages (a global, a binding, an
+    attribute), random per process so page scripts cannot look for a fixed
+    marker.
+    """
+    return prefix + secrets.token_hex(6)
+
+
+# The library's global; it is non-enumerable, and everything else the agent
+# keeps in a page lives inside the library
+HELPERS_NAME = random_name()
+
+# Tags (attributes Playwright locators address) are removed once this many
+# newer tagging calls have happened in the document
+TAG_BATCHES = 8
+
+# The only script sent with a helper call: a constant, so the page compiles it
+# once, and everything that varies travels as structured arguments (no
+# selectors spliced into source, no quoting problems). Reports a missing or
+# outdated library instead of failing, so the caller can install it.
+CALL_JS = """
+([key, name, args, version]) => {
+    const helpers = window[key];
+    if (!helpers || helpers.version < version) return {missing: true};
+    return {value: helpers[name](args)};
+}
+"""
+
+# CALL_JS through a locator on the document element, whose timeout bounds the
+# wait for the frame's document (frames still loading, hung cross-origin frames)
+BOUNDED_CALL_JS = f"(_root, request) => ({CALL_JS.strip()})(request)"
+
+# Library-private state shared by the function sources below: the element
+# index of the last snapshot or DOM mirror capture (see element_index.py),
+# and the tags that are still in the page
+LIBRARY_STATE_JS = """
+let elementIndex = null;
+const tagBatches = [];
+"""
+
+# Helpers that only exist in the library
+LIBRARY_FUNCTIONS_JS = """
+function rectOf(el) {
+    const rect = el.getBoundingClientRect();
+    return {x: rect.x, y: rect.y, width: rect.width, height: rect.height};
+}
+
+// Starts a new batch of tags and removes the tags of batches older than
+// TAG_BATCHES; a tag is only removed if no later batch set it again. Tags of
+// elements the element cache watches move along into the new batch.
+function startTagBatch() {
+    const current = [];
+    tagBatches.push(current);
+    while (tagBatches.length > TAG_BATCHES) {
+        for (const entry of tagBatches.shift()) {
+            const [el, attribute, value] = entry;
+            if (el.getAttribute(attribute) !== value) continue;
+            if (isWatched(el)) current.push(entry);
+            else el.removeAttribute(attribute);
+        }
+    }
+}
+
+function tagElement(el, attribute, value) {
+    if (!tagBatches.length) startTagBatch();
+    el.setAttribute(attribute, value);
+    tagBatches[tagBatches.length - 1].push([el, attribute, value]);
+}
+
+// Bindings exposed by Playwright are plain window properties; keep them out
+// of Object.keys(window) and for...in, like the library itself
+function hideGlobal(name) {
+    const descriptor = Object.getOwnPropertyDescriptor(window, name);
+    if (descriptor && descriptor.enumerable) {
+        Object.defineProperty(window, name, Object.assign(descriptor, {enumerable: false}));
+    }
+}
+
+function isShown(el) {
+    return el.offsetParent !== null || getComputedStyle(el).position === 'fixed';
+}
+
+// Clicks the first visible candidate whose text contains one of the texts,
+// trying the texts in order (so e.g. reject texts can be preferred). With
+// "within", only the first visible container matching one of those selectors
+// is searched; nothing is clicked when none is showing.
+function clickByText({texts, selector, within}) {
+    let scopes = [document];
+    if (within && within.length) {
+        scopes = [];
+        for (const containerSelector of within) {
+            let container = null;
+            try { container = document.querySelector(containerSelector); } catch (e) { continue; }
+            if (container && isShown(container)) {
+                scopes = [container];
+                break;
+            }
+        }
+        if (!scopes.length) return null;
+    }
+    const candidates = scopes.flatMap(scope => Array.from(scope.querySelectorAll(selector || 'button')));
+    for (const text of texts) {
+        const needle = text.toLowerCase();
+        for (const el of candidates) {
+            const label = (el.textContent || el.value || '').toLowerCase();
+            if (label.includes(needle) && isShown(el)) {
+                el.click();
+                return {text, tag: el.tagName.toLowerCase()};
+            }
+        }
+    }
+    return null;
+}
+"""
+
+HELPERS_BODY_JS = """
+    const helpers = {
+        version: VERSION,
+        // {selectors, first, requireEnabled, deep, watchId, binding, tag: {attribute, prefix}}
+        probe: ({selectors, first, requireEnabled, deep, watchId, binding, tag}) => {
+            let count = 0;
+            if (tag) startTagBatch();
+            return probeSelectors(selectors, first, requireEnabled, (el, match) => {
+                if (watchId !== undefined && watchId !== null) watchElement(watchId, el, binding);
+                if (tag) {
+                    match.tag = `${tag.prefix}-${count++}`;
+                    tagElement(el, tag.attribute, match.tag);
+                }
+                match.shadow = el.getRootNode() !== document;
+            }, deep);
+        },
+        // {selector, index}: rect of the index-th match, or null
+        rect: ({selector, index}) => {
+            const el = document.querySelectorAll(selector)[index || 0];
+            return el ? rectOf(el) : null;
+        },
+        snapshot: captureSnapshot,
+        resolveId: resolveIndexed,
+        clickById: clickIndexed,
+        clickByText,
+        // {watchId, higher, requireEnabled, tag: {attribute, value}}: confirm an element cache entry
+        recheck: recheckWatched,
+        // {maxTracked, binding, flushMs}: start the DOM mirror, return its full state
+        mirror: startMirror,
+        // {token}: the page summary, or null if the mirror belongs to another document
+        mirrorSummary,
+        // {dx, dy}
+        scroll: ({dx, dy}) => {
+            window.scrollBy(dx || 0, dy || 0);
+            return {x: window.scrollX, y: window.scrollY};
+        }
+    };
+    Object.defineProperty(window, NAME, {value: helpers, enumerable: false, configurable: true});
+"""
+
+_helpers_js = None
+
+
+def helpers_js():
+    """
+    The helper library: installs itself as the non-enumerable global
+    HELPERS_NAME unless the same or a newer version is already there.
+    Assembled on first use from the function sources of the modules that own
+    them.
+    """
+    global _helpers_js
+    if _helpers_js is None:
+        from src.dom.selector_probe import PROBE_FUNCTION_JS
+        from src.dom.page_snapshot import SNAPSHOT_FUNCTIONS_JS, CAPTURE_FUNCTION_JS
+        from src.dom.element_index import RESOLVE_FUNCTION_JS
+        from src.dom.element_cache import WATCHER_FUNCTION_JS
+        from src.dom.dom_mirror import MIRROR_FUNCTION_JS
+        _helpers_js = (
+            "(() => {\n"
+            f"    const VERSION = {HELPERS_VERSION};\n"
+            f"    const NAME = {json.dumps(HELPERS_NAME)};\n"
+            f"    const TAG_BATCHES = {TAG_BATCHES};\n"
+            "    if (window[NAME] && window[NAME].version >= VERSION) return;\n"
+            + LIBRARY_STATE_JS + PROBE_FUNCTION_JS + SNAPSHOT_FUNCTIONS_JS + CAPTURE_FUNCTION_JS
+            + RESOLVE_FUNCTION_JS + WATCHER_FUNCTION_JS + MIRROR_FUNCTION_JS + LIBRARY_FUNCTIONS_JS
+            + HELPERS_BODY_JS
+            + "})();\n"
+        )
+    return _helpers_js
+
+
+class PageHelpers:
+    """
+    Calls into the helper library of one page or frame, and measures every
+    call: request payload size and round-trip latency, per helper.
+
+    The library is normally present from the start of every document (see
+    install_helpers()). Where it isn't (pages opened before it was
+    installed, contexts created elsewhere) the first call installs it in
+    place and retries.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.stats = {"calls": 0, "installs": 0, "payload_bytes": 0, "latency_ms": 0.0, "helpers": {}}
+
+    def _request(self, name, args):
+        request = [HELPERS_NAME, name, args or {}, HELPERS_VERSION]
+        return request, len(CALL_JS) + len(json.dumps(request))
+
+    def _record(self, name, payload, start):
+        elapsed = (time.perf_counter() - start) * 1000
+        helper = self.stats["helpers"].setdefault(name, {"calls": 0, "payload_bytes": 0, "latency_ms": 0.0,
+                                                         "max_ms": 0.0})
+        helper["calls"] += 1
+        helper["payload_bytes"] += payload
+        helper["latency_ms"] = round(helper["latency_ms"] + elapsed, 1)
+        helper["max_ms"] = round(max(helper["max_ms"], elapsed), 1)
+        self.stats["calls"] += 1
+        self.stats["payload_bytes"] += payload
+        self.stats["latency_ms"] = round(self.stats["latency_ms"] + elapsed, 1)
+
+    def _evaluate(self, request, timeout_ms):
+        if timeout_ms is None:
+            return self.target.evaluate(CALL_JS, request)
+        return self.target.locator(":root").evaluate(BOUNDED_CALL_JS, request, timeout=timeout_ms)
+
+    def _installed(self, name):
+        self.stats["installs"] += 1
+        logging.debug(f"Installed page helpers in place for '{name}'")
+
+    def call(self, name, args=None, timeout_ms=None):
+        """
+        Call a helper in the page.
+
+        Args:
+            name: Helper name (probe, rect, snapshot, resolveId, clickById, clickByText, recheck,
+                  mirror, mirrorSummary, scroll)
+            args: JSON-serializable arguments
+            timeout_ms: Optional bound on waiting for the target's document
+
+        Returns:
+            The helper's result
+
+        Raises:
+            Exception: Whatever the page call raises
+        """
+        request, payload = self._request(name, args)
+        start = time.perf_counter()
+        try:
+            result = self._evaluate(request, timeout_ms)
+            if result.get("missing"):
+                self.target.evaluate(helpers_js())
+                self._installed(name)
+                result = self._evaluate(request, timeout_ms)
+                if result.get("missing"):
+                    raise RuntimeError("page helpers could not be installed")
+            return result.get("value")
+        finally:
+            self._record(name, payload, start)
+
+    async def async_call(self, name, args=None):
+        """Async counterpart of call()."""
+        request, payload = self._request(name, args)
+        start = time.perf_counter()
+        try:
+            result = await self.target.evaluate(CALL_JS, request)
+            if result.get("missing"):
+                await self.target.evaluate(helpers_js())
+                self._installed(name)
+                result = await self.target.evaluate(CALL_JS, request)
+                if result.get("missing"):
+                    raise RuntimeError("page helpers could not be installed")
+            return result.get("value")
+        finally:
+            self._record(name, payload, start)
+
+    def summary(self):
+        """Calls, installs, payload bytes and latency, overall and per helper (with averages)."""
+        helpers = {}
+        for name, helper in self.stats["helpers"].items():
+            helpers[name] = dict(helper, avg_ms=round(helper["latency_ms"] / helper["calls"], 2),
+                                 avg_payload_bytes=helper["payload_bytes"] // helper["calls"])
+        return dict(self.stats, helpers=helpers)
+
+
+_helpers = weakref.WeakKeyDictionary()
+_installed_contexts = weakref.WeakSet()
+
+
+def get_page_helpers(target):
+    """Return the helpers of a page or frame, creating them on first use."""
+    helpers = _helpers.get(target)
+    if helpers is None:
+        helpers = PageHelpers(target)
+        _helpers[target] = helpers
+    return helpers
+
+
+def call_helper(target, name, args=None, timeout_ms=None):
+    """Call a helper in a page or frame (see PageHelpers.call())."""
+    return get_page_helpers(target).call(name, args, timeout_ms)
+
+
+async def async_call_helper(target, name, args=None):
+    """Async counterpart of call_helper()."""
+    return await get_page_helpers(target).async_call(name, args)
+
+
+def install_helpers(context):
+    """Install the helper library in every document of the context, once per context."""
+    if context in _installed_contexts:
+        return
+    try:
+        context.add_init_script(helpers_js())
+        _installed_contexts.add(context)
+    except Exception as e:
+        logging.debug(f"Page helpers will be installed per page on first use: {e}")
+
+
+async def async_install_helpers(context):
+    """Async counterpart of install_helpers()."""
+    if context in _installed_contexts:
+        return
+    try:
+        await context.add_init_script(helpers_js())
+        _installed_contexts.add(context)
+    except Exception as e:
+        logging.debug(f"Page helpers will be installed per page on first use: {e}")
@@ -0,0 +1,326 @@
+# File: src/dom/page_snapshot.py
+
+import logging
+import time
+import weakref
+
+from src.dom.page_helpers import call_helper, async_call_helper
+
+MAX_ELEMENTS = 300
+
+# Shared by the one-shot capture below and the incremental mirror
+# (src/dom/dom_mirror.py): the interactive element selector, visibility,
+# the compact element record and the page-level summary.
+SNAPSHOT_FUNCTIONS_JS = """
+const INTERACTIVE_SELECTOR = 'a[href], button, input:not([type="hidden"]), textarea, select, [role="button"], ' +
+                             '[role="link"], [contenteditable="true"]';
+
+function isVisible(el) {
+    if (el.offsetParent === null && getComputedStyle(el).position !== 'fixed') return false;
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) return false;
+    const style = getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function describeElement(el, id) {
+    const rect = el.getBoundingClientRect();
+    return {
+        id,
+        tag: el.tagName.toLowerCase(),
+        role: el.getAttribute('role'),
+        text: (el.innerText || el.textContent || el.value || '').replace(/\\s+/g, ' ').trim().slice(0, 80),
+        domId: el.id || null,
+        name: el.getAttribute('name'),
+        placeholder: el.getAttribute('placeholder'),
+        type: el.getAttribute('type'),
+        href: el.getAttribute('href'),
+        ariaLabel: el.getAttribute('aria-label'),
+        rect: [Math.round(rect.x), Math.round(rect.y), Math.round(rect.width), Math.round(rect.height)],
+        enabled: !(el.matches(':disabled') || el.getAttribute('aria-disabled') === 'true')
+    };
+}
+
+function pageSummary() {
+    const all = selector => Array.from(document.querySelectorAll(selector));
+
+    const searchBoxes = all('input[type="search"], input[name="q"], textarea[name="q"], ' +
+                            'input[placeholder*="search" i], input[aria-label*="search" i]')
+        .map(el => ({
+            id: el.id,
+            name: el.name,
+            placeholder: el.placeholder,
+            ariaLabel: el.getAttribute('aria-label'),
+            visible: isVisible(el)
+        }));
+
+    const headings = {};
+    for (let i = 1; i <= 6; i++) {
+        const headingEls = all(`h${i}`);
+        if (headingEls.length > 0) {
+            headings[`h${i}`] = headingEls.map(el => el.textContent.trim()).slice(0, 3);
+        }
+    }
+
+    const visibleText = all('h1, h2, h3, p')
+        .filter(el => el.offsetParent !== null)
+        .map(el => el.textContent.trim())
+        .filter(t => t.length > 0)
+        .slice(0, 10);
+
+    const forms = all('form').slice(0, 3).map(form => {
+        const formInputs = Array.from(form.querySelectorAll('input'));
+        return {
+            id: form.id,
+            action: form.action,
+            method: form.method,
+            inputCount: formInputs.length,
+            inputTypes: formInputs.map(input => input.type)
+        };
+    });
+
+    // Same banner selectors as the consent engine's banner_text strategy (COOKIE_BANNER_SELECTORS in dom_explorer.py)
+    const cookieSelectors = [
+        '[id*="cookie" i]', '[class*="cookie" i]', '[id*="consent" i]', '[class*="consent" i]',
+        '[id*="gdpr" i]', '[class*="gdpr" i]', '[aria-label*="cookie" i]', '#CybotCookiebotDialog',
+        '.cc-window', '.cookie-banner', '.cookie-policy', '.cookie-notice'
+    ];
+    let cookieBanner = null;
+    for (const selector of cookieSelectors) {
+        const el = document.querySelector(selector);
+        if (el && el.offsetParent !== null) {
+            cookieBanner = selector;
+            break;
+        }
+    }
+
+    return {
+        url: location.href,
+        title: document.title,
+        counts: {
+            buttons: document.querySelectorAll('button, input[type="button"], input[type="submit"], [role="button"]').length,
+            links: document.querySelectorAll('a').length,
+            inputs: document.querySelectorAll('input[type="text"], input[type="email"], textarea, [contenteditable="true"]').length,
+            selects: document.querySelectorAll('select, [role="listbox"]').length,
+            images: document.images.length,
+            plainButtons: document.querySelectorAll('button').length,
+            allInputs: document.querySelectorAll('input, textarea').length
+        },
+        searchBoxes,
+        headings,
+        visibleText,
+        forms,
+        cookieBanner
+    };
+}
+"""
+
+# Everything the DOM consumers of one iteration read, collected in a single
+# round trip: counts, interactive elements with rects and computed
+# visibility, search boxes, headings, visible text, forms and whether a
+# cookie banner is showing. Runs as the "snapshot" helper (see
+# src/dom/page_helpers.py).
+CAPTURE_FUNCTION_JS = """
+function captureSnapshot({maxElements}) {
+    // Visible interactive elements are numbered from 1 and kept in the
+    // library's elementIndex, so an id resolves to the very element the model
+    // saw (see element_index.py)
+    const elements = [];
+    const handles = [];
+    for (const el of document.querySelectorAll(INTERACTIVE_SELECTOR)) {
+        if (elements.length >= maxElements) break;
+        if (!isVisible(el)) continue;
+        handles.push(el);
+        elements.push(describeElement(el, elements.length + 1));
+    }
+    const generation = Math.random().toString(36).slice(2, 10);
+    elementIndex = {generation, get: id => handles[id - 1]};
+
+    return Object.assign(pageSummary(), {elements, generation});
+}
+"""
+
+
+class PageSnapshot:
+    """
+    One capture of the page's DOM state, shared by every consumer of an
+    iteration (interactive element counts, the AI's DOM context, cookie
+    banner and search box checks).
+    """
+
+    __slots__ = ("url", "title", "counts", "search_boxes", "headings", "visible_text",
+                 "forms", "elements", "generation", "cookie_banner", "captured_at", "capture_ms", "_text_index")
+
+    def __init__(self, data, capture_ms=0.0):
+        self.url = data.get("url")
+        self.title = data.get("title")
+        self.counts = data.get("counts") or {}
+        self.search_boxes = data.get("searchBoxes") or []
+        self.headings = data.get("headings") or {}
+        self.visible_text = data.get("visibleText") or []
+        self.forms = data.get("forms") or []
+        self.elements = data.get("elements") or []      # visible interactive elements, numbered from 1
+        self.generation = data.get("generation")        # token of the in-page element handles
+        self.cookie_banner = data.get("cookieBanner")   # selector of the visible banner, or None
+        self.captured_at = time.time()
+        self.capture_ms = capture_ms
+        self._text_index = None
+
+    def text_index(self):
+        """Inverted text index over the elements, built on first use."""
+        if self._text_index is None:
+            from src.dom.text_index import TextIndex
+            self._text_index = TextIndex.from_elements(self.elements)
+        return self._text_index
+
+    @property
+    def has_search_box(self):
+        return any(box.get("visible") for box in self.search_boxes)
+
+    def interactive_elements(self):
+        """The result shape of DOMExplorer.find_interactive_elements()."""
+        return {
+            "buttons": self.counts.get("buttons", 0),
+            "links": self.counts.get("links", 0),
+            "inputs": self.counts.get("inputs", 0),
+            "selects": self.counts.get("selects", 0),
+            "search_boxes": [{key: box.get(key) for key in ("id", "name", "placeholder", "ariaLabel")}
+                             for box in self.search_boxes],
+            "headings": self.headings,
+        }
+
+    def dom_context(self):
+        """The result shape of extract_dom_context()."""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "elementCounts": {
+                "buttons": self.counts.get("plainButtons", 0),
+                "links": self.counts.get("links", 0),
+                "inputs": self.counts.get("allInputs", 0),
+                "images": self.counts.get("images", 0),
+            },
+            "visibleText": self.visible_text,
+            "forms": self.forms,
+        }
+
+
+class SnapshotCache:
+    """
+    Holds the current snapshot of one page. It is dropped when the main
+    frame navigates; callers that change the page in place (clicks, typing,
+    the start of a new iteration) call invalidate().
+
+    With the DOM mirror on (AGENT_DOM_MIRROR, default on) a dropped snapshot
+    is rebuilt from the mirror's incrementally updated state (plus a fresh
+    page summary if the page changed); a full capture only happens when the
+    mirror is out of sync.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.snapshot = None
+        self.mirror = None
+        self.stats = {"captures": 0, "mirror_reads": 0, "hits": 0, "capture_ms": 0.0}
+        try:
+            page.on("framenavigated", self._on_frame_navigated)
+            from src.dom.dom_mirror import DOMMirror, dom_mirror_enabled
+            if dom_mirror_enabled():
+                self.mirror = DOMMirror(page)
+        except Exception as e:
+            logging.debug(f"Snapshot cache running without navigation tracking: {e}")
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self.snapshot = None
+
+    def invalidate(self):
+        self.snapshot = None
+
+    def _lookup(self):
+        if self.snapshot is not None:
+            self.stats["hits"] += 1
+        return self.snapshot
+
+    def _store(self, data, start, captured=True):
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        self.snapshot = PageSnapshot(data or {}, capture_ms=elapsed)
+        self.stats["captures" if captured else "mirror_reads"] += 1
+        self.stats["capture_ms"] = round(self.stats["capture_ms"] + elapsed, 1)
+        return self.snapshot
+
+    def get(self):
+        """Return the current snapshot, capturing it if there is none."""
+        snapshot = self._lookup()
+        if snapshot is not None:
+            return snapshot
+        start = time.perf_counter()
+        if self.mirror is not None:
+            if not self.mirror.attached:
+                self.mirror.attach()
+            if self.mirror.observing:
+                try:
+                    resynced = self.mirror.refresh()
+                    return self._store(self.mirror.snapshot_data(MAX_ELEMENTS), start, captured=resynced)
+                except Exception as e:
+                    logging.debug(f"DOM mirror read failed, capturing a snapshot instead: {e}")
+        return self._store(call_helper(self.page, "snapshot", {"maxElements": MAX_ELEMENTS}), start)
+
+    async def async_get(self):
+        """Async counterpart of get() for async Playwright pages."""
+        snapshot = self._lookup()
+        if snapshot is not None:
+            return snapshot
+        start = time.perf_counter()
+        if self.mirror is not None:
+            if not self.mirror.attached:
+                await self.mirror.async_attach()
+            if self.mirror.observing:
+                try:
+                    resynced = await self.mirror.async_refresh()
+                    return self._store(self.mirror.snapshot_data(MAX_ELEMENTS), start, captured=resynced)
+                except Exception as e:
+                    logging.debug(f"DOM mirror read failed, capturing a snapshot instead: {e}")
+        return self._store(await async_call_helper(self.page, "snapshot", {"maxElements": MAX_ELEMENTS}), start)
+
+    def summary(self):
+        """Return capture statistics."""
+        stats = dict(self.stats)
+        if self.mirror is not None:
+            stats["mirror"] = self.mirror.summary_stats()
+        return stats
+
+
+_caches = weakref.WeakKeyDictionary()
+
+
+def get_snapshot_cache(page):
+    """Return the page's snapshot cache, creating it on first use."""
+    cache = _caches.get(page)
+    if cache is None:
+        cache = SnapshotCache(page)
+        _caches[page] = cache
+    return cache
+
+
+def get_page_snapshot(page):
+    """
+    Return the snapshot of the page's current state, captured in one
+    round trip on first use.
+
+    Raises:
+        Exception: Whatever the page call raises; consumers keep their own fallbacks
+    """
+    return get_snapshot_cache(page).get()
+
+
+async def async_get_page_snapshot(page):
+    """Async counterpart of get_page_snapshot()."""
+    return await get_snapshot_cache(page).async_get()
+
+
+def invalidate_snapshot(page):
+    """Drop the page's snapshot after the page was changed in place."""
+    cache = _caches.get(page)
+    if cache is not None:
+        cache.invalidate()
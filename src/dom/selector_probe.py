@@ -0,0 +1,237 @@
+# File: src/dom/selector_probe.py
+
+import itertools
+import logging
+
+from src.dom.page_helpers import call_helper, async_call_helper, random_name
+
+# Every match is tagged with this attribute by the "probe" helper (see
+# src/dom/page_helpers.py), and its locator addresses the tag. The in-page
+# emulation of :has-text/:text/text= and the deep (shadow-piercing) query
+# don't number elements the way Playwright's own engine does, so
+# locator(selector).nth(index) could resolve to a different element than
+# the one probed; the tag cannot. The attribute name is random per process,
+# and tags are removed from the page after a few newer tagging calls (see
+# TAG_BATCHES in page_helpers.py), so use a match's locator right away; the
+# element cache re-tags its entries when it confirms a hit.
+MATCH_ATTRIBUTE = random_name("data-")
+
+_probe_calls = itertools.count(1)
+
+# Evaluates a ranked list of selectors in a single round trip. Installed in every
+# page as part of the helper library (see src/dom/page_helpers.py).
+# Understands plain CSS plus the Playwright forms used across the agent:
+#   "css:has-text('Accept')", "text=Accept", "text=\"Accept\"", "text=/accept/i", ":text('Accept')"
+# Anything it cannot resolve is reported as unsupported so the caller can fall back.
+# onMatch (optional) is called with each matched element and its result, so other
+# scripts can build on the probe (see src/dom/element_cache.py). With deep set,
+# selectors also match inside open shadow roots (see src/dom/frame_query.py).
+PROBE_FUNCTION_JS = """
+function probeSelectors(selectors, first, requireEnabled, onMatch, deep) {
+    const roots = [document];
+    if (deep) {
+        // Open shadow roots, nested ones included (closed roots are unreachable by design)
+        for (let i = 0; i < roots.length; i++) {
+            for (const el of roots[i].querySelectorAll('*')) {
+                if (el.shadowRoot) roots.push(el.shadowRoot);
+            }
+        }
+    }
+    const queryAll = selector => roots.flatMap(root => Array.from(root.querySelectorAll(selector)));
+    // Text selectors look at the body and at whole shadow trees (which have no body)
+    const allElements = () => roots.flatMap((root, i) => Array.from(root.querySelectorAll(i === 0 ? 'body *' : '*')));
+
+    const norm = s => (s || '').replace(/\\s+/g, ' ').trim();
+    const unquote = s => {
+        const m = s.match(/^(['"])([\\s\\S]*)\\1$/);
+        return m ? m[2] : s;
+    };
+    const textOf = el => norm(el.innerText || el.textContent || el.value || '');
+    const leaves = (candidates, test) => candidates.filter(el => test(textOf(el)) &&
+        !Array.from(el.children).some(child => test(textOf(child))));
+
+    const resolve = selector => {
+        let m = selector.match(/^(.*):has-text\\((['"])([\\s\\S]*)\\2\\)$/);
+        if (m) {
+            const needle = norm(m[3]).toLowerCase();
+            return queryAll(m[1] || '*')
+                .filter(el => textOf(el).toLowerCase().includes(needle));
+        }
+        m = selector.match(/^:text\\((['"])([\\s\\S]*)\\1\\)$/);
+        if (m) {
+            const needle = norm(m[2]).toLowerCase();
+            return leaves(allElements(), t => t.toLowerCase().includes(needle));
+        }
+        if (selector.startsWith('text=')) {
+            const body = selector.slice(5);
+            let test;
+            const re = body.match(/^\\/(.*)\\/([a-z]*)$/);
+            if (re) {
+                const regex = new RegExp(re[1], re[2]);
+                test = t => regex.test(t);
+            } else if (body.startsWith('"') && body.endsWith('"')) {
+                const exact = norm(unquote(body));
+                test = t => t === exact;
+            } else {
+                const needle = norm(unquote(body)).toLowerCase();
+                test = t => t.toLowerCase().includes(needle);
+            }
+            return leaves(allElements(), test);
+        }
+        return queryAll(selector);
+    };
+
+    const describe = el => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        const visible = rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden';
+        const enabled = !(el.matches(':disabled') || el.getAttribute('aria-disabled') === 'true');
+        return {visible, enabled, rect: {x: rect.x, y: rect.y, width: rect.width, height: rect.height}};
+    };
+
+    const results = [];
+    for (let rank = 0; rank < selectors.length; rank++) {
+        const selector = selectors[rank];
+        let elements;
+        try {
+            elements = resolve(selector);
+        } catch (e) {
+            results.push({selector, rank, unsupported: true});
+            continue;
+        }
+        let match = null;
+        for (let index = 0; index < elements.length; index++) {
+            const info = describe(elements[index]);
+            if (info.visible && (info.enabled || !requireEnabled)) {
+                match = Object.assign({selector, rank, index, count: elements.length}, info);
+                break;
+            }
+        }
+        if (match) {
+            if (onMatch) onMatch(elements[match.index], match);
+            results.push(match);
+            if (first) break;
+        } else {
+            results.push({selector, rank, count: elements.length, visible: false});
+        }
+    }
+    return results;
+}
+"""
+
+
+
+def rect_center(rect):
+    """Return the (x, y) center of a probe rect."""
+    return rect["x"] + rect["width"] / 2, rect["y"] + rect["height"] / 2
+
+
+def locator_for(target, match):
+    """Return a Playwright locator for exactly the element a probe matched."""
+    if match.get("tag_selector"):
+        return target.locator(match["tag_selector"])
+    # Matches found through the per-selector locator fallback were numbered by Playwright itself
+    return target.locator(match["selector"]).nth(match.get("index", 0))
+
+
+def probe_args(selectors, first, require_enabled, options=None, prefix=None):
+    """Arguments of the "probe" helper; matches are tagged unless options already say how."""
+    args = dict(options or {}, selectors=list(selectors), first=first, requireEnabled=require_enabled)
+    args.setdefault("tag", {"attribute": MATCH_ATTRIBUTE, "prefix": prefix or f"p{next(_probe_calls)}"})
+    return args
+
+
+def _fallback_match(selector, rank, visible):
+    return {"selector": selector, "rank": rank, "index": 0, "count": 1,
+            "visible": visible, "enabled": True, "rect": None, "fallback": True}
+
+
+def collect_matches(results, first, fallback):
+    """
+    Merge the in-page results with per-selector fallbacks for unsupported
+    selectors, preserving the ranking.
+    """
+    matches = []
+    for result in results:
+        if result.get("unsupported"):
+            if fallback(result["selector"]):
+                matches.append(_fallback_match(result["selector"], result["rank"], True))
+            else:
+                continue
+        elif result.get("visible"):
+            if result.get("tag"):
+                result = dict(result, tag_selector=f"[{MATCH_ATTRIBUTE}='{result['tag']}']")
+            matches.append(result)
+        else:
+            continue
+        if first:
+            break
+    return matches
+
+
+def probe_selectors(target, selectors, first=False, require_enabled=False, options=None):
+    """
+    Check a ranked list of candidate selectors in one in-page call.
+
+    Args:
+        target: Playwright page or frame
+        selectors: Candidate selectors, best first
+        first: Stop at the first selector with a visible match
+        require_enabled: Skip disabled elements
+        options: Extra options of the "probe" helper: deep (pierce open shadow
+                 roots), watchId (report changes to the element cache)
+
+    Returns:
+        list: Match dicts in rank order with selector, rank, index (of the element
+              among the selector's matches), count, visible, enabled, rect and
+              tag_selector (addressing exactly the matched element; see locator_for())
+    """
+    if not selectors:
+        return []
+    try:
+        results = call_helper(target, "probe", probe_args(selectors, first, require_enabled, options))
+    except Exception as e:
+        logging.debug(f"Batched selector probe failed: {e}")
+        return []
+
+    def fallback(selector):
+        try:
+            return target.locator(selector).first.is_visible()
+        except Exception:
+            return False
+
+    return collect_matches(results, first, fallback)
+
+
+def first_visible(target, selectors, require_enabled=False):
+    """Return the best-ranked visible match for the selectors, or None."""
+    matches = probe_selectors(target, selectors, first=True, require_enabled=require_enabled)
+    return matches[0] if matches else None
+
+
+async def async_probe_selectors(target, selectors, first=False, require_enabled=False, options=None):
+    """Async counterpart of probe_selectors() for async Playwright pages and frames."""
+    if not selectors:
+        return []
+    try:
+        results = await async_call_helper(target, "probe", probe_args(selectors, first, require_enabled, options))
+    except Exception as e:
+        logging.debug(f"Batched selector probe failed: {e}")
+        return []
+
+    # Fallbacks are rare (unsupported selector syntax), so resolve them up front
+    visible = {}
+    for result in results:
+        if result.get("unsupported"):
+            try:
+                visible[result["selector"]] = await target.locator(result["selector"]).first.is_visible()
+            except Exception:
+                visible[result["selector"]] = False
+
+    return collect_matches(results, first, lambda selector: visible.get(selector, False))
+
+
+async def async_first_visible(target, selectors, require_enabled=False):
+    """Async counterpart of first_visible()."""
+    matches = await async_probe_selectors(target, selectors, first=True, require_enabled=require_enabled)
+    return matches[0] if matches else None
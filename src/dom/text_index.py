@@ -0,0 +1,205 @@
+# File: src/dom/text_index.py
+
+import bisect
+import re
+import unicodedata
+
+# Field weights for snapshot element records: what a user reads counts most
+ELEMENT_FIELDS = (("text", 1.0), ("ariaLabel", 0.9), ("placeholder", 0.8), ("title", 0.8),
+                  ("name", 0.5), ("domId", 0.5))
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.9
+FUZZY_THRESHOLD = 0.5
+PHRASE_BONUS = 0.5
+EXACT_LABEL_BONUS = 1.0
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse everything that isn't a letter or digit to single spaces."""
+    text = unicodedata.normalize("NFKD", _CAMEL_RE.sub(" ", text or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+def trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TextIndex:
+    """
+    Inverted index from normalized tokens to entry ids, with prefix lookup
+    (bisect over the sorted vocabulary) and fuzzy lookup (character
+    trigrams), so text lookups don't scan every element.
+
+    Entries are (id, text, weight, meta) tuples; for page snapshots use
+    from_elements(), which indexes each element's text, aria-label,
+    placeholder, name and id.
+    """
+
+    def __init__(self, entries=()):
+        self.postings = {}      # token -> {entry id: best field weight}
+        self.labels = {}        # entry id -> normalized labels, for phrase matching
+        self.meta = {}          # entry id -> caller data (the element record)
+        self.grams = {}         # trigram -> tokens containing it
+        self.vocabulary = []
+        for entry_id, text, weight, meta in entries:
+            self.add(entry_id, text, weight, meta)
+        self._finish()
+
+    @classmethod
+    def from_elements(cls, elements):
+        """Index snapshot element records (see src/dom/page_snapshot.py)."""
+        entries = []
+        for element in elements:
+            for field, weight in ELEMENT_FIELDS:
+                if element.get(field):
+                    entries.append((element["id"], element[field], weight, element))
+        return cls(entries)
+
+    def add(self, entry_id, text, weight=1.0, meta=None):
+        label = normalize(text)
+        if not label:
+            return
+        self.labels.setdefault(entry_id, []).append(label)
+        if meta is not None:
+            self.meta[entry_id] = meta
+        for token in label.split():
+            postings = self.postings.setdefault(token, {})
+            postings[entry_id] = max(weight, postings.get(entry_id, 0.0))
+
+    def _finish(self):
+        self.vocabulary = sorted(self.postings)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.grams.setdefault(gram, set()).add(token)
+
+    # ---- Token lookup ----
+
+    def _prefixed(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def _similar(self, token):
+        grams = trigrams(token)
+        counts = {}
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        for candidate, shared in counts.items():
+            similarity = shared / len(grams | trigrams(candidate))
+            if similarity >= FUZZY_THRESHOLD:
+                yield candidate, similarity
+
+    def _token_scores(self, token, prefix, fuzzy):
+        """Entry id -> best score for one query token."""
+        scores = {}
+
+        def credit(candidate, score):
+            for entry_id, weight in self.postings[candidate].items():
+                scores[entry_id] = max(scores.get(entry_id, 0.0), score * weight)
+
+        if token in self.postings:
+            credit(token, EXACT_SCORE)
+        if prefix and len(token) >= 2:
+            for candidate in self._prefixed(token):
+                if candidate != token:
+                    credit(candidate, PREFIX_SCORE)
+        if fuzzy and len(token) >= 3:
+            for candidate, similarity in self._similar(token):
+                if candidate != token:
+                    credit(candidate, FUZZY_SCORE * similarity)
+        return scores
+
+    # ---- Queries ----
+
+    def search(self, query, limit=5, prefix=True, fuzzy=True, min_score=0.4, where=None, rank=None):
+        """
+        Find entries matching the query text.
+
+        Every query token contributes its best exact, prefix or fuzzy match;
+        the total is averaged over the query tokens, with a bonus when the
+        whole query appears as a phrase in one label and another when it
+        is the entire label.
+
+        Args:
+            query: Text to look for
+            limit: Maximum results
+            min_score: Drop weaker matches (1.0 = every token matched exactly)
+            where: Optional filter on the entry's meta (e.g. only buttons)
+            rank: Optional function (meta) -> score adjustment, e.g. visibility or proximity
+
+        Returns:
+            list: (score, entry id, meta) tuples, best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        totals = {}
+        for token in tokens:
+            for entry_id, score in self._token_scores(token, prefix, fuzzy).items():
+                totals[entry_id] = totals.get(entry_id, 0.0) + score
+
+        phrase = " ".join(tokens)
+        results = []
+        for entry_id, total in totals.items():
+            meta = self.meta.get(entry_id)
+            if where is not None and not where(meta):
+                continue
+            score = total / len(tokens)
+            labels = self.labels.get(entry_id, [])
+            if any(f" {phrase} " in f" {label} " or label.startswith(phrase) for label in labels):
+                score += PHRASE_BONUS
+            if phrase in labels:
+                score += EXACT_LABEL_BONUS
+            if rank is not None:
+                score += rank(meta)
+            if score >= min_score:
+                results.append((round(score, 3), entry_id, meta))
+        results.sort(key=lambda result: -result[0])
+        return results[:limit]
+
+    def search_any(self, queries, **kwargs):
+        """
+        Try several queries in order of preference (e.g. reject texts before
+        accept texts) and return the results of the first that matches.
+        """
+        for query in queries:
+            results = self.search(query, **kwargs)
+            if results:
+                return results
+        return []
+
+
+def element_rank(viewport=None, near=None):
+    """
+    Ranking adjustment for snapshot elements: enabled elements and those
+    inside the viewport first, then closeness to a point (x, y).
+    """
+    height = (viewport or {}).get("height")
+
+    def rank(element):
+        if not element:
+            return 0.0
+        score = 0.0 if element.get("enabled", True) else -0.5
+        x, y, width, rect_height = element.get("rect") or (0, 0, 0, 0)
+        if height and (y + rect_height < 0 or y > height):
+            score -= 0.2
+        if near is not None:
+            distance = ((x + width / 2 - near[0]) ** 2 + (y + rect_height / 2 - near[1]) ** 2) ** 0.5
+            score -= min(distance / 2000.0, 0.3)
+        return score
+
+    return rank
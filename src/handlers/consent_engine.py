@@ -0,0 +1,445 @@
+# File: src/handlers/consent_engine.py
+
+import asyncio
+import logging
+import os
+import time
+import weakref
+
+from src.browser.settle import wait_until_settled, async_wait_until_settled
+from src.dom.dom_explorer import COOKIE_BANNER_SELECTORS
+from src.dom.element_index import find_by_text, async_find_by_text
+from src.dom.frame_query import first_visible_in_frames, async_first_visible_in_frames
+from src.dom.page_helpers import call_helper, async_call_helper
+from src.dom.page_snapshot import get_page_snapshot, async_get_page_snapshot, invalidate_snapshot
+from src.dom.selector_probe import first_visible, async_first_visible, locator_for
+from src.utils.pacing import get_pacing_policy
+
+DEFAULT_BUDGET_MS = 3000
+MIN_CLICK_MS = 500   # a click is always given at least this long, even at the end of the budget
+SETTLE_MS = 2000
+# A check that found nothing is only trusted this long: consent-manager scripts
+# often inject their dialog a few seconds after the page loaded
+MISS_MEMO_MS = 5000
+
+# Strategies in the order they are tried; the first that clicks something wins.
+# Each only runs when the page state calls for it (see ConsentEngine._applies()).
+STRATEGIES = ("site", "selectors", "text_index", "frames", "banner_text", "page_text")
+
+# Reject/decline before accept throughout: every selector and text list is ranked
+REJECT_SELECTORS = [
+    "button#CybotCookiebotDialogBodyButtonDecline",
+    "#onetrust-reject-all-handler",
+    "button:has-text('Reject all')",
+    "button:has-text('Reject cookies')",
+    "button:has-text('Reject')",
+    "button:has-text('Decline')",
+    "button:has-text('No, thanks')",
+    "#reject-all-cookies",
+    "#reject-button",
+    ".reject-cookies-button",
+    ".reject-cookies",
+    "[aria-label='Reject all']",
+    "[data-testid*='reject' i]",
+]
+ACCEPT_SELECTORS = [
+    "button#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+    "button#CybotCookiebotDialogBodyButtonAccept",
+    "#onetrust-accept-btn-handler",
+    "#cookie-accept-all",
+    ".cookie-accept-all",
+    "#accept-all-cookies",
+    ".accept-all-cookies",
+    ".accept-cookies-button",
+    "button.cookie-accept",
+    "button[aria-label='Accept all']",
+    "button[aria-label='Accept cookies']",
+    "button:has-text('Accept all')",
+    "button:has-text('Allow all')",
+    "button:has-text('Accept cookies')",
+    "button:has-text('I agree')",
+    "#accept-button",
+    ".accept-all",
+]
+CONSENT_SELECTORS = REJECT_SELECTORS + ACCEPT_SELECTORS
+
+REJECT_TEXTS = ["reject all", "reject cookies", "decline all", "decline", "reject", "no, thanks", "no thanks",
+                "refuse", "opt-out"]
+ACCEPT_TEXTS = ["accept all", "allow all", "accept cookies", "i agree", "i accept", "agree", "accept", "allow",
+                "got it", "understand", "ok", "continue"]
+# Outside a recognised banner container (and in the text index) only unambiguous
+# phrases are safe: single words like "ok" or "continue" match far too much
+CONSENT_PHRASES = ["reject all", "reject cookies", "decline all", "accept all", "allow all", "accept cookies",
+                   "i agree"]
+BUTTON_SELECTOR = 'button, a.button, a[role="button"], input[type="button"], input[type="submit"], [role="button"]'
+
+# Consent dialogs that don't look like a cookie banner, keyed by a fragment of
+# the URL: the site's consent containers and the buttons to click in them.
+# Buttons are only looked for inside a container, so a rule does nothing while
+# no consent dialog is showing and never clicks an ordinary button of the site.
+SITE_RULES = {
+    "google.": {"containers": ["form[action*='consent']", "[role='dialog']"],
+                "buttons": ["#W0wltc", "button[aria-label='Reject all']", "#L2AGLb", ".tHlp8d"]},
+    "youtube.com": {"containers": ["ytd-consent-bump-v2-lightbox"],
+                    "buttons": ["button[aria-label*='Reject' i]", "button.yt-spec-button-shape-next--call-to-action"]},
+    "amazon.": {"containers": ["#sp-cc"],
+                "buttons": ["#sp-cc-rejectall-link", "#sp-cc-accept"]},
+    "nowtv.com": {"containers": ["[id*='cookie' i]", "[class*='cookie' i]"],
+                  "buttons": ["button.cookie-accept"]},
+}
+
+# Child frames that host consent platforms (Sourcepoint, TrustArc, Google, ...)
+CONSENT_FRAME_HINTS = ("consent", "cookie", "privacy", "gdpr", "cmp", "sp_message")
+
+
+def consent_budget_ms():
+    """Time budget of one consent check, from AGENT_CONSENT_BUDGET_MS (default 3000)."""
+    try:
+        return max(0, int(os.getenv("AGENT_CONSENT_BUDGET_MS", str(DEFAULT_BUDGET_MS))))
+    except ValueError:
+        return DEFAULT_BUDGET_MS
+
+
+def site_selectors(url):
+    """
+    The site-specific consent selectors for a URL, each scoped to one of the
+    site's consent containers and ranked by button (empty for other sites).
+    """
+    url = (url or "").lower()
+    for fragment, rule in SITE_RULES.items():
+        if fragment in url:
+            return [f"{container} {button}" for button in rule["buttons"] for container in rule["containers"]]
+    return []
+
+
+def is_consent_frame(frame):
+    """Whether a child frame looks like it hosts a consent dialog."""
+    try:
+        if frame.parent_frame is None:
+            return False
+        location = f"{frame.url} {frame.name}".lower()
+    except Exception:
+        return False
+    return any(hint in location for hint in CONSENT_FRAME_HINTS)
+
+
+class ConsentEngine:
+    """
+    Dismisses the cookie/consent banner of one page with an ordered list of
+    strategies, cheapest and most specific first, under one time budget.
+
+    The page state (URL and the banner the snapshot sees) decides which
+    strategies apply at all, so pages without a banner cost no round trips
+    beyond the snapshot the iteration takes anyway. Once a state has been
+    handled by a dismissal, it is not handled again until the banner or the
+    URL changes or the page navigates. A state where every applicable
+    strategy came up empty is only skipped for MISS_MEMO_MS, so a dialog
+    injected late on the same URL is still found.
+
+    Success rate and latency are recorded per strategy (see summary()).
+    Every strategy exists as a sync and an async variant, so sync and async
+    Playwright pages are driven directly, without an event loop per call.
+    """
+
+    def __init__(self, page, budget_ms=None, strategies=STRATEGIES):
+        self.page = page
+        self.budget_ms = consent_budget_ms() if budget_ms is None else budget_ms
+        self.strategies = list(strategies)
+        self.resolved = {}  # (url, banner selector) -> (outcome, time it was settled)
+        self.stats = {"runs": 0, "memo_hits": 0, "dismissed": 0, "budget_exhausted": 0, "total_ms": 0.0,
+                      "strategies": {name: {"attempts": 0, "successes": 0, "errors": 0, "timeouts": 0,
+                                            "total_ms": 0.0, "max_ms": 0.0} for name in self.strategies}}
+        try:
+            page.on("framenavigated", self._on_frame_navigated)
+        except Exception as e:
+            logging.debug(f"Consent engine running without navigation tracking: {e}")
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self.resolved.clear()
+
+    # ---- Page state ----
+
+    def _state(self, snapshot):
+        url = self.page.url
+        frames = [frame for frame in self.page.frames if frame.parent_frame is not None]
+        banner = getattr(snapshot, "cookie_banner", None)
+        return {
+            "key": (url, banner),
+            "url": url,
+            "banner": banner,
+            "site": site_selectors(url),
+            "consent_frames": any(is_consent_frame(frame) for frame in frames),
+        }
+
+    def _applies(self, name, state):
+        if name == "site":
+            # Its selectors are scoped to the site's consent containers, so the
+            # probe itself finds nothing unless a consent dialog is present
+            return bool(state["site"])
+        if name == "frames":
+            # Any child frame while a banner shows (it may sit in one), otherwise only consent-hosting frames
+            return state["consent_frames"] or (bool(state["banner"]) and len(self.page.frames) > 1)
+        return bool(state["banner"])
+
+    def _frame_filter(self, state):
+        if state["banner"]:
+            return lambda frame: frame.parent_frame is not None
+        return is_consent_frame
+
+    def _remaining_ms(self, start):
+        return self.budget_ms - (time.perf_counter() - start) * 1000
+
+    def _click_timeout(self, start):
+        return max(MIN_CLICK_MS, self._remaining_ms(start))
+
+    # ---- Bookkeeping ----
+
+    def _record(self, name, strategy_start, success=False, error=None, timed_out=False):
+        elapsed = (time.perf_counter() - strategy_start) * 1000
+        stats = self.stats["strategies"][name]
+        stats["attempts"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + elapsed, 1)
+        stats["max_ms"] = round(max(stats["max_ms"], elapsed), 1)
+        if success:
+            stats["successes"] += 1
+        if timed_out:
+            stats["timeouts"] += 1
+        elif error is not None:
+            stats["errors"] += 1
+            logging.debug(f"Consent strategy '{name}' failed: {error}")
+
+    def _memo(self, state):
+        outcome, settled_at = self.resolved.get(state["key"], (None, 0.0))
+        if outcome == "none" and (time.perf_counter() - settled_at) * 1000 >= MISS_MEMO_MS:
+            # Look again: a late-injected dialog may be showing by now
+            del self.resolved[state["key"]]
+            outcome = None
+        if outcome is not None:
+            self.stats["runs"] += 1
+            self.stats["memo_hits"] += 1
+            return self._result(False, None, None, 0.0, cached=True)
+        return None
+
+    def _finish(self, state, name, detail, start, exhausted):
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        self.stats["runs"] += 1
+        self.stats["total_ms"] = round(self.stats["total_ms"] + elapsed, 1)
+        if exhausted:
+            self.stats["budget_exhausted"] += 1
+            logging.info(f"Consent check stopped after {elapsed} ms (budget {self.budget_ms} ms)")
+        else:
+            # A state is settled once something was clicked or everything that applies was tried
+            self.resolved[state["key"]] = (name or "none", time.perf_counter())
+        if name:
+            self.stats["dismissed"] += 1
+            # The banner is gone: the same URL without it needs no check either
+            self.resolved[(state["url"], None)] = (name, time.perf_counter())
+            invalidate_snapshot(self.page)
+            logging.info(f"Dismissed consent banner via '{name}': {detail} ({elapsed} ms)")
+        return self._result(bool(name), name, detail, elapsed)
+
+    @staticmethod
+    def _result(dismissed, strategy, detail, elapsed_ms, cached=False):
+        return {"dismissed": dismissed, "strategy": strategy, "detail": detail, "elapsed_ms": elapsed_ms,
+                "cached": cached}
+
+    # ---- Sync ----
+
+    def dismiss(self):
+        """
+        Dismiss the page's consent banner, if it shows one and its state
+        hasn't been handled yet.
+
+        Returns:
+            dict: dismissed, strategy (name of the one that clicked), detail,
+                  elapsed_ms and cached (the state was already handled)
+        """
+        try:
+            snapshot = get_page_snapshot(self.page)
+        except Exception as e:
+            logging.debug(f"Consent check without a snapshot: {e}")
+            snapshot = None
+        state = self._state(snapshot)
+        cached = self._memo(state)
+        if cached:
+            return cached
+
+        start = time.perf_counter()
+        exhausted = False
+        for name in self.strategies:
+            if not self._applies(name, state):
+                continue
+            if self._remaining_ms(start) <= 0:
+                exhausted = True
+                break
+            strategy_start = time.perf_counter()
+            try:
+                detail = getattr(self, f"_{name}")(state, start)
+            except Exception as e:
+                self._record(name, strategy_start, error=e)
+                continue
+            self._record(name, strategy_start, success=bool(detail))
+            if detail:
+                wait_until_settled(self.page, timeout_ms=SETTLE_MS)
+                return self._finish(state, name, detail, start, False)
+        return self._finish(state, None, None, start, exhausted)
+
+    def _click(self, locator, start):
+        get_pacing_policy().sleep(0.2, 0.5)
+        locator.click(timeout=self._click_timeout(start))
+
+    def _site(self, state, start):
+        match = first_visible(self.page, state["site"])
+        if match:
+            self._click(locator_for(self.page, match), start)
+            return match["selector"]
+        return None
+
+    def _selectors(self, state, start):
+        match = first_visible(self.page, CONSENT_SELECTORS)
+        if match:
+            self._click(locator_for(self.page, match), start)
+            return match["selector"]
+        return None
+
+    def _text_index(self, state, start):
+        match = find_by_text(self.page, CONSENT_PHRASES, tags=("button", "a"))
+        if match:
+            self._click(match["locator"], start)
+            return f"'{match['label']}'"
+        return None
+
+    def _frames(self, state, start):
+        match = first_visible_in_frames(self.page, CONSENT_SELECTORS, include=self._frame_filter(state))
+        if match:
+            self._click(match["locator"], start)
+            return f"{match['selector']} in {match['frame_key']}"
+        return None
+
+    def _banner_text(self, state, start):
+        result = call_helper(self.page, "clickByText", {"texts": REJECT_TEXTS + ACCEPT_TEXTS,
+                                                        "selector": f"{BUTTON_SELECTOR}, a",
+                                                        "within": COOKIE_BANNER_SELECTORS})
+        return f"'{result['text']}' in {state['banner']}" if result else None
+
+    def _page_text(self, state, start):
+        result = call_helper(self.page, "clickByText", {"texts": CONSENT_PHRASES,
+                                                        "selector": BUTTON_SELECTOR})
+        return f"'{result['text']}'" if result else None
+
+    # ---- Async ----
+
+    async def async_dismiss(self):
+        """
+        Async counterpart of dismiss(). Each strategy is also cancelled when
+        it runs past the remaining budget.
+        """
+        try:
+            snapshot = await async_get_page_snapshot(self.page)
+        except Exception as e:
+            logging.debug(f"Consent check without a snapshot: {e}")
+            snapshot = None
+        state = self._state(snapshot)
+        cached = self._memo(state)
+        if cached:
+            return cached
+
+        start = time.perf_counter()
+        exhausted = False
+        for name in self.strategies:
+            if not self._applies(name, state):
+                continue
+            remaining = self._remaining_ms(start)
+            if remaining <= 0:
+                exhausted = True
+                break
+            strategy_start = time.perf_counter()
+            try:
+                detail = await asyncio.wait_for(getattr(self, f"_async_{name}")(state, start), remaining / 1000)
+            except asyncio.TimeoutError:
+                self._record(name, strategy_start, timed_out=True)
+                exhausted = True
+                break
+            except Exception as e:
+                self._record(name, strategy_start, error=e)
+                continue
+            self._record(name, strategy_start, success=bool(detail))
+            if detail:
+                await async_wait_until_settled(self.page, timeout_ms=SETTLE_MS)
+                return self._finish(state, name, detail, start, False)
+        return self._finish(state, None, None, start, exhausted)
+
+    async def _async_click(self, locator, start):
+        await get_pacing_policy().async_sleep(0.2, 0.5)
+        await locator.click(timeout=self._click_timeout(start))
+
+    async def _async_site(self, state, start):
+        match = await async_first_visible(self.page, state["site"])
+        if match:
+            await self._async_click(locator_for(self.page, match), start)
+            return match["selector"]
+        return None
+
+    async def _async_selectors(self, state, start):
+        match = await async_first_visible(self.page, CONSENT_SELECTORS)
+        if match:
+            await self._async_click(locator_for(self.page, match), start)
+            return match["selector"]
+        return None
+
+    async def _async_text_index(self, state, start):
+        match = await async_find_by_text(self.page, CONSENT_PHRASES, tags=("button", "a"))
+        if match:
+            await self._async_click(match["locator"], start)
+            return f"'{match['label']}'"
+        return None
+
+    async def _async_frames(self, state, start):
+        match = await async_first_visible_in_frames(self.page, CONSENT_SELECTORS, include=self._frame_filter(state))
+        if match:
+            await self._async_click(match["locator"], start)
+            return f"{match['selector']} in {match['frame_key']}"
+        return None
+
+    async def _async_banner_text(self, state, start):
+        result = await async_call_helper(self.page, "clickByText", {"texts": REJECT_TEXTS + ACCEPT_TEXTS,
+                                                                    "selector": f"{BUTTON_SELECTOR}, a",
+                                                                    "within": COOKIE_BANNER_SELECTORS})
+        return f"'{result['text']}' in {state['banner']}" if result else None
+
+    async def _async_page_text(self, state, start):
+        result = await async_call_helper(self.page, "clickByText", {"texts": CONSENT_PHRASES,
+                                                                    "selector": BUTTON_SELECTOR})
+        return f"'{result['text']}'" if result else None
+
+    def summary(self):
+        """Runs, memo hits, dismissals and budget stops, plus success rate and latency per strategy."""
+        strategies = {}
+        for name, stats in self.stats["strategies"].items():
+            attempts = stats["attempts"]
+            strategies[name] = dict(stats, avg_ms=round(stats["total_ms"] / attempts, 1) if attempts else 0.0,
+                                    success_rate=round(stats["successes"] / attempts, 2) if attempts else 0.0)
+        return dict(self.stats, strategies=strategies, budget_ms=self.budget_ms)
+
+
+_engines = weakref.WeakKeyDictionary()
+
+
+def get_consent_engine(page):
+    """Return the page's consent engine (and its stats), creating it on first use."""
+    engine = _engines.get(page)
+    if engine is None:
+        engine = ConsentEngine(page)
+        _engines[page] = engine
+    return engine
+
+
+def dismiss_consent(page):
+    """Dismiss the page's consent banner if needed (see ConsentEngine.dismiss())."""
+    return get_consent_engine(page).dismiss()
+
+
+async def async_dismiss_consent(page):
+    """Async counterpart of dismiss_consent()."""
+    return await get_consent_engine(page).async_dismiss()
@@ -1,8 +1,12 @@
 # src/handlers/search_handler.py
 
 import logging
-import time
 from playwright.sync_api import Page
+from src.utils.pacing import get_pacing_policy
+from src.automation.cursor import set_cursor_position
+from src.browser.settle import wait_until_settled
+from src.dom.element_cache import get_element_cache
+from src.dom.element_index import find_by_text
 
 class SearchHandler:
     """Handler for detecting and interacting with search interfaces across different websites"""
@@ -36,12 +40,17 @@ class SearchHandler:
         if search_input:
             return search_input
             
-        # Strategy 2: Look for search text in OCR results
+        # Strategy 2: Look search fields and buttons up in the page's text index
+        search_by_index = self._find_search_by_index(page)
+        if search_by_index:
+            return search_by_index
+            
+        # Strategy 3: Look for search text in OCR results
         search_by_text = self._find_search_by_ocr(page, ocr_results)
         if search_by_text:
             return search_by_text
             
-        # Strategy 3: Try to find and click search icons
+        # Strategy 4: Try to find and click search icons
         search_by_icon = self._find_and_click_search_icon(page, ocr_results)
         if search_by_icon:
             return search_by_icon
@@ -69,18 +78,19 @@ class SearchHandler:
             "input.search"
         ]
         
-        for selector in common_selectors:
-            try:
-                if page.is_visible(selector, timeout=500):
-                    logging.info(f"Found search input with selector: {selector}")
-                    return {
-                        "type": "input",
-                        "selector": selector,
-                        "requires_submit": True,
-                        "submit_selector": self._find_submit_button(page, selector)
-                    }
-            except Exception as e:
-                continue
+        # Probe every candidate in a single in-page call (or reuse the cached match)
+        match = get_element_cache(page).resolve(common_selectors, require_enabled=True)
+        if match:
+            selector = match["selector"]
+            logging.info(f"Found search input with selector: {selector}")
+            return {
+                "type": "input",
+                "selector": selector,
+                "locator": match["locator"],
+                "rect": match["rect"],
+                "requires_submit": True,
+                "submit_selector": self._find_submit_button(page, selector)
+            }
                 
         return None
     
@@ -109,22 +119,49 @@ class SearchHandler:
         if id_match:
             input_id = id_match.group(1)
         
+        # Selectors that reference the input ID only apply when we know it
+        if input_id:
+            candidates = [selector.format(input_id) for selector in submit_selectors]
+        else:
+            candidates = [selector for selector in submit_selectors if "{0}" not in selector]
+        
         # Try to find the submit button
-        for selector in submit_selectors:
-            if input_id:
-                actual_selector = selector.format(input_id)
-            else:
-                actual_selector = selector
-                
-            try:
-                if page.is_visible(actual_selector, timeout=500):
-                    return actual_selector
-            except:
-                continue
+        match = get_element_cache(page).resolve(candidates)
+        if match:
+            return match["selector"]
                 
         # Default to just pressing Enter if no submit button found
         return None
     
+    def _find_search_by_index(self, page: Page):
+        """
+        Find a search field by its label, placeholder or name in the page's
+        text index, or a search button to click that reveals one
+        """
+        try:
+            match = find_by_text(page, self.search_text_patterns, tags=("input", "textarea", "textbox", "combobox"),
+                                 min_score=0.8)
+            if match:
+                logging.info(f"Found search input in the text index: [{match['id']}] {match['label']}")
+                return {
+                    "type": "input",
+                    "selector": match["selector"],
+                    "locator": match["locator"],
+                    "rect": match["rect"],
+                    "requires_submit": True,
+                    "submit_selector": self._find_submit_button(page, match["durable_selector"] or "")
+                }
+            
+            button = find_by_text(page, self.search_text_patterns + self.search_icon_patterns,
+                                  tags=("button", "a", "link"), min_score=0.8)
+            if button:
+                button["locator"].click()
+                wait_until_settled(page, timeout_ms=1000, quiet_ms=150)
+                return self._try_common_selectors(page)
+        except Exception as e:
+            logging.debug(f"Text index search lookup failed: {e}")
+        return None
+    
     def _find_search_by_ocr(self, page: Page, ocr_results: list):
         """Find search elements using OCR text results"""
         search_texts = []
@@ -151,9 +188,10 @@ class SearchHandler:
                 
                 # Click at the center point
                 page.mouse.click(center_x, center_y)
+                set_cursor_position(page, center_x, center_y)
                 
                 # Wait for potential search input to appear
-                time.sleep(0.5)
+                wait_until_settled(page, timeout_ms=1000, quiet_ms=150)
                 
                 # Check if any search input is now visible
                 search_input = self._try_common_selectors(page)
@@ -179,21 +217,21 @@ class SearchHandler:
             "[data-icon='search']"
         ]
         
-        for selector in icon_selectors:
+        match = get_element_cache(page).resolve(icon_selectors)
+        if match:
             try:
-                if page.is_visible(selector, timeout=500):
-                    # Click the icon
-                    page.click(selector)
-                    
-                    # Wait for potential search input to appear
-                    time.sleep(0.5)
-                    
-                    # Check if search input appeared
-                    search_input = self._try_common_selectors(page)
-                    if search_input:
-                        return search_input
-            except:
-                continue
+                # Click the icon
+                match["locator"].click()
+                
+                # Wait for potential search input to appear
+                wait_until_settled(page, timeout_ms=1000, quiet_ms=150)
+                
+                # Check if search input appeared
+                search_input = self._try_common_selectors(page)
+                if search_input:
+                    return search_input
+            except Exception as e:
+                logging.debug(f"Search icon click failed: {e}")
                 
         # Search for magnifying glass icon in OCR
         for item in ocr_results:
@@ -211,9 +249,10 @@ class SearchHandler:
                     
                     # Click at the center point
                     page.mouse.click(center_x, center_y)
+                    set_cursor_position(page, center_x, center_y)
                     
                     # Wait for potential search input to appear
-                    time.sleep(0.5)
+                    wait_until_settled(page, timeout_ms=1000, quiet_ms=150)
                     
                     # Check if any search input is now visible
                     search_input = self._try_common_selectors(page)
@@ -250,16 +289,14 @@ class SearchHandler:
             selector = search_interface.get('selector')
             
             # Click and focus on the search input
-            page.click(selector)
+            locator = search_interface.get('locator') or page.locator(selector)
+            locator.click()
             
             # Clear existing text
-            page.fill(selector, "")
+            locator.fill("")
             
             # Type search term with humanlike delays
-            import random
-            for char in search_term:
-                page.type(selector, char, delay=random.randint(50, 150))
-                time.sleep(random.uniform(0.01, 0.03))
+            get_pacing_policy().type_text(locator, search_term)
                 
             # Submit the search
             submit_selector = search_interface.get('submit_selector')
@@ -268,10 +305,10 @@ class SearchHandler:
                 page.click(submit_selector)
             else:
                 # Press Enter to submit
-                page.press(selector, "Enter")
+                locator.press("Enter")
                 
             # Wait for results to load
-            page.wait_for_timeout(3000)
+            wait_until_settled(page)
             
             logging.info(f"Successfully performed search for: {search_term}")
             return True
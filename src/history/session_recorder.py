@@ -0,0 +1,274 @@
+# File: src/history/session_recorder.py
+
+import json
+import logging
+import os
+import shutil
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+MANIFEST_FILE = "session.json"
+HAR_FILE = "network.har"
+BENCHMARK_FILE = "replay_benchmark.jsonl"
+
+
+class IterationTimer:
+    """Wall-clock and CPU time of one feedback loop iteration, split into phases."""
+
+    def __init__(self, iteration):
+        self.iteration = iteration
+        self.phases = {}
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        return {
+            "iteration": self.iteration,
+            "wall_seconds": round(time.perf_counter() - self.wall_start, 4),
+            "cpu_seconds": round(time.process_time() - self.cpu_start, 4),
+            "phases": {name: round(value, 4) for name, value in self.phases.items()},
+        }
+
+
+class SessionRecorder:
+    """
+    Captures everything the feedback loop consumes so a session can be
+    re-run offline:
+        session.json          goal, start URL, per-iteration screenshots,
+                              vision output, DOM query results, LLM replies
+                              and timings
+        screenshots/          the screenshot of every iteration
+        network.har           every network response (written by the browser
+                              context, see har_path)
+    """
+
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+        self.screenshot_dir = os.path.join(session_dir, "screenshots")
+        os.makedirs(self.screenshot_dir, exist_ok=True)
+        self.manifest = {"goal": None, "start_url": None, "created_at": datetime.utcnow().isoformat(),
+                         "iterations": [], "llm": []}
+        self.current = None
+
+    @property
+    def har_path(self):
+        """Pass as record_har_path when creating the browser context."""
+        return os.path.join(self.session_dir, HAR_FILE)
+
+    def start(self, goal, start_url):
+        self.manifest["goal"] = goal
+        self.manifest["start_url"] = start_url if start_url and start_url != "about:blank" else None
+        self.save()
+
+    def begin_iteration(self, iteration, url):
+        self.current = {"iteration": iteration, "url": url, "screenshot": None,
+                        "object_detections": [], "ocr_results": [], "dom": {}}
+        self.manifest["iterations"].append(self.current)
+
+    def record_screenshot(self, screenshot_path):
+        if self.current is None:
+            return
+        name = f"iteration_{self.current['iteration']}.png"
+        try:
+            shutil.copyfile(screenshot_path, os.path.join(self.screenshot_dir, name))
+            self.current["screenshot"] = os.path.join("screenshots", name)
+        except OSError as e:
+            logging.debug(f"Failed to record screenshot {screenshot_path}: {e}")
+
+    def record_vision(self, object_detections, ocr_results):
+        if self.current is not None:
+            self.current["object_detections"] = object_detections
+            self.current["ocr_results"] = ocr_results
+
+    def record_dom(self, name, result):
+        if self.current is not None:
+            self.current["dom"][name] = result
+
+    def record_llm(self, prompt, response=None, error=None):
+        self.manifest["llm"].append({
+            "iteration": self.current["iteration"] if self.current else None,
+            "prompt": prompt,
+            "response": response,
+            "error": error,
+        })
+
+    def end_iteration(self, timings):
+        if self.current is not None:
+            self.current["timings"] = timings
+            self.current = None
+        self.save()
+
+    def save(self):
+        path = os.path.join(self.session_dir, MANIFEST_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.manifest, f, indent=2, default=str)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logging.error(f"Failed to save session recording {path}: {e}")
+
+
+class RecordingReasoner:
+    """Wraps a reasoner and records every prompt and reply (or error)."""
+
+    def __init__(self, reasoner, recorder):
+        self.reasoner = reasoner
+        self.recorder = recorder
+
+    def get_response(self, user_message, metadata, dom_data=None, **kwargs):
+        try:
+            response = self.reasoner.get_response(user_message, metadata, dom_data=dom_data, **kwargs)
+        except Exception as e:
+            self.recorder.record_llm(user_message, error=str(e))
+            raise
+        self.recorder.record_llm(user_message, response=response)
+        return response
+
+
+# ---- Replay ----
+
+def load_session(session_dir):
+    """Load a recorded session manifest."""
+    with open(os.path.join(session_dir, MANIFEST_FILE), "r") as f:
+        return json.load(f)
+
+
+class StubReasoner:
+    """Answers with the recorded LLM replies, in recording order."""
+
+    def __init__(self, session):
+        self.replies = list(session.get("llm", []))
+        self.calls = 0
+
+    def get_response(self, user_message, metadata, dom_data=None, **kwargs):
+        if self.calls >= len(self.replies):
+            raise RuntimeError("Recorded session has no more LLM replies")
+        reply = self.replies[self.calls]
+        self.calls += 1
+        if reply.get("error"):
+            raise RuntimeError(reply["error"])
+        return reply["response"]
+
+
+class RecordedVision:
+    """
+    Stands in for both the YOLO detector and the OCR processor, returning the
+    recorded output of each iteration in order so replays are deterministic
+    and do not need the models.
+    """
+
+    def __init__(self, session):
+        self.iterations = session.get("iterations", [])
+        self.detect_calls = 0
+        self.ocr_calls = 0
+
+    def detect(self, screenshot_path):
+        index = min(self.detect_calls, len(self.iterations) - 1)
+        self.detect_calls += 1
+        return self.iterations[index]["object_detections"] if index >= 0 else []
+
+    def process_image(self, screenshot_path):
+        index = min(self.ocr_calls, len(self.iterations) - 1)
+        self.ocr_calls += 1
+        return self.iterations[index]["ocr_results"] if index >= 0 else []
+
+
+def summarize_timings(runs):
+    """Aggregate per-iteration timings over several replay runs."""
+    iterations = [timing for run in runs for timing in run]
+    if not iterations:
+        return {}
+    phases = sorted({name for timing in iterations for name in timing["phases"]})
+    return {
+        "iterations": len(iterations),
+        "wall_mean": round(statistics.mean(t["wall_seconds"] for t in iterations), 4),
+        "wall_median": round(statistics.median(t["wall_seconds"] for t in iterations), 4),
+        "cpu_mean": round(statistics.mean(t["cpu_seconds"] for t in iterations), 4),
+        "phases_mean": {name: round(statistics.mean(t["phases"].get(name, 0.0) for t in iterations), 4)
+                        for name in phases},
+    }
+
+
+def replay_session(session_dir, runs=3, headless=True, live_vision=False, output=BENCHMARK_FILE):
+    """
+    Drive feedback_loop() against a recording, offline: network requests are
+    answered from the recorded HAR (anything not in it is aborted), the
+    reasoner returns the recorded replies and, unless live_vision is set, the
+    vision models return the recorded detections and OCR text. Pacing is off.
+
+    Args:
+        session_dir: Directory written by SessionRecorder
+        runs: Number of replays to average over
+        headless: Whether to run the browser headless
+        live_vision: Run the real YOLO/OCR models on the replayed screenshots
+        output: JSONL file the benchmark result is appended to
+
+    Returns:
+        dict: Benchmark result with per-iteration latency and CPU statistics
+    """
+    from playwright.sync_api import sync_playwright
+    from src.automation.playwright_controller import BROWSER_ARGS, find_chrome_executable
+    from src.feedback.feedback_loop import feedback_loop
+    from src.utils.pacing import PacingPolicy, get_pacing_policy, set_pacing_policy
+
+    session = load_session(session_dir)
+    har_path = os.path.join(session_dir, HAR_FILE)
+    previous_policy = get_pacing_policy()
+    set_pacing_policy(PacingPolicy(profile="off", seed=0))
+    all_timings = []
+    try:
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch(headless=headless, executable_path=find_chrome_executable(),
+                                                 args=BROWSER_ARGS)
+            try:
+                for run in range(runs):
+                    context = browser.new_context(viewport={"width": 1920, "height": 1080})
+                    if os.path.exists(har_path):
+                        context.route_from_har(har_path, not_found="abort")
+                    page = context.new_page()
+                    if session.get("start_url"):
+                        page.goto(session["start_url"], wait_until="domcontentloaded")
+                    vision = None if live_vision else RecordedVision(session)
+                    result = feedback_loop(page, session["goal"], max_iterations=len(session["iterations"]),
+                                           interval=0, reasoner=StubReasoner(session),
+                                           detector=vision, ocr_processor=vision)
+                    all_timings.append(result.get("iteration_timings", []))
+                    context.close()
+            finally:
+                browser.close()
+    finally:
+        set_pacing_policy(previous_policy)
+
+    recorded = [iteration["timings"] for iteration in session["iterations"] if iteration.get("timings")]
+    benchmark = {
+        "session": os.path.abspath(session_dir),
+        "timestamp": datetime.utcnow().isoformat(),
+        "runs": runs,
+        "live_vision": live_vision,
+        "replay": summarize_timings(all_timings),
+        "recorded": summarize_timings([recorded]),
+    }
+    try:
+        with open(output, "a") as f:
+            f.write(json.dumps(benchmark) + "\n")
+    except Exception as e:
+        logging.error(f"Failed to write benchmark result to {output}: {e}")
+    print(f"Replay benchmark: {benchmark['replay']}")
+    return benchmark
+
+
+# Example usage: python -m src.history.session_recorder recordings/pizza [runs]
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    replay_session(sys.argv[1], runs=int(sys.argv[2]) if len(sys.argv) > 2 else 3)
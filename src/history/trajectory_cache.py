@@ -0,0 +1,280 @@
+# File: src/history/trajectory_cache.py
+
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from src.browser.settle import wait_until_settled
+
+QUERY_SLOT = "{query}"
+
+# A signature needs this many literal words around the slot, and the slot may
+# cover at most this share of the goal; otherwise the goal is keyed exactly
+MIN_LITERAL_WORDS = 2
+MAX_SLOT_RATIO = 0.6
+
+# Actions worth replaying; anything else in the pipeline history is skipped
+REPLAYABLE_ACTIONS = ("navigate", "click", "input", "scroll")
+
+
+def normalize_goal(goal):
+    """Lowercase a goal and collapse punctuation and whitespace so equivalent phrasings match."""
+    goal = re.sub(r"[^\w\s{}'-]", " ", goal.lower())
+    return re.sub(r"\s+", " ", goal).strip()
+
+
+def url_state(url):
+    """Reduce a URL to the parts a post-condition checks: host and path."""
+    parsed = urlparse(url or "")
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return {"host": host, "path": parsed.path.rstrip("/") or "/"}
+
+
+def literal_words(signature):
+    """Return the words of a signature outside its query slot."""
+    return signature.replace(QUERY_SLOT, " ").split()
+
+
+def _word_pattern(text, flags=0):
+    # \b would not match next to text that starts or ends with punctuation ("c++")
+    return re.compile(rf"(?<!\w){re.escape(text)}(?!\w)", flags)
+
+
+def _fill_slot(value, query):
+    if isinstance(value, str):
+        return value.replace(QUERY_SLOT, query)
+    return value
+
+
+class TrajectoryCache:
+    """
+    Records successful action sequences as parameterized macros and replays
+    them for matching goals without screenshots or LLM calls.
+
+    A trajectory is stored under a goal signature where the text that was
+    typed into the page is replaced with a {query} slot, e.g.
+        "search for {query} on amazon"
+    so "Search for iPhone 16 Pro on Amazon" and "search for usb-c cable on
+    amazon" share one macro. The slot is only used when enough of the goal
+    stays literal around it; a goal that is mostly (or only) the typed text
+    is stored under its exact wording so it cannot match unrelated goals. Each step keeps its (normalized) command and the
+    host/path the page had afterwards; replay stops at the first step whose
+    post-condition does not hold and hands over to the full feedback loop.
+    """
+
+    def __init__(self, cache_file="trajectories.json"):
+        """
+        Initialize the cache from the specified file, or start empty.
+        """
+        self.cache_file = cache_file
+        self.trajectories = {}
+        self.stats = {"lookups": 0, "hits": 0, "partial_hits": 0, "misses": 0, "time_saved_seconds": 0.0}
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r") as f:
+                    data = json.load(f)
+                self.trajectories = data.get("trajectories", {})
+                self.stats.update(data.get("stats", {}))
+            except Exception as e:
+                logging.error(f"Failed to load trajectory cache {self.cache_file}: {e}")
+
+    def _save(self):
+        """
+        Save trajectories and statistics to the JSON file.
+        """
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump({"trajectories": self.trajectories, "stats": self.stats}, f, indent=2)
+        except Exception as e:
+            logging.error(f"Failed to save trajectory cache {self.cache_file}: {e}")
+
+    # ---- Matching ----
+
+    def match(self, goal):
+        """
+        Find the trajectory for a goal.
+
+        Returns:
+            tuple: (trajectory dict, slot value or None), or (None, None) if no match
+        """
+        normalized = normalize_goal(goal)
+        if normalized in self.trajectories:
+            return self.trajectories[normalized], None
+
+        for signature, trajectory in self.trajectories.items():
+            if QUERY_SLOT not in signature or len(literal_words(signature)) < MIN_LITERAL_WORDS:
+                continue
+            prefix, suffix = signature.split(QUERY_SLOT, 1)
+            pattern = re.escape(prefix) + r"(?P<query>.+?)" + re.escape(suffix) + "$"
+            m = re.match(pattern, normalized)
+            if m:
+                # Take the slot from the original goal so its capitalization is kept
+                original = re.search(re.escape(m.group("query")).replace(r"\ ", r"\s+"),
+                                     re.sub(r"\s+", " ", goal), re.IGNORECASE)
+                return trajectory, original.group(0) if original else m.group("query")
+        return None, None
+
+    # ---- Recording ----
+
+    def record(self, goal, start_url, command_history, duration_seconds):
+        """
+        Store the successful steps of a finished run as a macro for its goal.
+
+        Args:
+            goal: The user goal the run accomplished
+            start_url: Page URL before the first step
+            command_history: CommandPipeline.history for the run
+            duration_seconds: Wall time of the full run, used to report time saved
+
+        Returns:
+            dict: The stored trajectory, or None if there was nothing to record
+        """
+        steps = []
+        for outcome in command_history:
+            if outcome.get("status") not in ("ok", "fallback"):
+                continue
+            if outcome.get("action") not in REPLAYABLE_ACTIONS:
+                continue
+            steps.append({
+                "action": outcome["action"],
+                # Element ids only mean something for one page snapshot; the
+                # pipeline stored a durable selector next to them
+                "parameters": {key: value.strip() if isinstance(value, str) else value
+                               for key, value in outcome.get("parameters", {}).items() if key != "id"},
+                "post": url_state(outcome.get("url")),
+            })
+        if not steps:
+            return None
+
+        normalized = normalize_goal(goal)
+        signature = normalized
+        # Typed text that also appears in the goal becomes the query slot
+        for step in steps:
+            typed = step["parameters"].get("text") if step["action"] == "input" else None
+            typed_normalized = normalize_goal(typed or "")
+            if not typed_normalized:
+                continue
+            # Whole words only: the query "pan" must not slot the "pan" in "company"
+            in_goal = _word_pattern(typed_normalized)
+            if in_goal.search(normalized):
+                candidate = in_goal.sub(QUERY_SLOT, normalized, count=1)
+                if (len(literal_words(candidate)) < MIN_LITERAL_WORDS
+                        or len(typed_normalized) > MAX_SLOT_RATIO * len(normalized)):
+                    logging.debug(f"Keeping exact signature for '{normalized}': typed text covers most of the goal")
+                    break
+                signature = candidate
+                in_value = _word_pattern(typed, re.IGNORECASE)
+                for other in steps:
+                    for key, value in other["parameters"].items():
+                        if isinstance(value, str):
+                            other["parameters"][key] = in_value.sub(QUERY_SLOT, value)
+                break
+
+        trajectory = {
+            "signature": signature,
+            "start_url": start_url if start_url and start_url != "about:blank" else None,
+            "steps": steps,
+            "duration_seconds": round(duration_seconds, 2),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "replays": 0,
+        }
+        self.trajectories[signature] = trajectory
+        self._save()
+        logging.info(f"Recorded trajectory '{signature}' with {len(steps)} steps")
+        return trajectory
+
+    # ---- Replay ----
+
+    def replay(self, pipeline, trajectory, query=None):
+        """
+        Replay a trajectory step by step through the command pipeline.
+
+        Returns:
+            tuple: (number of steps whose post-condition held, list of actions performed)
+        """
+        actions = []
+        # pipeline.page is re-read after every step: a navigate may switch to another tab
+        if trajectory.get("start_url") and url_state(pipeline.page.url) != url_state(trajectory["start_url"]):
+            pipeline.execute({"action": "navigate", "url": trajectory["start_url"]})
+
+        for index, step in enumerate(trajectory["steps"]):
+            command = {"action": step["action"]}
+            command.update({key: _fill_slot(value, query) if query is not None else value
+                            for key, value in step["parameters"].items()})
+            outcome = pipeline.execute(command)
+            if outcome["status"] not in ("ok", "fallback"):
+                logging.info(f"Replay step {index + 1} ({step['action']}) failed")
+                return index, actions
+            wait_until_settled(pipeline.page, timeout_ms=3000)
+            if url_state(pipeline.page.url) != step["post"]:
+                logging.info(f"Replay step {index + 1} post-condition failed: expected {step['post']}, got {url_state(pipeline.page.url)}")
+                return index, actions
+            actions.extend(outcome["actions"])
+        return len(trajectory["steps"]), actions
+
+    def run(self, page, goal, loop, pipeline_factory, **loop_kwargs):
+        """
+        Accomplish a goal, replaying a cached trajectory when one matches and
+        running the full feedback loop otherwise (or from the first failed step).
+
+        Args:
+            page: Playwright page
+            goal: The user goal
+            loop: The feedback loop function, called as loop(page, goal, initial_actions=..., **loop_kwargs)
+            pipeline_factory: Callable returning a CommandPipeline for the page
+            **loop_kwargs: Extra arguments for the feedback loop
+
+        Returns:
+            dict: The feedback loop context, or a replay summary on a full hit
+        """
+        self.stats["lookups"] += 1
+        start = time.perf_counter()
+        trajectory, query = self.match(goal)
+        replayed_actions = []
+
+        if trajectory:
+            print(f"Replaying cached trajectory '{trajectory['signature']}'" + (f" with query '{query}'" if query else ""))
+            pipeline = pipeline_factory(page)
+            completed, replayed_actions = self.replay(pipeline, trajectory, query)
+            page = pipeline.page  # replay may have switched to another tab
+            trajectory["replays"] += 1
+            if completed == len(trajectory["steps"]):
+                elapsed = time.perf_counter() - start
+                saved = max(0.0, trajectory["duration_seconds"] - elapsed)
+                self.stats["hits"] += 1
+                self.stats["time_saved_seconds"] = round(self.stats["time_saved_seconds"] + saved, 2)
+                self._save()
+                print(f"Trajectory replayed in {elapsed:.1f}s (saved ~{saved:.1f}s)")
+                self.report()
+                return {"original_goal": goal, "completed": True, "replayed": True,
+                        "actions_taken": replayed_actions, "current_state": "Completed from cached trajectory"}
+            self.stats["partial_hits"] += 1
+            print(f"Replay diverged after {completed}/{len(trajectory['steps'])} steps, continuing with the full loop")
+        else:
+            self.stats["misses"] += 1
+
+        start_url = page.url
+        context = loop(page, goal, initial_actions=replayed_actions, **loop_kwargs)
+        if context and context.get("completed") and not replayed_actions:
+            self.record(goal, start_url, context.get("command_history", []), time.perf_counter() - start)
+        self._save()
+        self.report()
+        return context
+
+    def hit_rate(self):
+        """Fraction of lookups fully served from the cache."""
+        return self.stats["hits"] / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+    def report(self):
+        """Print and return cache statistics."""
+        summary = dict(self.stats, hit_rate=round(self.hit_rate(), 3), trajectories=len(self.trajectories))
+        print(f"Trajectory cache: {summary['hits']}/{summary['lookups']} hits "
+              f"({summary['hit_rate']:.0%}), {summary['partial_hits']} partial, "
+              f"~{summary['time_saved_seconds']:.1f}s saved")
+        return summary
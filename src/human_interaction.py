@@ -1,5 +1,4 @@
-import asyncio
-import random
+from src.utils.pacing import get_pacing_policy
 
 async def simulate_human_mouse_move(page, start: tuple, end: tuple, steps: int = 20):
     """
@@ -19,7 +18,7 @@ async def simulate_human_mouse_move(page, start: tuple, end: tuple, steps: int =
         new_y = start[1] + delta_y * (i + 1)
         await page.mouse.move(new_x, new_y)
         # Sleep for a random short interval to simulate human delay
-        await asyncio.sleep(random.uniform(0.01, 0.05))
+        await get_pacing_policy().async_sleep(0.01, 0.05)
 
 async def simulate_human_typing(page, selector: str, text: str, delay_range: tuple = (0.1, 0.3)):
     """
@@ -31,9 +30,13 @@ async def simulate_human_typing(page, selector: str, text: str, delay_range: tup
         text: The text to type.
         delay_range: Tuple specifying the minimum and maximum delay between keystrokes.
     """
+    pacing = get_pacing_policy()
+    if not pacing.per_char_typing or pacing.exhausted:
+        await page.fill(selector, text)
+        return
     for char in text:
         await page.type(selector, char)
-        await asyncio.sleep(random.uniform(*delay_range))
+        await pacing.async_sleep(*delay_range)
 
 async def random_delay(min_delay: float = 0.5, max_delay: float = 1.5):
     """
@@ -43,5 +46,4 @@ async def random_delay(min_delay: float = 0.5, max_delay: float = 1.5):
         min_delay: Minimum delay in seconds.
         max_delay: Maximum delay in seconds.
     """
-    delay = random.uniform(min_delay, max_delay)
-    await asyncio.sleep(delay)
+    await get_pacing_policy().async_sleep(min_delay, max_delay)
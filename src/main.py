@@ -1,10 +1,10 @@
 # File: src/main.py
 
+# Imported first so PROCESS_START is as close to interpreter start as possible
+from src.utils.startup import get_startup_profiler, preload_agent_components, collect_agent_components
 import os
 import logging
 import shutil
-import random
-import time
 from dotenv import load_dotenv
 from src.handlers.search_handler import SearchHandler
 from src.utils.json_utils import extract_json
@@ -18,11 +18,85 @@ logging.basicConfig(
 # Project imports
 from src.automation.playwright_controller import PlaywrightController
 from src.feedback.feedback_loop import feedback_loop
+from src.utils.pacing import get_pacing_policy
+from src.history.trajectory_cache import TrajectoryCache
+from src.history.session_recorder import SessionRecorder
+from src.automation.command_pipeline import CommandPipeline
+from src.browser.context_pool import ContextPool
+from src.browser.profile_manager import ProfileManager, storage_state_from_env
+
+def run_goal(page, user_goal, **components):
+    """
+    Run one goal on a page, replaying a cached trajectory when one matches.
+    
+    Args:
+        **components: Preloaded detector, ocr_processor and reasoner for the feedback loop
+    """
+    # AGENT_TRAJECTORY_CACHE sets the cache file; "off" disables the cache.
+    cache_file = os.getenv("AGENT_TRAJECTORY_CACHE", "trajectories.json")
+    # AGENT_RECORD_SESSION=<dir> records the session for offline replay
+    record_dir = os.getenv("AGENT_RECORD_SESSION")
+    recorder = SessionRecorder(record_dir) if record_dir else None
+    if cache_file.lower() == "off" or recorder:
+        return feedback_loop(page, user_goal, max_iterations=20, interval=3, recorder=recorder, **components)
+    trajectory_cache = TrajectoryCache(cache_file)
+    return trajectory_cache.run(
+        page, user_goal, feedback_loop,
+        pipeline_factory=lambda p: CommandPipeline(p, search_handler=SearchHandler()),
+        max_iterations=20, interval=3, **components
+    )
+
+def run_pooled(first_goal, pool_size, profiler):
+    """
+    Run back-to-back goals on warm contexts from a ContextPool, so only the
+    first task pays for browser startup.
+    """
+    max_uses = int(os.getenv("AGENT_CONTEXT_MAX_USES", "10"))
+    # AGENT_STORAGE_STATE=<name> starts every pooled context from a saved login snapshot
+    pool = ContextPool(size=pool_size, max_uses=max_uses, storage_state=storage_state_from_env())
+    with profiler.measure("browser"):
+        pool.start()
+    try:
+        components = collect_agent_components(profiler)
+        profiler.print_report()
+        goal = first_goal
+        while goal and goal.strip().lower() not in ("exit", "quit"):
+            lease = pool.lease()
+            try:
+                run_goal(lease.page, goal, **components)
+            except KeyboardInterrupt:
+                print("\nProcess interrupted by user.")
+                break
+            except Exception as e:
+                logging.error(f"Error during execution: {e}")
+            finally:
+                pool.release(lease)
+                save_startup_benchmark(profiler, goal)
+            goal = input("\nNext task (or 'exit' to quit)? ")
+        print(f"Context pool: {pool.summary()}")
+    finally:
+        pool.close()
+
+def save_startup_benchmark(profiler, goal):
+    """Append the startup profile once, after the first task, with cold-start-to-first-action times."""
+    if profiler.mark("benchmark_saved"):
+        marks = profiler.marks
+        extra = {"goal": goal}
+        if "first_action" in marks and "goal_entered" in marks:
+            extra["first_action_after_goal"] = round(marks["first_action"] - marks["goal_entered"], 3)
+        profiler.save_benchmark(**extra)
+        profiler.shutdown()
 
 def main():
+    profiler = get_startup_profiler()
+    profiler.mark("imports_done")
     # Load environment variables
     load_dotenv()
     
+    # Load the vision models and the reasoner (warming up its API connection)
+    # in the background, overlapping with typing the goal and the browser launch
+    preload_agent_components(profiler)
+    
     print("===== AI-Driven Browser Automation =====")
     print("This agent will use AI to complete browsing tasks autonomously.")
     print("Examples of tasks you can request:")
@@ -34,6 +108,7 @@ def main():
 
     # Get high-level goal from the user
     user_goal = input("What would you like the browser agent to do? ")
+    profiler.mark("goal_entered")
     
     print("\nLaunching browser and starting autonomous agent...")
     print("(Press Ctrl+C at any time to stop the process)")
@@ -46,32 +121,58 @@ def main():
         "Starting autonomous browsing session..."
     ]
     
+    pacing = get_pacing_policy()
     for message in startup_messages:
         print(message)
         # Random delay between messages
-        time.sleep(random.uniform(0.3, 1.0))
+        pacing.sleep(0.3, 1.0)
+    
+    # AGENT_CONTEXT_POOL=N keeps N warm browser contexts for back-to-back tasks
+    pool_size = int(os.getenv("AGENT_CONTEXT_POOL", "0"))
+    if pool_size > 0:
+        try:
+            run_pooled(user_goal, pool_size, profiler)
+        except Exception as e:
+            logging.error(f"Failed to run with context pool: {e}")
+        return
     
     # Launch browser with persistent profile using the controller instance
     try:
         controller = PlaywrightController()
-        browser_context, temp_profile_path = controller.launch_browser_with_profile()
-        page = browser_context.new_page()
+        # Playwright's sync API is bound to this thread, so the browser launches here
+        # while the models keep loading on the startup threads
+        with profiler.measure("browser"):
+            browser_context, temp_profile_path = controller.launch_browser_with_profile()
+            page = browser_context.new_page()
+        components = collect_agent_components(profiler)
+        profiler.print_report()
         
         try:
-            # Run the continuous feedback loop with the enhanced version
-            feedback_loop(page, user_goal, max_iterations=20, interval=3)
+            run_goal(page, user_goal, **components)
         except KeyboardInterrupt:
             print("\nProcess interrupted by user.")
         except Exception as e:
             logging.error(f"Error during execution: {e}")
         finally:
+            save_startup_benchmark(profiler, user_goal)
+            # Snapshot cookies/localStorage so pooled and concurrent sessions start logged in
+            snapshot_name = os.getenv("AGENT_STORAGE_STATE")
+            if snapshot_name:
+                try:
+                    ProfileManager().save_state(browser_context, snapshot_name)
+                except Exception as e:
+                    logging.error(f"Failed to save storage state '{snapshot_name}': {e}")
+            if controller.request_filter:
+                print(f"Request filter: {controller.request_filter.summary()}")
+            if controller.asset_cache:
+                print(f"Asset cache: {controller.asset_cache.summary()}")
             # Let the user see the final state before closing
             input("\nPress Enter to close the browser...")
             browser_context.close()
             
             # Only clean up temporary profile if one was created
             if temp_profile_path:
-                print("Cleaning up temporary Chrome profile...")
+                print("Cleaning up cloned Chrome profile...")
                 shutil.rmtree(temp_profile_path, ignore_errors=True)
     except Exception as e:
         logging.error(f"Failed to launch browser: {e}")
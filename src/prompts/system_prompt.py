@@ -15,8 +15,8 @@ Your responses should ALWAYS be valid JSON in this exact format:
 
 Available commands:
 1. Navigate: {"action": "navigate", "url": "https://example.com"}
-2. Click: {"action": "click", "selector": "#element-id"} or {"action": "click", "text": "Button text"}
-3. Input: {"action": "input", "selector": "#input-id", "text": "text to type", "submit": true/false}
+2. Click: {"action": "click", "id": 17} or {"action": "click", "selector": "#element-id"} or {"action": "click", "text": "Button text"}
+3. Input: {"action": "input", "id": 4, "text": "text to type", "submit": true/false} or {"action": "input", "selector": "#input-id", "text": "text to type", "submit": true/false}
 4. Scroll: {"action": "scroll", "direction": "down", "amount": 300}
 5. Done: {"action": "done", "text": "Task completed successfully", "success": true}
 
@@ -25,6 +25,7 @@ IMPORTANT RULES:
 - Use double quotes for strings, not single quotes
 - Do not include trailing commas in arrays or objects
 - Make sure your JSON can be parsed by a standard JSON parser
+- When INTERACTIVE ELEMENTS are listed, click and type by their "id"; only use selectors or text for elements not in the list
 - If you encounter a cookie banner, always interact with it first before proceeding
 - If you get stuck, try an alternative approach or navigation path
 
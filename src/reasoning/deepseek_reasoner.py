@@ -21,6 +21,20 @@ class DeepSeekReasoner:
         self.groq_instance = Groq(api_key=self.api_key)
         # Initialize the conversation logger to maintain context
         self.chat_logger = ChatLogger()
+        # Reuse one connection pool for every request
+        self.http = requests.Session()
+
+    def warm_up(self, timeout: float = 5.0) -> bool:
+        """
+        Open the TLS connection to the API ahead of the first request.
+        
+        :return: True if the API host answered.
+        """
+        try:
+            self.http.head("https://api.groq.com", timeout=timeout)
+            return True
+        except requests.RequestException:
+            return False
 
     def get_response(self, user_message: str, metadata: dict, dom_data=None, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
@@ -99,6 +113,12 @@ class DeepSeekReasoner:
 
     VISUAL INFORMATION:
     {json.dumps(metadata, indent=2)}
+    """
+        # Numbered interactive elements; the model can act on them by id instead of guessing selectors
+        if dom_data and dom_data.get("element_index"):
+            prompt_message += f"""
+    INTERACTIVE ELEMENTS (id, type, label, position):
+    {dom_data["element_index"]}
     """
         
         # Call the DeepSeek API with the system prompt
@@ -128,7 +148,7 @@ class DeepSeekReasoner:
             "Content-Type": "application/json"
         }
         
-        response = requests.post(self.groq_api_url, json=payload, headers=headers)
+        response = self.http.post(self.groq_api_url, json=payload, headers=headers)
         if response.status_code == 200:
             result = response.json()
             answer = result["choices"][0]["message"]["content"]
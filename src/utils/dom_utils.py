@@ -2,6 +2,8 @@
 
 import asyncio
 import logging
+from src.dom.element_cache import get_element_cache
+from src.dom.page_snapshot import async_get_page_snapshot
 
 logger = logging.getLogger("dom_utils")
 logger.setLevel(logging.DEBUG)
@@ -12,12 +14,22 @@ if not logger.handlers:
     ch.setFormatter(formatter)
     logger.addHandler(ch)
 
+async def _resolve_cached(page, selector, timeout):
+    """Resolve a selector through the page's element cache, waiting for it to appear on a miss."""
+    cache = get_element_cache(page)
+    match = await cache.async_resolve(selector)
+    if match is None:
+        await page.wait_for_selector(selector, timeout=timeout)
+        match = await cache.async_resolve(selector)
+    return match
+
 async def safe_get_outer_html(page, selector, timeout=5000):
     """Safely get outer HTML of an element with timeout"""
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        html = await page.evaluate(f'document.querySelector("{selector}").outerHTML')
-        return html
+        match = await _resolve_cached(page, selector, timeout)
+        if match is None:
+            return await page.locator(selector).first.evaluate("el => el.outerHTML")
+        return await match["locator"].evaluate("el => el.outerHTML")
     except Exception as e:
         logger.error(f"Error getting outer HTML for '{selector}': {e}")
         return None
@@ -25,8 +37,11 @@ async def safe_get_outer_html(page, selector, timeout=5000):
 async def safe_click(page, selector, timeout=5000):
     """Safely click an element with timeout"""
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        await page.click(selector)
+        match = await _resolve_cached(page, selector, timeout)
+        if match is None:
+            await page.click(selector)
+        else:
+            await match["locator"].click()
         return True
     except Exception as e:
         logger.error(f"Error clicking '{selector}': {e}")
@@ -35,8 +50,11 @@ async def safe_click(page, selector, timeout=5000):
 async def safe_fill(page, selector, text, timeout=5000):
     """Safely fill an input element with timeout"""
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        await page.fill(selector, text)
+        match = await _resolve_cached(page, selector, timeout)
+        if match is None:
+            await page.fill(selector, text)
+        else:
+            await match["locator"].fill(text)
         return True
     except Exception as e:
         logger.error(f"Error filling '{selector}': {e}")
@@ -45,23 +63,20 @@ async def safe_fill(page, selector, text, timeout=5000):
 async def get_element_dimensions(page, selector, timeout=5000):
     """Get dimensions of an element"""
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        dimensions = await page.evaluate(f'''() => {{
-            const element = document.querySelector("{selector}");
-            if (!element) return null;
-            const rect = element.getBoundingClientRect();
-            return {{
-                x: rect.x,
-                y: rect.y,
-                width: rect.width,
-                height: rect.height,
-                top: rect.top,
-                right: rect.right,
-                bottom: rect.bottom,
-                left: rect.left
-            }};
-        }}''')
-        return dimensions
+        match = await _resolve_cached(page, selector, timeout)
+        if match is None or not match["rect"]:
+            return None
+        rect = match["rect"]
+        return {
+            "x": rect["x"],
+            "y": rect["y"],
+            "width": rect["width"],
+            "height": rect["height"],
+            "top": rect["y"],
+            "right": rect["x"] + rect["width"],
+            "bottom": rect["y"] + rect["height"],
+            "left": rect["x"]
+        }
     except Exception as e:
         logger.error(f"Error getting dimensions for '{selector}': {e}")
         return None
@@ -78,39 +93,9 @@ def has_element(page, selector, timeout=1000):
 async def extract_dom_context(page):
     """Extract key information about the DOM for AI context"""
     try:
-        dom_context = await page.evaluate("""() => {
-            const result = {
-                title: document.title,
-                url: window.location.href,
-                elementCounts: {
-                    buttons: document.querySelectorAll('button').length,
-                    links: document.querySelectorAll('a').length,
-                    inputs: document.querySelectorAll('input, textarea').length,
-                    images: document.querySelectorAll('img').length
-                },
-                visibleText: Array.from(document.querySelectorAll('h1, h2, h3, p'))
-                    .filter(el => el.offsetParent !== null)
-                    .map(el => el.textContent.trim())
-                    .filter(text => text.length > 0)
-                    .slice(0, 10)
-            };
-            
-            // Get form information
-            const forms = document.querySelectorAll('form');
-            result.forms = Array.from(forms).map(form => {
-                const inputs = form.querySelectorAll('input');
-                return {
-                    id: form.id,
-                    action: form.action,
-                    method: form.method,
-                    inputCount: inputs.length,
-                    inputTypes: Array.from(inputs).map(input => input.type)
-                };
-            }).slice(0, 3);
-            
-            return result;
-        }""")
-        return dom_context
+        # Served from the page snapshot, captured once per page state
+        snapshot = await async_get_page_snapshot(page)
+        return snapshot.dom_context()
     except Exception as e:
         logger.error(f"Error extracting DOM context: {e}")
         return {
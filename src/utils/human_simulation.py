@@ -1,7 +1,7 @@
 # File: src/utils/human_simulation.py
 
-import random
-import asyncio
+from src.utils.pacing import get_pacing_policy
+from src.automation.cursor import bezier_path, dispatch_path_async
 
 async def simulate_human_mouse_movement(page, start_x, start_y, end_x, end_y, steps=20):
     """
@@ -12,17 +12,15 @@ async def simulate_human_mouse_movement(page, start_x, start_y, end_x, end_y, st
       - end_x, end_y: destination coordinates.
       - steps: number of intermediate steps to simulate smooth movement.
     """
+    pacing = get_pacing_policy()
     # Calculate a control point with random offset for a natural curve
-    control_x = (start_x + end_x) / 2 + random.randint(-100, 100)
-    control_y = (start_y + end_y) / 2 + random.randint(-100, 100)
+    control_x = (start_x + end_x) / 2 + pacing.randint(-100, 100)
+    control_y = (start_y + end_y) / 2 + pacing.randint(-100, 100)
 
-    for i in range(steps + 1):
-        t = i / steps
-        # Quadratic Bezier formula for x and y
-        x = (1-t)**2 * start_x + 2*(1-t)*t * control_x + t**2 * end_x
-        y = (1-t)**2 * start_y + 2*(1-t)*t * control_y + t**2 * end_y
-        await page.mouse.move(x, y)
-        await asyncio.sleep(random.uniform(0.005, 0.02))
+    # Quadratic Bezier path, dispatched as one batch of input events
+    path = bezier_path((start_x, start_y), (end_x, end_y), steps, (control_x, control_y))
+    await dispatch_path_async(page, path)
+    await pacing.async_sleep(0.005 * len(path), 0.02 * len(path))
 
 async def simulate_human_typing(page, selector, text):
     """
@@ -32,12 +30,16 @@ async def simulate_human_typing(page, selector, text):
       - selector: the target input field selector.
       - text: text to be typed.
     """
+    pacing = get_pacing_policy()
     await page.click(selector)
     # Clear any pre-existing text
     await page.fill(selector, "")
+    if not pacing.per_char_typing or pacing.exhausted:
+        await page.fill(selector, text)
+        return
     for char in text:
-        await page.type(selector, char, delay=random.randint(50, 200))
+        await page.type(selector, char, delay=pacing.delay_ms(50, 200))
         # Occasionally add a longer pause to mimic human variability
-        if random.random() < 0.01:
-            await asyncio.sleep(random.uniform(0.5, 1.0))
-    await asyncio.sleep(random.uniform(0.1, 0.3))
+        if pacing.uniform(0, 1) < 0.01:
+            await pacing.async_sleep(0.5, 1.0)
+    await pacing.async_sleep(0.1, 0.3)
@@ -0,0 +1,167 @@
+# File: src/utils/pacing.py
+
+import asyncio
+import logging
+import os
+import random
+import time
+
+# Available pacing profiles.
+#   scale: multiplier applied to every requested delay range
+#   per_char_typing: type text one key at a time instead of filling it in one call
+PACING_PROFILES = {
+    "off": {"scale": 0.0, "per_char_typing": False},
+    "fast": {"scale": 0.1, "per_char_typing": False},
+    "human": {"scale": 1.0, "per_char_typing": True},
+}
+
+DEFAULT_PROFILE = "human"
+
+
+class PacingPolicy:
+    """
+    Single source of truth for every deliberate delay the agent makes.
+
+    All human-like pauses, typing delays and scroll/mouse jitter should be
+    requested through a policy so that a whole session can be slowed down,
+    sped up or made reproducible from one place.
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE, seed=None, budget_seconds=None):
+        """
+        Args:
+            profile: One of PACING_PROFILES ("off", "fast" or "human")
+            seed: Optional seed for the random generator, for reproducible runs
+            budget_seconds: Optional cap on the total deliberate delay for the session.
+                            Once spent, every further delay is skipped.
+        """
+        if profile not in PACING_PROFILES:
+            raise ValueError(f"Unknown pacing profile '{profile}'. Choose from: {', '.join(PACING_PROFILES)}")
+
+        self.profile = profile
+        self.scale = PACING_PROFILES[profile]["scale"]
+        self.per_char_typing = PACING_PROFILES[profile]["per_char_typing"]
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.budget_seconds = budget_seconds
+        self.spent_seconds = 0.0
+        self.skipped_seconds = 0.0
+
+    @property
+    def exhausted(self):
+        """True once the session delay budget has been used up."""
+        return self.budget_seconds is not None and self.spent_seconds >= self.budget_seconds
+
+    def uniform(self, low, high):
+        """Random float from the policy's generator (not a delay, not scaled)."""
+        return self.rng.uniform(low, high)
+
+    def randint(self, low, high):
+        """Random integer from the policy's generator (not a delay, not scaled)."""
+        return self.rng.randint(low, high)
+
+    def delay(self, low, high=None):
+        """
+        Draw a delay in seconds from [low, high], scale it for the active profile
+        and charge it against the session budget.
+
+        Returns:
+            float: The number of seconds the caller should actually wait
+        """
+        requested = low if high is None else self.rng.uniform(low, high)
+        seconds = requested * self.scale
+
+        if self.budget_seconds is not None:
+            remaining = max(0.0, self.budget_seconds - self.spent_seconds)
+            if seconds > remaining:
+                self.skipped_seconds += seconds - remaining
+                seconds = remaining
+
+        self.spent_seconds += seconds
+        return seconds
+
+    def delay_ms(self, low_ms, high_ms=None):
+        """Same as delay() but in whole milliseconds."""
+        seconds = self.delay(low_ms / 1000, None if high_ms is None else high_ms / 1000)
+        return int(seconds * 1000)
+
+    def sleep(self, low, high=None, reason=None):
+        """Block for a policy-controlled delay drawn from [low, high] seconds."""
+        seconds = self.delay(low, high)
+        if reason and seconds >= 0.5:
+            print(f"{reason} ({seconds:.1f} seconds)...")
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+    async def async_sleep(self, low, high=None, reason=None):
+        """Async counterpart of sleep() for use in coroutine code."""
+        seconds = self.delay(low, high)
+        if reason and seconds >= 0.5:
+            logging.info(f"{reason} ({seconds:.1f} seconds)")
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        return seconds
+
+    def type_text(self, locator, text, min_delay_ms=50, max_delay_ms=150, pause=(0.01, 0.03)):
+        """
+        Enter text into the element behind a locator, key by key with
+        human-like delays under the "human" profile, or in a single fill
+        call otherwise.
+
+        The field is expected to have been cleared by the caller.
+        """
+        if not self.per_char_typing or self.exhausted:
+            locator.fill(text)
+            return
+
+        for char in text:
+            locator.type(char, delay=self.delay_ms(min_delay_ms, max_delay_ms))
+            self.sleep(*pause)
+
+    def summary(self):
+        """Return a dict describing how much deliberate delay the session used."""
+        return {
+            "profile": self.profile,
+            "seed": self.seed,
+            "budget_seconds": self.budget_seconds,
+            "spent_seconds": round(self.spent_seconds, 3),
+            "skipped_seconds": round(self.skipped_seconds, 3),
+        }
+
+
+_active_policy = None
+
+
+def policy_from_env():
+    """
+    Build a policy from environment variables:
+        AGENT_PACING         - profile name (off, fast, human)
+        AGENT_PACING_SEED    - integer seed for reproducible runs
+        AGENT_PACING_BUDGET  - max seconds of deliberate delay per session
+    """
+    profile = os.getenv("AGENT_PACING", DEFAULT_PROFILE).strip().lower()
+    seed = os.getenv("AGENT_PACING_SEED")
+    budget = os.getenv("AGENT_PACING_BUDGET")
+
+    return PacingPolicy(
+        profile=profile,
+        seed=int(seed) if seed else None,
+        budget_seconds=float(budget) if budget else None,
+    )
+
+
+def get_pacing_policy():
+    """Return the session-wide pacing policy, creating it from the environment on first use."""
+    global _active_policy
+    if _active_policy is None:
+        _active_policy = policy_from_env()
+        logging.info("Pacing policy: %s", _active_policy.summary())
+    return _active_policy
+
+
+def set_pacing_policy(policy):
+    """Replace the session-wide pacing policy (e.g. from tests or a CLI flag)."""
+    global _active_policy
+    _active_policy = policy
+    return policy
@@ -0,0 +1,216 @@
+# File: src/utils/startup.py
+
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+# Taken when this module is first imported; src.main imports it before anything heavy
+PROCESS_START = time.perf_counter()
+
+BENCHMARK_FILE = "startup_benchmark.jsonl"
+
+
+class StartupProfiler:
+    """
+    Times imports and component initialization during startup and runs
+    independent components (model loads, API connection warmup) on worker
+    threads while the main thread launches the browser.
+
+    Marks record when a milestone was reached, in seconds since process
+    start; "first_action" is the cold-start-to-first-action benchmark.
+    """
+
+    def __init__(self, start=PROCESS_START, max_workers=3):
+        self.start = start
+        self.imports = {}
+        self.components = {}
+        self.marks = {}
+        self.futures = {}
+        self.max_workers = max_workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def _elapsed(self):
+        return round(time.perf_counter() - self.start, 3)
+
+    # ---- Measuring ----
+
+    def timed_import(self, module_name):
+        """Import a module and record how long it took (0 if it was already loaded)."""
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        with self.lock:
+            self.imports.setdefault(module_name, round(time.perf_counter() - start, 3))
+        return module
+
+    @contextmanager
+    def measure(self, name):
+        """Time a block of startup work as a named component."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.components[name] = {"seconds": round(time.perf_counter() - start, 3),
+                                         "ready_at": self._elapsed(),
+                                         "thread": threading.current_thread().name}
+
+    def mark(self, name):
+        """Record the first time a milestone is reached."""
+        with self.lock:
+            if name not in self.marks:
+                self.marks[name] = self._elapsed()
+                return True
+        return False
+
+    # ---- Parallel initialization ----
+
+    def submit(self, name, func, *args, **kwargs):
+        """Start a component on a worker thread; collect it with result(name)."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="startup")
+
+        def run():
+            with self.measure(name):
+                return func(*args, **kwargs)
+
+        self.futures[name] = self.executor.submit(run)
+        return self.futures[name]
+
+    def result(self, name, default=None):
+        """
+        Wait for a submitted component.
+
+        Returns:
+            The component, or default if it failed (the error is logged) or was never submitted
+        """
+        future = self.futures.get(name)
+        if future is None:
+            return default
+        try:
+            return future.result()
+        except Exception as e:
+            logging.error(f"Startup component '{name}' failed: {e}")
+            with self.lock:
+                self.components.setdefault(name, {})["error"] = str(e)
+            return default
+
+    # ---- Reporting ----
+
+    def report(self):
+        """Return the startup profile."""
+        with self.lock:
+            serial = sum(component.get("seconds", 0.0) for component in self.components.values())
+            return {
+                "imports": dict(self.imports),
+                "components": {name: dict(component) for name, component in self.components.items()},
+                "marks": dict(self.marks),
+                "serial_seconds": round(serial, 3),
+            }
+
+    def print_report(self):
+        report = self.report()
+        print("\n=== Startup Profile ===")
+        for module_name, seconds in sorted(report["imports"].items(), key=lambda item: -item[1]):
+            print(f"  import {module_name}: {seconds:.2f}s")
+        for name, component in report["components"].items():
+            status = f" (failed: {component['error']})" if component.get("error") else ""
+            print(f"  {name}: {component.get('seconds', 0.0):.2f}s, ready at {component.get('ready_at', 0.0):.2f}s "
+                  f"[{component.get('thread', '?')}]{status}")
+        for name, seconds in report["marks"].items():
+            print(f"  {name} at {seconds:.2f}s after start")
+        return report
+
+    def save_benchmark(self, path=None, **extra):
+        """Append the profile to the startup benchmark JSONL file (AGENT_STARTUP_BENCHMARK, "off" to skip)."""
+        path = path or os.getenv("AGENT_STARTUP_BENCHMARK", BENCHMARK_FILE)
+        if path.lower() == "off":
+            return None
+        entry = dict(self.report(), timestamp=datetime.utcnow().isoformat(), **extra)
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            logging.error(f"Failed to write startup benchmark to {path}: {e}")
+        return entry
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+_profiler = None
+
+
+def get_startup_profiler():
+    """Return the process-wide startup profiler."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+    return _profiler
+
+
+# ---- Standard startup components ----
+
+def load_detector(profiler, model_variant='yolov8l.pt'):
+    profiler.timed_import("ultralytics")
+    from src.vision.yolov8_detector import YOLOv8Detector
+    return YOLOv8Detector(model_variant=model_variant)
+
+
+def load_ocr_processor(profiler):
+    profiler.timed_import("easyocr")
+    from src.vision.ocr_processor import OCRProcessor
+    return OCRProcessor()
+
+
+def load_reasoner(profiler):
+    profiler.timed_import("groq")
+    from src.reasoning.deepseek_reasoner import DeepSeekReasoner
+    reasoner = DeepSeekReasoner()
+    reasoner.warm_up()
+    return reasoner
+
+
+def preload_agent_components(profiler=None):
+    """
+    Start loading YOLO, EasyOCR and the reasoner (with its API connection
+    warmed up) in the background. Collect them with collect_agent_components()
+    once the browser is up.
+
+    With AGENT_PERCEPTION=accessibility the vision models are not preloaded;
+    they are only loaded if a page needs the screenshot fallback.
+    """
+    from src.vision.accessibility_perception import perception_mode
+    profiler = profiler or get_startup_profiler()
+    if perception_mode() == "vision":
+        profiler.submit("yolo", load_detector, profiler)
+        profiler.submit("easyocr", load_ocr_processor, profiler)
+    profiler.submit("reasoner", load_reasoner, profiler)
+    return profiler
+
+
+def collect_agent_components(profiler=None):
+    """
+    Wait for the preloaded components.
+
+    Returns:
+        dict: detector, ocr_processor and reasoner keyword arguments for
+              feedback_loop(); a component that failed to load is left out so
+              the loop falls back to creating it itself
+    """
+    profiler = profiler or get_startup_profiler()
+    components = {
+        "detector": profiler.result("yolo"),
+        "ocr_processor": profiler.result("easyocr"),
+        "reasoner": profiler.result("reasoner"),
+    }
+    profiler.mark("components_ready")
+    return {key: value for key, value in components.items() if value is not None}
@@ -0,0 +1,261 @@
+# File: src/vision/accessibility_perception.py
+
+import json
+import logging
+import os
+import re
+import time
+
+PERCEPTION_MODES = ("vision", "accessibility")
+
+MIN_NODES = 3          # fewer named nodes in the viewport than this: the page is not accessible enough
+MAX_CANVAS_RATIO = 0.4  # more of the viewport than this covered by canvas: only pixels tell what is there
+SNAPSHOT_TIMEOUT_MS = 5000
+
+# Roles that are structure or plain text rather than something to act on or look at
+TEXT_ROLES = {"text", "paragraph", "generic", "group", "list", "listitem", "row", "cell", "rowgroup",
+              "document", "main", "banner", "contentinfo", "navigation", "region", "article",
+              "complementary", "section", "none", "presentation", "strong", "emphasis", "code"}
+
+# What the aria snapshot cannot say: how much of the viewport is canvas (or
+# other opaque embeds) and how big the viewport is.
+PAGE_TRAITS_JS = """
+() => {
+    const width = window.innerWidth, height = window.innerHeight;
+    let covered = 0;
+    for (const el of document.querySelectorAll('canvas, embed, object')) {
+        const rect = el.getBoundingClientRect();
+        const w = Math.max(0, Math.min(rect.right, width) - Math.max(rect.left, 0));
+        const h = Math.max(0, Math.min(rect.bottom, height) - Math.max(rect.top, 0));
+        covered += w * h;
+    }
+    return {width, height, canvasRatio: width && height ? Math.min(1, covered / (width * height)) : 0};
+}
+"""
+
+# One line of Playwright's aria snapshot (YAML), e.g.
+#   - button "Accept all" [disabled] [box=10,20,120,32]
+#   - heading "Results" [level=2] [box=...]:
+#   - paragraph [box=...]: Some text
+#   - text: Some text
+_LINE_RE = re.compile(r'^(?P<indent>\s*)- (?P<role>[A-Za-z][\w-]*)'
+                      r'(?: "(?P<name>(?:[^"\\]|\\.)*)")?'
+                      r'(?P<attrs>(?: \[[^\]]*\])*)'
+                      r'(?::(?: (?P<value>.*))?)?$')
+_ATTR_RE = re.compile(r'\[([^\]=]+)(?:=([^\]]*))?\]')
+# Keys that YAML would misread (e.g. a name containing ": ") are wrapped in
+# single quotes, with embedded quotes doubled:
+#   - 'button "Sort by: Price" [box=...]'
+_QUOTED_KEY_RE = re.compile(r"^(?P<indent>\s*)- '(?P<key>(?:[^']|'')*)'(?P<rest>.*)$")
+
+
+def perception_mode():
+    """AGENT_PERCEPTION=accessibility switches the page model from screenshots to the accessibility tree."""
+    mode = os.getenv("AGENT_PERCEPTION", "vision").strip().lower()
+    if mode in ("accessibility", "a11y", "ax"):
+        return "accessibility"
+    return "vision"
+
+
+def _unquote(value):
+    value = (value or "").strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        try:
+            return json.loads(value) if value[0] == '"' else value[1:-1]
+        except ValueError:
+            return value[1:-1]
+    return value
+
+
+def parse_aria_snapshot(snapshot):
+    """
+    Parse an aria snapshot taken with boxes=True into flat nodes.
+
+    Nodes without a box of their own (static text) get their parent's.
+
+    Returns:
+        list: {"role", "name", "text", "states", "box": (x, y, width, height) or None, "depth"}
+    """
+    nodes = []
+    parents = []  # (indent, box) of the enclosing nodes
+    for line in (snapshot or "").splitlines():
+        quoted = _QUOTED_KEY_RE.match(line)
+        if quoted:
+            key = quoted.group("key").replace("''", "'")
+            line = f"{quoted.group('indent')}- {key}{quoted.group('rest')}"
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        indent = len(match.group("indent"))
+        while parents and parents[-1][0] >= indent:
+            parents.pop()
+        states = {}
+        box = None
+        for key, value in _ATTR_RE.findall(match.group("attrs") or ""):
+            if key == "box":
+                try:
+                    box = tuple(float(part) for part in value.split(","))
+                except ValueError:
+                    box = None
+            elif key != "ref":
+                states[key] = value if value else True
+        if box is None and parents:
+            box = parents[-1][1]
+        name = (match.group("name") or "").replace('\\"', '"')
+        text = _unquote(match.group("value"))
+        nodes.append({"role": match.group("role"), "name": name, "text": text, "states": states,
+                      "box": box, "depth": len(parents)})
+        parents.append((indent, box))
+    return nodes
+
+
+def _in_viewport(box, width, height):
+    x, y, box_width, box_height = box
+    return box_width > 0 and box_height > 0 and x < width and y < height and x + box_width > 0 and y + box_height > 0
+
+
+def nodes_to_metadata(nodes, viewport):
+    """
+    The parsed nodes inside the viewport, in the shapes the vision models
+    produce: detections ({"bbox": [x1, y1, x2, y2], "confidence", "class"}
+    plus role, name and states) for roles worth acting on, and OCR-style
+    text items ({"bbox": four corners, "text", "confidence"}) for every
+    piece of text.
+
+    Returns:
+        tuple: (object_detections, ocr_results)
+    """
+    width, height = viewport.get("width") or 0, viewport.get("height") or 0
+    object_detections, ocr_results = [], []
+    for node in nodes:
+        box = node["box"]
+        if not box or (width and height and not _in_viewport(box, width, height)):
+            continue
+        x, y, box_width, box_height = box
+        x2, y2 = x + box_width, y + box_height
+        if node["role"] not in TEXT_ROLES:
+            object_detections.append({
+                "bbox": [x, y, x2, y2],
+                "confidence": 1.0,
+                "class": node["role"],
+                "role": node["role"],
+                "name": node["name"],
+                "states": node["states"],
+            })
+        for text in (node["name"], node["text"]):
+            if text and text.strip():
+                ocr_results.append({
+                    "bbox": [[x, y], [x2, y], [x2, y2], [x, y2]],
+                    "text": text.strip(),
+                    "confidence": 1.0,
+                })
+    return object_detections, ocr_results
+
+
+class Perception:
+    """
+    Builds the page model for one iteration: object detections and OCR text
+    in the metadata shape the reasoner reads.
+
+    In "accessibility" mode the model comes from Playwright's aria snapshot
+    (roles, names, states and boxes in one call) and a check of the page for
+    canvas; YOLO and EasyOCR are not loaded at all. Pages that are mostly
+    canvas, or that expose fewer than MIN_NODES named nodes, fall back to
+    screenshot vision automatically, loading the models on first use.
+
+    Time spent is reported per mode (see summary()).
+    """
+
+    def __init__(self, mode=None, detector=None, ocr_processor=None):
+        self.mode = mode or perception_mode()
+        self.detector = detector
+        self.ocr_processor = ocr_processor
+        self.stats = {mode_name: {"iterations": 0, "seconds": 0.0} for mode_name in PERCEPTION_MODES}
+        self.stats["fallbacks"] = 0
+        self.last_fallback_reason = None
+
+    @property
+    def needs_screenshot(self):
+        return self.mode == "vision"
+
+    # ---- Vision ----
+
+    def load_vision_models(self):
+        """Load YOLOv8 and EasyOCR unless they were passed in (heavy: imports torch)."""
+        if self.detector is None:
+            from src.vision.yolov8_detector import YOLOv8Detector
+            self.detector = YOLOv8Detector(model_variant='yolov8l.pt')
+        if self.ocr_processor is None:
+            from src.vision.ocr_processor import OCRProcessor
+            self.ocr_processor = OCRProcessor()
+
+    def analyze_screenshot(self, screenshot_path):
+        """Run the vision models on a screenshot. Returns (object_detections, ocr_results)."""
+        start = time.perf_counter()
+        self.load_vision_models()
+        object_detections = self.detector.detect(screenshot_path)
+        ocr_results = self.ocr_processor.process_image(screenshot_path)
+        self._count("vision", start)
+        return object_detections, ocr_results
+
+    # ---- Accessibility ----
+
+    def _count(self, mode, start):
+        self.stats[mode]["iterations"] += 1
+        self.stats[mode]["seconds"] = round(self.stats[mode]["seconds"] + time.perf_counter() - start, 4)
+
+    def _model(self, snapshot, traits, start):
+        """The accessibility page model, or None (with the reason noted) when vision must take over."""
+        traits = traits or {}
+        if traits.get("canvasRatio", 0) > MAX_CANVAS_RATIO:
+            return self._fall_back(f"canvas covers {traits['canvasRatio']:.0%} of the viewport", start)
+        nodes = parse_aria_snapshot(snapshot)
+        object_detections, ocr_results = nodes_to_metadata(nodes, traits)
+        if len(ocr_results) < MIN_NODES:
+            return self._fall_back(f"only {len(ocr_results)} named nodes in the viewport", start)
+        self._count("accessibility", start)
+        return object_detections, ocr_results
+
+    def _fall_back(self, reason, start):
+        self.stats["fallbacks"] += 1
+        self.last_fallback_reason = reason
+        self._count("accessibility", start)  # the attempt still cost this much
+        logging.info(f"Accessibility perception falling back to vision: {reason}")
+        return None
+
+    def perceive_accessibility(self, page):
+        """
+        Build the page model from the accessibility tree.
+
+        Returns:
+            tuple: (object_detections, ocr_results), or None when the page
+                   needs screenshot vision instead
+        """
+        start = time.perf_counter()
+        try:
+            traits = page.evaluate(PAGE_TRAITS_JS)
+            snapshot = page.locator("body").aria_snapshot(boxes=True, timeout=SNAPSHOT_TIMEOUT_MS)
+        except Exception as e:
+            return self._fall_back(f"aria snapshot failed: {e}", start)
+        return self._model(snapshot, traits, start)
+
+    async def async_perceive_accessibility(self, page):
+        """Async counterpart of perceive_accessibility()."""
+        start = time.perf_counter()
+        try:
+            traits = await page.evaluate(PAGE_TRAITS_JS)
+            snapshot = await page.locator("body").aria_snapshot(boxes=True, timeout=SNAPSHOT_TIMEOUT_MS)
+        except Exception as e:
+            return self._fall_back(f"aria snapshot failed: {e}", start)
+        return self._model(snapshot, traits, start)
+
+    def summary(self):
+        """Iterations and seconds per mode, plus how often accessibility fell back to vision."""
+        summary = {"mode": self.mode, "fallbacks": self.stats["fallbacks"]}
+        for mode_name in PERCEPTION_MODES:
+            stats = self.stats[mode_name]
+            average = stats["seconds"] / stats["iterations"] if stats["iterations"] else 0.0
+            summary[mode_name] = dict(stats, avg_seconds=round(average, 4))
+        if self.last_fallback_reason:
+            summary["last_fallback_reason"] = self.last_fallback_reason
+        return summary
@@ -1,4 +1,3 @@
-import easyocr
 import logging
 
 class OCRProcessor:
@@ -8,6 +7,8 @@ class OCRProcessor:
         
         :param languages: List of language codes (e.g., ['en']). Defaults to English.
         """
+        # Imported here so importing this module doesn't pull in torch
+        import easyocr
         if languages is None:
             languages = ['en']
         # Use GPU if available; otherwise, set gpu=False
@@ -1,12 +1,11 @@
-import cv2
-from ultralytics import YOLO
-
 class YOLOv8Detector:
     def __init__(self, model_variant: str = 'yolov8l.pt'):
         """
         Initialize the YOLOv8 model with the given variant.
         Force CPU usage to avoid CUDA compatibility issues.
         """
+        # Imported here so importing this module doesn't pull in torch
+        from ultralytics import YOLO
         # Force CPU device to avoid CUDA issues
         self.model = YOLO(model_variant)
         self.model.to('cpu')  # Force CPU usage
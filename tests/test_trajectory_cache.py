@@ -0,0 +1,58 @@
+from src.history.trajectory_cache import QUERY_SLOT, TrajectoryCache
+
+
+def _history(text):
+    return [
+        {"status": "ok", "action": "input", "url": "https://www.amazon.com/s",
+         "parameters": {"selector": "#twotabsearchtextbox", "text": text, "submit": True}},
+    ]
+
+
+def test_query_only_goal_is_keyed_exactly(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "trajectories.json"))
+    trajectory = cache.record("iphone 16 pro", "https://www.amazon.com", _history("iphone 16 pro"), 10.0)
+
+    assert trajectory["signature"] == "iphone 16 pro"
+    assert QUERY_SLOT not in trajectory["steps"][0]["parameters"]["text"]
+    assert cache.match("book a flight to paris") == (None, None)
+    assert cache.match("iPhone 16 Pro")[0] is trajectory
+
+
+def test_slot_covering_most_of_goal_is_refused(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "trajectories.json"))
+    trajectory = cache.record("buy usb-c braided charging cable", "https://www.amazon.com",
+                              _history("usb-c braided charging cable"), 10.0)
+
+    assert trajectory["signature"] == "buy usb-c braided charging cable"
+    assert cache.match("buy groceries") == (None, None)
+
+
+def test_stored_slot_only_signature_never_matches(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "trajectories.json"))
+    cache.trajectories[QUERY_SLOT] = {"signature": QUERY_SLOT, "steps": []}
+
+    assert cache.match("anything at all") == (None, None)
+
+
+def test_parameterized_signature_still_matches(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "trajectories.json"))
+    trajectory = cache.record("Search for iPhone 16 Pro on Amazon", "https://www.amazon.com",
+                              _history("iPhone 16 Pro"), 10.0)
+
+    assert trajectory["signature"] == "search for {query} on amazon"
+    assert trajectory["recorded_at"].endswith("+00:00")
+    assert cache.match("search for USB-C cable on Amazon") == (trajectory, "USB-C cable")
+
+
+def test_slot_matches_whole_words_only(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "trajectories.json"))
+    history = _history("pan") + [
+        {"status": "ok", "action": "click", "url": "https://www.amazon.com/s",
+         "parameters": {"selector": "#company-logo"}},
+    ]
+    trajectory = cache.record("buy a pan from the company store", "https://www.amazon.com", history, 10.0)
+
+    assert trajectory["signature"] == "buy a {query} from the company store"
+    assert trajectory["steps"][0]["parameters"]["text"] == QUERY_SLOT
+    assert trajectory["steps"][1]["parameters"]["selector"] == "#company-logo"
+    assert cache.match("buy a wok from the company store") == (trajectory, "wok")